@@ -7,6 +7,9 @@ import discord
 import cmd_control
 from configs import config
 from games import gamefactory
+from games.persistence import GameStore
+from games.poker_equity import EQUITY_SERVICE
+from games.uno_ai import UNO_BRAIN
 import logging
 import datetime
 
@@ -17,10 +20,13 @@ class LanternClient(discord.Client):
     Inhereted client class, needed to override setup_hook
     """
     def __init__(self, *, intents: discord.Intents,
-                 cmd_handler=logging.INFO, file_handler=logging.INFO):
+                 cmd_handler=logging.INFO, file_handler=logging.INFO, store=None):
         super().__init__(intents=intents)
         self.tree = discord.app_commands.CommandTree(self)
-        self.game_factory = gamefactory.GameFactory()
+        self.game_factory = gamefactory.GameFactory(store)
+        # saved games only get restored the first time the bot is ready,
+        # on_ready runs again after every reconnect
+        self.games_restored = False
         self.cmd_handler = cmd_handler
         self.file_handler = file_handler
 
@@ -31,6 +37,7 @@ class LanternClient(discord.Client):
         websocket.
         """
         await cmd_control.command_control(self.tree)
+        self.game_factory.start_reaper()
 
 
 def create_commands(client):
@@ -55,9 +62,12 @@ def create_commands(client):
         await client.game_factory.start_game(interaction, game_type=0)
 
     @client.tree.command(name="blackjack", description="Play a game of Blackjack")
-    async def play_blackjack(interaction: discord.Interaction):
+    @discord.app_commands.describe(
+        simultaneous="Everyone plays their hand at the same time instead of taking turns"
+    )
+    async def play_blackjack(interaction: discord.Interaction, simultaneous: bool = False):
         logging.info("Blackjack slash command used in channel [%i]", interaction.channel_id)
-        await client.game_factory.start_game(interaction, game_type=1)
+        await client.game_factory.start_game(interaction, game_type=1, simultaneous=simultaneous)
 
     @client.tree.command(name="poker", description="Play a game of Poker")
     @discord.app_commands.describe(
@@ -67,10 +77,18 @@ def create_commands(client):
         logging.info("Poker slash command used in channel [%i]", interaction.channel_id)
         await client.game_factory.start_game(interaction, game_type=2, cpus=cpus)    
 
+    @client.tree.command(name="odds", description="See your chances of winning your poker hand")
+    async def poker_odds(interaction: discord.Interaction):
+        logging.info("Odds slash command used in channel [%i]", interaction.channel_id)
+        await client.game_factory.get_odds(interaction)
+
     @client.tree.command(name="uno", description="Play a game of Uno")
-    async def play_uno(interaction: discord.Interaction):
+    @discord.app_commands.describe(
+        cpus="Amount of cpu players (max of 3)"
+    )
+    async def play_uno(interaction: discord.Interaction, cpus: int = 0):
         logging.info("Uno slash command used in channel [%i]", interaction.channel_id)
-        await client.game_factory.start_game(interaction, game_type=3)
+        await client.game_factory.start_game(interaction, game_type=3, cpus=cpus)
 
     @client.tree.command(name="getdebugdata", description="Get internal data for one or all games")
     @discord.app_commands.describe(
@@ -193,11 +211,31 @@ def run_bot(args):
 
     intents = discord.Intents.default()
     intents.message_content = True
-    client = LanternClient(intents=intents, cmd_handler=cmd_handler, file_handler=file_handler)
+    store = GameStore()
+    store.start()
+    client = LanternClient(intents=intents, cmd_handler=cmd_handler, file_handler=file_handler,
+                           store=store)
     create_commands(client)
 
     @client.event
     async def on_ready():
         logging.info("%s is now running", client.user)
+        if not client.games_restored:
+            client.games_restored = True
+            await client.game_factory.restore_games(client)
 
-    client.run(token=config.TOKEN, log_handler=None)
+    @client.event
+    async def on_interaction(interaction):
+        # base menu buttons aren't kept in discord.py's view store, the
+        # factory routes them by custom_id instead
+        if interaction.type == discord.InteractionType.component:
+            await client.game_factory.route(interaction)
+
+    try:
+        client.run(token=config.TOKEN, log_handler=None)
+    finally:
+        # write out anything the last few actions changed
+        store.close()
+        # stop the CPU players' worker processes
+        UNO_BRAIN.shutdown()
+        EQUITY_SERVICE.shutdown()
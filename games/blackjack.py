@@ -4,17 +4,37 @@ Contains all the logic needed to run a game of Blackjack.
 It features an closed game model, meaning not all users can interact
 with the game at any time, and there is player management.
 """
+import asyncio
 import logging
 import discord
 from games.game import BaseGame
 from games.game import GameManager
 from games.game import BasePlayer
+from games.router import RoutedView
+from games.timers import TimedView
+from games.timers import expire_response
+from games.blackjack_rules import BJHand
+from games.blackjack_rules import is_natural
+from games.blackjack_dealer import dealer_distribution
+from games.blackjack_dealer import shoe_counts
+from games.blackjack_dealer import stand_ev
+from games.blackjack_strategy import ACTION_NAMES
+from games.blackjack_strategy import get_table
 from util import double_check
-from util import STANDARD_52_DECK
+from util import respond
+from util import Shoe
 from util import cards_to_str_52_standard
 from util import send_info_message
 
 
+# number of decks in each table's shoe, and how far into the shoe the
+# cut card sits before it gets reshuffled between rounds
+SHOE_DECKS = 6
+SHOE_PENETRATION = 0.75
+# seconds a player has to hit or stand before they're stood for them
+TURN_TIMEOUT = 120
+
+
 class BlackjackPlayer(BasePlayer):
     """
     Blackjack player class, contains everything specific to a player
@@ -22,9 +42,7 @@ class BlackjackPlayer(BasePlayer):
     def __init__(self):
         super().__init__()
 
-        self.hand = []
-        self.eleven_ace_count = 0
-        self.hand_value = 0
+        self.hand = BJHand()
         self.chips = 300
         self.current_bet = 0
         self.current_payout_multiplier = 1
@@ -34,15 +52,17 @@ class BlackjackPlayer(BasePlayer):
         Reset the player's stats after a game ends
         """
         self.hand.clear()
-        self.eleven_ace_count = 0
-        self.hand_value = 0
         self.current_bet = 0
         self.current_payout_multiplier = 1
 
+    def snapshot(self, refund_bets=False):
+        return {"chips": self.chips + (self.current_bet if refund_bets else 0)}
+
+    def restore(self, data):
+        self.chips = data["chips"]
+
     def get_debug_str(self):
         return (f"\t\thand: {self.hand}\n"
-                f"\t\televen_ace_count: {self.eleven_ace_count}\n"
-                f"\t\thand_value: {self.hand_value}\n"
                 f"\t\tchips: {self.chips}\n"
                 f"\t\tcurrent_bet: {self.current_bet}\n"
                 f"\t\tcurrent_payout_multiplier: {self.current_payout_multiplier}\n")
@@ -61,13 +81,13 @@ class BlackjackPlayer(BasePlayer):
         """
         if self.current_payout_multiplier == 2.5:
             return (f"({self.chips} chips, {self.current_bet} bet): "
-                    f"{cards_to_str_52_standard(self.hand)} BLACKJACK!")
+                    f"{cards_to_str_52_standard(self.hand.cards)} BLACKJACK!")
         elif self.current_payout_multiplier == 0:
             return (f"({self.chips} chips, {self.current_bet} bet): "
-                    f"{cards_to_str_52_standard(self.hand)} BUST!")
+                    f"{cards_to_str_52_standard(self.hand.cards)} BUST!")
         else:
             return (f"({self.chips} chips, {self.current_bet} bet): "
-                    f"{cards_to_str_52_standard(self.hand)}")
+                    f"{cards_to_str_52_standard(self.hand.cards)}")
 
     def get_payout_str(self):
         """
@@ -88,7 +108,7 @@ class BlackjackGame(BaseGame):
         super().__init__(game_type=1, player_data={}, game_state=1)
 
         self.turn_order = []
-        self.dealer_hand = []
+        self.dealer_hand = BJHand(dealer=True)
         self.dealer_hidden_card = None
         self.turn_index = -1
 
@@ -100,6 +120,11 @@ class BlackjackGame(BaseGame):
             return None
         return self.turn_order[self.turn_index]
 
+    def bets_outstanding(self):
+        # bets are taken out of chips when they're made and paid out
+        # before the game moves to state 7
+        return self.game_state in (4, 5, 6)
+
     def get_debug_str(self):
         ret = super().get_debug_str()
         ret += ("Blackjack game attributes:\n"
@@ -124,9 +149,14 @@ class BlackjackManager(GameManager):
     """
     Blackjack manager class
     """
-    def __init__(self, factory, channel):
+    def __init__(self, factory, channel, simultaneous=False):
         super().__init__(game=BlackjackGame(), base_gui=BlackjackButtonsBase(self),
                          channel=channel, factory=factory)
+        # if set, everyone plays their hand at the same time instead of
+        # taking turns
+        self.simultaneous = simultaneous
+        # every table deals from its own shoe
+        self.shoe = Shoe(decks=SHOE_DECKS, penetration=SHOE_PENETRATION)
 
     async def add_player(self, interaction, init_player_data=None):
         await super().add_player(interaction, init_player_data)
@@ -134,6 +164,16 @@ class BlackjackManager(GameManager):
         and interaction.user not in self.game.turn_order:
             self.game.turn_order.append(interaction.user)
 
+    def get_options(self):
+        return {"simultaneous": self.simultaneous}
+
+    def new_player(self):
+        return BlackjackPlayer()
+
+    def seat_player(self, user, player_data):
+        super().seat_player(user, player_data)
+        self.game.turn_order.append(user)
+
     async def remove_player(self, interaction):
         await super().remove_player(interaction)
         if interaction.user not in self.game.player_data \
@@ -155,7 +195,7 @@ class BlackjackManager(GameManager):
         # game_state == 4 -> players cannot join or leave
         self.game.game_state = 4
         # swap default GUI to betting phase buttons
-        await interaction.channel.send(f"{interaction.user.display_name} started the game!")
+        await self.announce(f"{interaction.user.display_name} started the game!")
         self.base_gui = ButtonsBetPhase(self, self.game.players)
         await self.resend(interaction)
 
@@ -169,98 +209,137 @@ class BlackjackManager(GameManager):
         self.game.dealer_hidden_card = None
         self.game.turn_index = -1
         self.game.game_state = 1
+        # reshuffle once the cut card has come out
+        if self.shoe.needs_shuffle():
+            self.shoe.shuffle()
         # allow players to join
         self.base_gui = BlackjackButtonsBase(self)
         await self.resend(interaction)
 
+    async def run_round(self):
+        """
+        Flow for a round once everyone has bet: deal, let everyone play,
+        then the dealer. Runs outside the actor (see spawn) since most of
+        it is spent waiting on players
+        """
+        if await self.call(self.deal_cards):
+            await self.play_round()
+
     async def deal_cards(self):
         """
-        Deals cards to all players, used once betting is done
+        Deals cards to all players, used once betting is done. Returns
+        True if the players get to play their hands
         """
         # make sure we're at the end of the betting phase
         if self.game.game_state != 4:
-            return
+            return False
         # game_state 5 -> dealing phase (players cannot join or leave)
         self.game.game_state = 5
 
-        await self.channel.send("All players have bet! Dealing cards...")
+        await self.announce("All players have bet! Dealing cards...")
 
+        # cards from earlier rounds are discards now
+        self.shoe.start_round()
         # draw 2 cards for the dealer and every player
-        self.game.dealer_hand.extend(STANDARD_52_DECK.draw(1))
+        self.game.dealer_hand.add_cards(self.shoe.draw(1))
         # the dealer's hidden card is stored seperately
-        hidden_card = STANDARD_52_DECK.draw(1)[0]
+        hidden_card = self.shoe.draw(1)[0]
         self.game.dealer_hidden_card = hidden_card
         for i in self.game.player_data:
-            self.game.player_data[i].hand.extend(STANDARD_52_DECK.draw(2))
+            self.game.player_data[i].hand.add_cards(self.shoe.draw(2))
 
         # check to see if the dealer got a natural 21 and add the
         # hidden card to its normal hand if so (so it shows up in
         # the base menu)
-        dealer_card = self.game.dealer_hand[0]
-        if (dealer_card.value == "A" and hidden_card.value in ("J", "Q", "K") or
-            hidden_card.value == "A" and dealer_card.value in ("J", "Q", "K")
-        ):
+        if is_natural(self.game.dealer_hand.cards[0], hidden_card):
             self.game.dealer_hidden_card = None
-            self.game.dealer_hand.append(hidden_card)
+            self.game.dealer_hand.add(hidden_card)
 
-        # TODO: resend doesn't support sending only based on channel.
-        # current solution is to just reimplement its logic here,
-        # pls improve
         if  self.game.game_state == -1:
-            return
-        await self.current_active_menu.edit(view=None)
+            return False
+        # the table goes out straight away so it's above everything the
+        # round sends after it
         # if dealer's hidden card is None, that means we added it to
         # its hand because it got blackjack
         if self.game.dealer_hidden_card is None:
-            self.current_active_menu = await self.channel.send(self.get_base_menu_string(),
-                                                               view=None, silent=True)
-            self.channel.send("Dealer got blackjack! House wins!")
-            # move straight to payout phase
-            self.make_payout(21)
+            self.base_gui = None
+            await self.render_now(resend=True)
+            await self.announce("Dealer got blackjack! House wins!")
+            # everyone loses their bet, then move straight to payout phase
+            for player_data in self.game.player_data.values():
+                player_data.current_payout_multiplier = 0
+            await self.make_payout(21)
+            return False
+        # otherwise initiate play phase
+        self.base_gui = BlackjackButtonsBaseGame(self)
+        await self.render_now(resend=True)
+        return True
+
+    async def play_round(self):
+        """
+        Let every player play out their hand, then have the dealer go.
+        Normally players take their turns one after another, in
+        simultaneous mode everyone plays at the same time
+        """
+        if self.simultaneous:
+            await asyncio.gather(*(self.play_seat(player) for player in self.game.turn_order))
         else:
-            # otherwise initiate play phase
-            self.base_gui = BlackjackButtonsBaseGame(self)
-            self.current_active_menu = await self.channel.send(self.get_base_menu_string(),
-                                                               view=self.base_gui, silent=True)
-            await self.start_next_player_turn()
-
-    async def start_next_player_turn(self):
-        """
-        Start the next player's turn
-        """
-        self.game.turn_index += 1
-        # if we made it to the end of the list, have the dealer go
-        if self.game.turn_index == self.game.players:
-            await self.channel.send("All players have had their turn, starting dealer draw!")
-            self.game.game_state = 6
-            await self.dealer_draw()
+            for (index, player) in enumerate(self.game.turn_order):
+                self.game.turn_index = index
+                await self.play_seat(player)
+        if self.game.game_state == -1:
             return
+        await self.call(self.dealer_draw)
 
-        # retrieving data
-        active_player = self.game.get_active_player()
-        active_player_data = self.game.player_data[active_player]
-        active_player_hand = active_player_data.hand
-
-        (eleven_aces, value) = bj_add(active_player_hand)
+    async def play_seat(self, player):
+        """
+        Play out one player's turn: keep offering them hit or stand
+        until they stand, bust, reach 21 or run out of time
+        """
+        player_data = self.game.player_data[player]
         # if the player got a blackjack, skip their turn and give them
         # a 2.5x payout immediately
-        if value == 21:
-            await self.channel.send(f"{active_player.mention} got blackjack! Moving on...")
-            active_player_data.current_payout_multiplier = 2.5
-            await self.start_next_player_turn()
+        if player_data.hand.blackjack:
+            await self.announce(f"{player.mention} got blackjack! Moving on...")
+            player_data.current_payout_multiplier = 2.5
             return
-        active_player_data.hand_value = value
-        active_player_data.eleven_ace_count = eleven_aces
-
-        # initiate the hit or stand menu
-        hit_me_view = HitOrStand(self, active_player)
-        active_msg = await self.channel.send((f"{active_player.mention}, your turn! Your hand is\n"
-                                        f"{cards_to_str_52_standard(active_player_hand)}\n"
-                                        "What would you like to do?"), view = hit_me_view)
-        # wait for the user to press hit or stand, then remove the
-        # buttons from the menu once they do
-        await hit_me_view.wait()
-        await active_msg.edit(view=None)
+
+        prompt = (f"{player.mention}, your turn! Your hand is\n"
+                  f"{cards_to_str_52_standard(player_data.hand.cards)}\n"
+                  "What would you like to do?")
+        while self.game.game_state == 5:
+            # initiate the hit or stand menu
+            hit_me_view = HitOrStand(self, player)
+            active_msg = await self.outbox.send(prompt, view=hit_me_view)
+            # wait for the user to press hit or stand, then remove the
+            # buttons from the menu once they do
+            await hit_me_view.wait()
+            await active_msg.edit(view=None)
+            if self.game.has_ended():
+                # the game was closed while they were deciding (see
+                # GameManager.close), so there's nobody to tell
+                return
+
+            if hit_me_view.action == "hit":
+                prompt = await self.call(self.hit_user, hit_me_view.interaction)
+                if prompt is None:
+                    return
+            elif hit_me_view.action == "stand":
+                await respond(hit_me_view.interaction, f"{player.display_name} is standing!")
+                return
+            else:
+                await self.announce(f"{player.mention} took too long and is standing.")
+                return
+
+    def get_unseen_counts(self):
+        """
+        Shoe counts (see blackjack_dealer) of the cards players can't
+        see: whatever is left in the shoe plus the dealer's hidden card
+        """
+        unseen = self.shoe.cards[self.shoe.cursor:]
+        if self.game.dealer_hidden_card is not None:
+            unseen.append(self.game.dealer_hidden_card)
+        return shoe_counts(unseen)
 
     def get_base_menu_string(self):
         if self.game.game_state == 1:
@@ -274,7 +353,7 @@ class BlackjackManager(GameManager):
             return ret
 
         elif self.game.game_state == 5:
-            ret = f"Dealer hand: {cards_to_str_52_standard(self.game.dealer_hand)}"
+            ret = f"Dealer hand: {cards_to_str_52_standard(self.game.dealer_hand.cards)}"
             # no hidden card means we added it to the dealer's hand
             if self.game.dealer_hidden_card is not None:
                 ret += ", ??"
@@ -287,97 +366,97 @@ class BlackjackManager(GameManager):
 
     async def hit_user(self, interaction):
         """
-        Adds a card to the user's hand, and handles any consequences
+        Adds a card to the user's hand, and handles any consequences.
+        Returns the prompt for their next move, or None if their turn
+        is over
         """
         # check to make sure the game hasn't ended, do nothing if it has
         if await self.game_end_check(interaction):
-            return
+            return None
 
         # check to make sure they're in the game
         if interaction.user not in self.game.player_data:
             await send_info_message("You are not in this game.", interaction)
-            return
+            return None
 
         # note: we don't check to see if this is the player's turn,
         # so ensure that check is done before we get here
         active_player = interaction.user
         active_player_data = self.game.player_data[interaction.user]
-        new_card = STANDARD_52_DECK.draw(1)[0]
-        active_player_data.hand.append(new_card)
+        new_card = self.shoe.draw(1)[0]
+        # the hand knocks its aces down to 1 as needed
+        active_player_data.hand.add(new_card)
         response_message = f"{active_player.mention} drew {cards_to_str_52_standard([new_card])}! "
 
-        # manage add the card's value to the player's hand
-        if new_card.value == "A":
-            active_player_data.hand_value += 11
-            active_player_data.eleven_ace_count += 1
-        elif new_card.value in ("J", "Q", "K"):
-            active_player_data.hand_value += 10
-        else:
-            active_player_data.hand_value += int(new_card.value)
-
-        # reduce the value of any aces while the user is above 21,
-        # and if they are still above 21 when all aces are reduced,
-        # declare that they're gone bust
-        while active_player_data.hand_value > 21:
-            if active_player_data.eleven_ace_count > 0:
-                active_player_data.hand_value -= 10
-                active_player_data.eleven_ace_count -= 1
-            else:
-                # if the user busts, we set their payout to 0, which
-                # is never overwritten even if the dealer busts too
-                response_message += "That's a bust!"
-                active_player_data.current_payout_multiplier = 0
-                await interaction.response.send_message(response_message)
-                await self.start_next_player_turn()
-                return
+        if active_player_data.hand.bust:
+            # if the user busts, we set their payout to 0, which
+            # is never overwritten even if the dealer busts too
+            response_message += "That's a bust!"
+            active_player_data.current_payout_multiplier = 0
+            await respond(interaction, response_message)
+            return None
 
-        if active_player_data.hand_value == 21:
+        if active_player_data.hand.total == 21:
             response_message += "That's 21!"
-            await interaction.response.send_message(response_message)
-            await self.start_next_player_turn()
-            return
+            await respond(interaction, response_message)
+            return None
 
         # alert players of the new draw and allow them to go again
-        response_message += (f"\nTheir hand is now "
-                             f"{cards_to_str_52_standard(active_player_data.hand)}, "
-                             f"which has a max value of {active_player_data.hand_value}! ")
-        response_message += "What next?"
-        hit_me_view = HitOrStand(self, active_player)
-        active_msg = await self.channel.send(response_message, view=hit_me_view)
-        # wait for the buttons to be pressed and remove once one has
-        await hit_me_view.wait()
-        await active_msg.edit(view=None)
+        await respond(interaction, response_message)
+        return (f"{active_player.mention}, your hand is now "
+                f"{cards_to_str_52_standard(active_player_data.hand.cards)}, "
+                f"which has a max value of {active_player_data.hand.total}! What next?")
 
     async def make_bet(self, interaction, bet_amount):
         """
-        Set a player's bet
+        Set a player's bet. The bet is checked and placed on the actor,
+        but the confirmation prompt is waited on outside of it
+        """
+        if not await self.submit(interaction, self.check_bet, interaction, bet_amount):
+            return
+        # double check to make sure the user wants to confirm this bet
+        (yes_clicked, interaction) = await double_check(interaction=interaction,
+                                                    message_content=f"Betting {str(bet_amount)}.")
+        if not yes_clicked:
+            await send_info_message("Cancelled bet!", interaction)
+            return
+        await self.submit(interaction, self.place_bet, interaction, bet_amount)
+
+    async def check_bet(self, interaction, bet_amount):
+        """
+        Check to see if the user can bet, and deny them if not. Returns
+        True if they can
         """
         # checks to see if the game is over
         if await self.game_end_check(interaction):
-            return
+            return False
 
-        # check to see if the user can bet, and deny them if not
-        user = interaction.user
-        user_data = self.game.player_data[user]
+        if self.game.game_state != 4:
+            await send_info_message("Betting is over for this round.", interaction)
+            return False
+        user_data = self.game.player_data[interaction.user]
         if user_data.current_bet != 0:
             await send_info_message("You've already bet this round.", interaction)
-            return
+            return False
         if int(bet_amount) > user_data.chips:
             await send_info_message("You cannot afford this bet.", interaction)
-            return
+            return False
+        return True
 
-        # double check to make sure the user wants to confirm this bet
-        (yes_clicked, interaction) = await double_check(interaction=interaction,
-                                                    message_content=f"Betting {str(bet_amount)}.")
-        if not yes_clicked:
-            await send_info_message("Cancelled bet!", interaction)
+    async def place_bet(self, interaction, bet_amount):
+        """
+        Perform a confirmed bet, checking again in case anything changed
+        while the user was confirming it
+        """
+        if not await self.check_bet(interaction, bet_amount):
             return
-        # perform the bet
+        user = interaction.user
+        user_data = self.game.player_data[user]
         user_data.current_bet = int(bet_amount)
         user_data.chips -= int(bet_amount)
-        await interaction.channel.send((f"{user.mention} has bet {str(bet_amount)} "
-                                        f"chips and now has {str(user_data.chips)} "
-                                        "chips left!"))
+        await self.announce((f"{user.mention} has bet {str(bet_amount)} "
+                             f"chips and now has {str(user_data.chips)} "
+                             "chips left!"))
         # Update the view so it knows how many players have bet
         # TODO: this solution is janky as fuck pls fix maybe
         await self.base_gui.add_betted_player()
@@ -385,48 +464,41 @@ class BlackjackManager(GameManager):
 
     async def dealer_draw(self):
         """
-        Perform the dealer's play
+        Perform the dealer's play, once every player has had their turn
         """
+        if self.game.game_state == -1:
+            return
+        await self.announce("All players have had their turn, starting dealer draw!")
+        self.game.game_state = 6
         # reveal the dealer's hidden card if it hasn't been already
         # note: this check is probably worthless since the only case in
         # which it isn't hidden skips this phase
         if self.game.dealer_hidden_card is not None:
-            await self.channel.send((f"Dealer's hidden card is "
-                               f"{cards_to_str_52_standard([self.game.dealer_hidden_card])}!"))
-            self.game.dealer_hand.append(self.game.dealer_hidden_card)
+            await self.announce((f"Dealer's hidden card is "
+                                 f"{cards_to_str_52_standard([self.game.dealer_hidden_card])}!"))
+            self.game.dealer_hand.add(self.game.dealer_hidden_card)
             self.game.dealer_hidden_card = None
 
-        (_, hand_value) = bj_add(self.game.dealer_hand)
-        await self.channel.send((f"Dealer's hand is "
-                                    f"{cards_to_str_52_standard(self.game.dealer_hand)}, "
-                                    f"which has a total value of {hand_value}!"))
+        dealer_hand = self.game.dealer_hand
+        await self.announce((f"Dealer's hand is "
+                             f"{cards_to_str_52_standard(dealer_hand.cards)}, "
+                             f"which has a total value of {dealer_hand.total}!"))
 
         # keep drawing until the deal exceeds 17 cards (bust or not)
-        while hand_value < 17:
-            new_card = STANDARD_52_DECK.draw(1)
-            await self.channel.send(f"Dealer drew {cards_to_str_52_standard(new_card)}!")
-            new_card = new_card[0]
-            self.game.dealer_hand.append(new_card)
-            if new_card.value == "A":
-                # dealer always treats new aces as 11 unless doing so
-                # results in a bust
-                if hand_value + 11 > 21:
-                    hand_value += 1
-                else:
-                    hand_value += 11
-            elif new_card.value in ("J", "Q", "K"):
-                hand_value += 10
-            else:
-                hand_value += int(new_card.value)
+        while dealer_hand.total < 17:
+            new_card = self.shoe.draw(1)
+            await self.announce(f"Dealer drew {cards_to_str_52_standard(new_card)}!")
+            dealer_hand.add(new_card[0])
 
-            await self.channel.send((f"Dealer's hand is "
-                                     f"{cards_to_str_52_standard(self.game.dealer_hand)}, "
-                                     f"which has a total value of {hand_value}!"))
+            await self.announce((f"Dealer's hand is "
+                                 f"{cards_to_str_52_standard(dealer_hand.cards)}, "
+                                 f"which has a total value of {dealer_hand.total}!"))
 
         # treat dealer's hand as 0 if it busts (so any non-busted
         # player is treated as winning)
-        if hand_value > 21:
-            await self.channel.send("Dealer bust!")
+        hand_value = dealer_hand.total
+        if dealer_hand.bust:
+            await self.announce("Dealer bust!")
             hand_value = 0
 
         await self.make_payout(hand_value)
@@ -443,31 +515,44 @@ class BlackjackManager(GameManager):
             # its payment determined yet through bust or blackjack, so
             # we need to compare it to the dealer's hand
             if player_data.current_payout_multiplier == 1:
-                if player_data.hand_value > dealer_hand_value:
+                if player_data.hand.total > dealer_hand_value:
                     player_data.current_payout_multiplier = 2
-                elif player_data.hand_value < dealer_hand_value:
+                elif player_data.hand.total < dealer_hand_value:
                     player_data.current_payout_multiplier = 0
             payout_str = payout_str + f"\n{player.display_name}: " + player_data.get_payout_str()
             player_data.chips += round(player_data.current_bet
                                        * player_data.current_payout_multiplier)
 
-        await self.channel.send(payout_str)
+        await self.announce(payout_str)
 
         # then initiate the endgame phase
         self.game.game_state = 7
+        self.spawn(self.ask_restart())
+
+    async def ask_restart(self):
+        """
+        Ask the players if they want to go again and wait for an answer.
+        Runs outside the actor (see spawn)
+        """
         restart_ui = QuitGameButton(self)
-        active_msg = await self.channel.send("Play again?", view=restart_ui)
+        active_msg = await self.outbox.send("Play again?", view=restart_ui)
         await restart_ui.wait()
+        if self.game.has_ended():
+            # the game was ended or closed (see GameManager.close) while
+            # waiting, so there's nothing left to ask about
+            await active_msg.delete()
+            return
         await active_msg.edit(view=None)
 
 
-class QuitGameButton(discord.ui.View):
+class QuitGameButton(TimedView):
     """
     Button set that asks players if they want to play the game again
     """
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        manager.views.add(self)
 
     @discord.ui.button(label = "Go Again!", style = discord.ButtonStyle.green)
     async def restart(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -479,7 +564,7 @@ class QuitGameButton(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop accepting input
         self.stop()
-        await self.manager.start_new_round(interaction)
+        await self.manager.submit(interaction, self.manager.start_new_round, interaction)
 
     @discord.ui.button(label = "End Game", style = discord.ButtonStyle.red)
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -491,11 +576,11 @@ class QuitGameButton(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop eccepting input
         self.stop()
-        await interaction.channel.send(f"{interaction.user.mention} ended the game!")
-        await self.manager.quit_game(interaction)
+        await self.manager.announce(f"{interaction.user.mention} ended the game!")
+        await self.manager.submit(interaction, self.manager.quit_game, interaction)
 
 
-class BlackjackButtonsBase(discord.ui.View):
+class BlackjackButtonsBase(RoutedView):
     """
     Initial "join game" buttons
     """
@@ -503,7 +588,7 @@ class BlackjackButtonsBase(discord.ui.View):
         super().__init__()
         self.manager = manager
 
-    @discord.ui.button(label = "Join", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Join", style = discord.ButtonStyle.green, custom_id = "join")
     async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Send an ephemeral message to the person who interacted with
@@ -517,9 +602,10 @@ class BlackjackButtonsBase(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
 
         indi_player_data = BlackjackPlayer()
-        await self.manager.add_player(interaction, indi_player_data)
+        await self.manager.submit(interaction, self.manager.add_player, interaction,
+                                  indi_player_data)
 
-    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red)
+    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red, custom_id = "quit")
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Quit the game
@@ -528,9 +614,9 @@ class BlackjackButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # remove current players from active player list
-        await self.manager.remove_player(interaction)
+        await self.manager.submit(interaction, self.manager.remove_player, interaction)
 
-    @discord.ui.button(label = "Start Game", style = discord.ButtonStyle.blurple)
+    @discord.ui.button(label = "Start Game", style = discord.ButtonStyle.blurple, custom_id = "start")
     async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Start the game
@@ -539,10 +625,10 @@ class BlackjackButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # start the game
-        await self.manager.start_game(interaction)
+        await self.manager.submit(interaction, self.manager.start_game, interaction)
 
 
-class BlackjackButtonsBaseGame(discord.ui.View):
+class BlackjackButtonsBaseGame(RoutedView):
     """
     Literally just a resend button
     """
@@ -550,7 +636,7 @@ class BlackjackButtonsBaseGame(discord.ui.View):
         super().__init__()
         self.manager = manager
 
-    @discord.ui.button(label = "Resend", style = discord.ButtonStyle.gray)
+    @discord.ui.button(label = "Resend", style = discord.ButtonStyle.gray, custom_id = "resend")
     async def resend(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Resend base menu message
@@ -559,7 +645,7 @@ class BlackjackButtonsBaseGame(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # resend
-        await self.manager.resend(interaction)
+        await self.manager.submit(interaction, self.manager.resend, interaction)
 
 
 class BetModal(discord.ui.Modal):
@@ -590,7 +676,7 @@ class BetModal(discord.ui.Modal):
         await self.manager.make_bet(interaction, user_response)
 
 
-class ButtonsBetPhase(discord.ui.View):
+class ButtonsBetPhase(RoutedView):
     """
     Contains the "bet" button and also keeps track of players who have
     placed bets
@@ -608,9 +694,9 @@ class ButtonsBetPhase(discord.ui.View):
         """
         self.players_with_bets += 1
         if self.players_with_bets == self.player_count:
-            await self.manager.deal_cards()
+            self.manager.spawn(self.manager.run_round())
 
-    @discord.ui.button(label = "Bet!", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Bet!", style = discord.ButtonStyle.green, custom_id = "bet")
     async def bet(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Allows the user to bring up the betting menu
@@ -621,68 +707,80 @@ class ButtonsBetPhase(discord.ui.View):
         await interaction.response.send_modal(BetModal(self.manager))
 
 
-class HitOrStand(discord.ui.View):
+class HitOrStand(TimedView):
     """
     Contains the "hit" and "stand" buttons when it's a certain player's
     turn. Keeps track of which player's turn it is and denies input
-    to other players
+    to other players. Pressing hit or stand just records the choice
+    (and the interaction to answer it with) and stops the view, the
+    manager's play_seat loop acts on it. If nobody presses anything
+    before TURN_TIMEOUT, action stays None
     """
     def __init__(self, manager, active_player):
-        super().__init__()
+        super().__init__(timeout=TURN_TIMEOUT)
         self.manager = manager
+        manager.views.add(self)
         self.active_player = active_player
+        self.action = None
+        self.interaction = None
 
     @discord.ui.button(label = "Hit Me!", style = discord.ButtonStyle.green)
     async def hit_me(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Check if the interaction is valid, and if so, call hit_user
+        Check if the interaction is valid, and if so, record a hit
         """
         print(f"{interaction.user} pressed {button.label}!")
         if interaction.user != self.active_player:
             await send_info_message("It's not your turn.", interaction)
             return
+        self.action = "hit"
+        self.interaction = interaction
+        # the press is answered once the turn flow gets to it, which can
+        # take a while with other seats queued on the game
+        await interaction.response.defer()
         # stop accepting interactions for this message
         self.stop()
-        await self.manager.hit_user(interaction)
 
     @discord.ui.button(label = "Stand", style = discord.ButtonStyle.blurple)
     async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Check if the interaction is valid, and if so, make the user stand
-        and start the next player's turn
+        Check if the interaction is valid, and if so, record a stand
         """
         if interaction.user != self.active_player:
             await send_info_message("It's not your turn.", interaction)
             return
         print(f"{interaction.user} pressed {button.label}!")
-        await interaction.response.send_message(f"{self.active_player.display_name} is standing!")
+        self.action = "stand"
+        self.interaction = interaction
+        # answered later by the turn flow, see hit_me
+        await interaction.response.defer()
         # stop accepting interactions for this message
         self.stop()
-        await self.manager.start_next_player_turn()
-
 
-def bj_add(cards):
-    """
-    cards is a list of Card objects
-    returns a tuple containing the number of aces that are counted as
-    eleven, and the value of the hand
-    """
-    total = 0
-    ace_count = 0
-    faces = ('A', 'J', 'Q', 'K')
-    for card in cards:
-        if card.value not in faces:
-            total += int(card.value)
-        elif card.value in faces[1:]:
-            total += 10
-        else:
-            ace_count += 1
-    total += 11 * ace_count
-    ret_ace_count = ace_count
-    for _ in range(ace_count):
-        if total > 21:
-            ret_ace_count -= 1
-            total -= 10
-        else:
-            break
-    return (ret_ace_count, total)
+    @discord.ui.button(label = "Hint", style = discord.ButtonStyle.gray)
+    async def hint(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """
+        Tell the active player what basic strategy says to do with
+        their hand. Doesn't use up their turn
+        """
+        print(f"{interaction.user} pressed {button.label}!")
+        if interaction.user != self.active_player:
+            await send_info_message("It's not your turn.", interaction)
+            return
+        hand = self.manager.game.player_data[self.active_player].hand
+        hand_value = hand.total
+        dealer_card = self.manager.game.dealer_hand.cards[0]
+        # the first hint might have to work the table out, which is kept
+        # off the event loop
+        strategy = await asyncio.to_thread(get_table)
+        action = strategy.action(hand_value, hand.soft, dealer_card.rank)
+        # exact odds for what's actually left in the shoe
+        finals = dealer_distribution(dealer_card.rank, self.manager.get_unseen_counts())
+        await interaction.response.send_message((f"With {hand_value} against the dealer's "
+                                                 f"{cards_to_str_52_standard([dealer_card])}, "
+                                                 f"basic strategy says: {ACTION_NAMES[action]}\n"
+                                                 f"The dealer busts {finals[0]:.0%} of the time from here, "
+                                                 f"and standing wins {stand_ev(hand_value, finals):+.2f} "
+                                                 "chips per chip bet on average"),
+                                                ephemeral = True)
+        expire_response(interaction, 60)
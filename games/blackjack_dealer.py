@@ -0,0 +1,123 @@
+"""Blackjack dealer outcomes
+
+Exact chances of the dealer finishing on each total (17-21 or bust),
+worked out by dynamic programming over the cards left in the shoe
+instead of by playing hands out. The dealer follows the same rules as
+dealer_draw: cards are drawn until the hand is worth 17 or more, with
+the dealer's ace rule from BJHand.
+
+Shoe contents are passed around as compact counts: a tuple with the
+number of cards left of each kind in BUCKET_VALUES order (tens and
+picture cards are kept apart because only picture cards make a dealer
+natural). None stands for an infinite shoe, where every rank is
+equally likely no matter what has been dealt. Results are cached on
+(dealer's hand value, counts), so asking again for the same shoe costs
+a dictionary lookup.
+
+Distributions are tuples indexed by final total, with busts counted
+as 0 the same way make_payout counts them.
+"""
+from functools import lru_cache
+from games.blackjack_rules import ACE_RANK
+from games.blackjack_rules import PICTURE_RANKS
+
+# value of the cards in each bucket of the counts: 2-9, ten, picture, ace
+BUCKET_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 11)
+TEN_BUCKET = 8
+PICTURE_BUCKET = 9
+ACE_BUCKET = 10
+# bucket of each Card.rank
+RANK_BUCKETS = tuple(ACE_BUCKET if rank == ACE_RANK
+                     else PICTURE_BUCKET if rank in PICTURE_RANKS
+                     else rank for rank in range(13))
+# how many ranks fall into each bucket, which is the weighting of an
+# infinite shoe
+_RANK_WEIGHTS = tuple(RANK_BUCKETS.count(bucket) for bucket in range(len(BUCKET_VALUES)))
+TOTALS = 22
+# number of (hand value, counts) results kept
+CACHE_SIZE = 1 << 16
+
+
+def shoe_counts(cards):
+    """
+    Counts for the Card objects in cards
+    """
+    counts = [0] * len(BUCKET_VALUES)
+    for card in cards:
+        counts[RANK_BUCKETS[card.rank]] += 1
+    return tuple(counts)
+
+
+def _draws(counts):
+    """
+    Yields (bucket, chance, counts after drawing it) for every kind of
+    card that can be drawn from counts
+    """
+    if counts is None or not any(counts):
+        # an empty shoe gets reshuffled, so play on as if it were infinite
+        for (bucket, weight) in enumerate(_RANK_WEIGHTS):
+            yield (bucket, weight / 13, None)
+        return
+    left = sum(counts)
+    for (bucket, count) in enumerate(counts):
+        if count:
+            yield (bucket, count / left, counts[:bucket] + (count - 1, ) + counts[bucket + 1:])
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def dealer_finals(hand_value, counts=None):
+    """
+    Chances of the dealer finishing on each total once their hand is
+    worth hand_value and counts is what's left in the shoe
+    """
+    if hand_value > 21:
+        return (1.0, ) + (0.0, ) * (TOTALS - 1)
+    if hand_value >= 17:
+        return tuple(1.0 if total == hand_value else 0.0 for total in range(TOTALS))
+    finals = [0.0] * TOTALS
+    for (bucket, chance, rest) in _draws(counts):
+        card_value = BUCKET_VALUES[bucket]
+        # the dealer counts a new ace as 11 unless that busts, see
+        # BJHand
+        if bucket == ACE_BUCKET and hand_value + 11 > 21:
+            card_value = 1
+        for (total, final_chance) in enumerate(dealer_finals(hand_value + card_value, rest)):
+            finals[total] += chance * final_chance
+    return tuple(finals)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def dealer_distribution(up_rank, counts=None):
+    """
+    Chances of the dealer finishing on each total given their up card
+    rank, while the hidden card and anything drawn after it come out of
+    counts. The round ends before the players act if the dealer has a
+    natural, so only hidden cards that don't make one are considered.
+    """
+    up_bucket = RANK_BUCKETS[up_rank]
+    if up_bucket == ACE_BUCKET:
+        blocked = PICTURE_BUCKET
+    elif up_bucket == PICTURE_BUCKET:
+        blocked = ACE_BUCKET
+    else:
+        blocked = None
+    draws = [draw for draw in _draws(counts) if draw[0] != blocked]
+    no_natural = sum(chance for (_, chance, _) in draws)
+
+    finals = [0.0] * TOTALS
+    for (bucket, chance, rest) in draws:
+        # 2 aces are worth 12, like in BJHand
+        hand_value = BUCKET_VALUES[up_bucket] + BUCKET_VALUES[bucket]
+        if hand_value > 21:
+            hand_value -= 10
+        for (total, final_chance) in enumerate(dealer_finals(hand_value, rest)):
+            finals[total] += chance / no_natural * final_chance
+    return tuple(finals)
+
+
+def stand_ev(total, finals):
+    """
+    Chips won per chip bet by standing on total against the dealer's
+    final total chances
+    """
+    return sum(finals[:total]) - sum(finals[total + 1:])
@@ -0,0 +1,90 @@
+"""Blackjack rules
+
+Card values and hand scoring shared by the blackjack game, simulator
+and strategy tables.
+"""
+from util import Card
+
+
+# blackjack value of each card, indexed by Card.rank. Aces start as 11
+# and are knocked down to 1 when the hand would bust
+BJ_VALUES = tuple(11 if face == "A" else 10 if face in ("J", "Q", "K") else int(face)
+                  for face in Card.FACES)
+ACE_RANK = Card.FACES.index("A")
+PICTURE_RANKS = (Card.FACES.index("J"), Card.FACES.index("Q"), Card.FACES.index("K"))
+
+
+class BJHand:
+    """
+    A blackjack hand that keeps its value up to date as cards are
+    added, so nothing ever has to rescan the cards.
+
+    Aces count as 11 until that would bust the hand, then drop to 1.
+    The dealer's hand (dealer=True) scores its first 2 cards the same
+    way, but after that the dealer treats each new ace as 11 unless
+    doing so results in a bust, and never counts an ace back down.
+    """
+    __slots__ = ("cards", "total", "soft_aces", "dealer")
+
+    def __init__(self, cards=(), dealer=False):
+        self.dealer = dealer
+        self.clear()
+        self.add_cards(cards)
+
+    def clear(self):
+        self.cards = []
+        self.total = 0
+        # number of aces currently counted as 11
+        self.soft_aces = 0
+
+    def add(self, card):
+        """
+        Adds a Card to the hand and updates its value
+        """
+        value = BJ_VALUES[card.rank]
+        if self.dealer and len(self.cards) >= 2:
+            if card.rank == ACE_RANK and self.total + 11 > 21:
+                value = 1
+            self.total += value
+        else:
+            self.total += value
+            if card.rank == ACE_RANK:
+                self.soft_aces += 1
+            while self.total > 21 and self.soft_aces:
+                self.total -= 10
+                self.soft_aces -= 1
+        self.cards.append(card)
+
+    def add_cards(self, cards):
+        for card in cards:
+            self.add(card)
+
+    @property
+    def soft(self):
+        return self.soft_aces > 0
+
+    @property
+    def blackjack(self):
+        """
+        True for 21 on the first 2 cards
+        """
+        return self.total == 21 and len(self.cards) == 2
+
+    @property
+    def bust(self):
+        return self.total > 21
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __repr__(self):
+        return f"BJHand({self.cards}, total={self.total}, soft_aces={self.soft_aces})"
+
+
+def is_natural(card1, card2):
+    """
+    Returns True if the dealer's 2 cards count as a dealer blackjack.
+    Only an ace with a picture card does, a ten doesn't
+    """
+    return (card1.rank == ACE_RANK and card2.rank in PICTURE_RANKS or
+            card2.rank == ACE_RANK and card1.rank in PICTURE_RANKS)
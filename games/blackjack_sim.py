@@ -0,0 +1,225 @@
+"""Blackjack simulator
+
+Plays blackjack hands without Discord, using the same rules as
+BlackjackManager, so payouts can be tuned and rule changes checked by
+playing a few million hands instead of by hand:
+    1. The dealer gets an up card and a hidden card, then the player
+       gets 2 cards, all from a 6 deck shoe that is reshuffled between
+       rounds once the cut card comes out.
+    2. A dealer natural (an ace and a J, Q or K) ends the round and
+       every player loses their bet.
+    3. A player natural (21 on the first 2 cards) pays 2.5x straight
+       away. Otherwise the player hits until they stand, bust (paid 0x)
+       or reach 21.
+    4. The dealer draws until reaching 17, with the dealer's ace rule
+       (see BJHand), and a bust counts as 0.
+    5. Beating the dealer pays 2x, a tie gives the bet back (1x) and
+       losing pays 0x.
+
+How the player plays is up to a policy, see register_policy. Running
+this module plays a batch of hands across a process pool and prints a
+report:
+
+    python -m games.blackjack_sim [policy] [hands]
+"""
+import os
+import random
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from util import Shoe
+from games.blackjack import SHOE_DECKS
+from games.blackjack import SHOE_PENETRATION
+from games.blackjack_rules import BJHand
+from games.blackjack_rules import is_natural
+from games.blackjack_strategy import get_table
+
+# number of hands a worker plays per task
+BATCH_SIZE = 50000
+
+# the results of a run, every field after hands is an average per hand
+# ev: average chips won per chip bet
+# variance: variance of the chips won per chip bet
+# std_error: standard error of ev
+# win, push, loss: how often the player beat, tied or lost to the dealer
+# player_bust, dealer_bust: how often each side went over 21
+# blackjack, dealer_blackjack: how often each side was dealt a natural
+BlackjackReport = namedtuple("BlackjackReport",
+                             ("policy", "hands", "ev", "variance", "std_error",
+                              "win", "push", "loss", "player_bust", "dealer_bust",
+                              "blackjack", "dealer_blackjack"))
+
+# name -> policy function, see register_policy
+POLICIES = {}
+
+# indexes into the counts simulate returns
+(_HANDS, _NET, _NET_SQUARED, _WINS, _PUSHES, _LOSSES,
+ _PLAYER_BUSTS, _DEALER_BUSTS, _BLACKJACKS, _DEALER_BLACKJACKS) = range(10)
+
+
+def register_policy(name):
+    """
+    Decorator that adds a policy to POLICIES under name. A policy is a
+    function taking (hand value, number of aces counted as 11, dealer's
+    up card) that returns True to hit or False to stand. Policies are
+    looked up by name inside the worker processes, so they have to be
+    registered when their module is imported.
+    """
+    def register(policy):
+        POLICIES[name] = policy
+        return policy
+    return register
+
+
+@register_policy("stand")
+def stand_policy(hand_value, eleven_aces, dealer_card):
+    """
+    Never hits
+    """
+    return False
+
+
+@register_policy("dealer")
+def dealer_policy(hand_value, eleven_aces, dealer_card):
+    """
+    Plays like the dealer, hitting below 17
+    """
+    return hand_value < 17
+
+
+@register_policy("never_bust")
+def never_bust_policy(hand_value, eleven_aces, dealer_card):
+    """
+    Only hits when the next card can't bust the hand
+    """
+    return hand_value <= 11 or eleven_aces > 0 and hand_value < 18
+
+
+@register_policy("basic")
+def basic_policy(hand_value, eleven_aces, dealer_card):
+    """
+    Follows the basic strategy table, see blackjack_strategy
+    """
+    return get_table().should_hit(hand_value, eleven_aces > 0, dealer_card.rank)
+
+
+def play_hand(shoe, policy, counts):
+    """
+    Plays one round for a single player betting 1 chip and adds the
+    result to counts. Returns the player's payout multiplier
+    """
+    dealer_card = shoe.draw(1)[0]
+    hidden_card = shoe.draw(1)[0]
+    hand = BJHand(shoe.draw(2))
+    counts[_HANDS] += 1
+
+    if is_natural(dealer_card, hidden_card):
+        counts[_DEALER_BLACKJACKS] += 1
+        counts[_LOSSES] += 1
+        counts[_NET] -= 1
+        counts[_NET_SQUARED] += 1
+        return 0
+
+    if hand.blackjack:
+        multiplier = 2.5
+        counts[_BLACKJACKS] += 1
+    else:
+        multiplier = 1
+        while hand.total < 21 and policy(hand.total, hand.soft_aces, dealer_card):
+            hand.add(shoe.draw(1)[0])
+        if hand.bust:
+            multiplier = 0
+            counts[_PLAYER_BUSTS] += 1
+
+    # the dealer draws even if the player has already bust or got a
+    # natural, same as in the game
+    dealer_hand = BJHand((dealer_card, hidden_card), dealer=True)
+    while dealer_hand.total < 17:
+        dealer_hand.add(shoe.draw(1)[0])
+    dealer_value = dealer_hand.total
+    if dealer_hand.bust:
+        counts[_DEALER_BUSTS] += 1
+        dealer_value = 0
+
+    if multiplier == 1:
+        if hand.total > dealer_value:
+            multiplier = 2
+        elif hand.total < dealer_value:
+            multiplier = 0
+    if multiplier == 1:
+        counts[_PUSHES] += 1
+    elif multiplier == 0:
+        counts[_LOSSES] += 1
+    else:
+        counts[_WINS] += 1
+    net = multiplier - 1
+    counts[_NET] += net
+    counts[_NET_SQUARED] += net * net
+    return multiplier
+
+
+def simulate(policy_name, hands, seed):
+    """
+    Plays hands rounds with the named policy from a fresh shoe and
+    returns the list of counts. Runs inside the worker processes, so
+    it has to stay a module level function.
+    """
+    random.seed(seed)
+    policy = POLICIES[policy_name]
+    shoe = Shoe(decks=SHOE_DECKS, penetration=SHOE_PENETRATION)
+    shoe.shuffle()
+    counts = [0] * 10
+    for _ in range(hands):
+        # reshuffle between rounds once the cut card has come out
+        if shoe.needs_shuffle():
+            shoe.shuffle()
+        shoe.start_round()
+        play_hand(shoe, policy, counts)
+    return counts
+
+
+def make_report(policy_name, counts):
+    """
+    Turns summed counts into a BlackjackReport
+    """
+    hands = counts[_HANDS]
+    ev = counts[_NET] / hands
+    variance = counts[_NET_SQUARED] / hands - ev * ev
+    return BlackjackReport(policy_name, hands, ev, variance, (variance / hands) ** 0.5,
+                           counts[_WINS] / hands, counts[_PUSHES] / hands,
+                           counts[_LOSSES] / hands, counts[_PLAYER_BUSTS] / hands,
+                           counts[_DEALER_BUSTS] / hands, counts[_BLACKJACKS] / hands,
+                           counts[_DEALER_BLACKJACKS] / hands)
+
+
+def run(policy_name, hands, workers=None, batch_size=BATCH_SIZE):
+    """
+    Plays hands rounds with the named policy across a process pool and
+    returns a BlackjackReport
+    """
+    if policy_name not in POLICIES:
+        raise ValueError(f"Unknown policy {policy_name}, "
+                         f"pick one of {', '.join(sorted(POLICIES))}")
+    batches = [batch_size] * (hands // batch_size)
+    if hands % batch_size:
+        batches.append(hands % batch_size)
+    seed = random.getrandbits(32)
+    totals = [0] * 10
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        jobs = [executor.submit(simulate, policy_name, batch, seed + index)
+                for (index, batch) in enumerate(batches)]
+        for job in jobs:
+            for (index, count) in enumerate(job.result()):
+                totals[index] += count
+    return make_report(policy_name, totals)
+
+
+if __name__ == "__main__":
+    report = run(sys.argv[1] if len(sys.argv) > 1 else "dealer",
+                 int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    print(f"Policy {report.policy}, {report.hands} hands")
+    print(f"EV per chip bet: {report.ev:+.4f} (+/- {report.std_error:.4f}), "
+          f"variance {report.variance:.4f}")
+    print(f"Win {report.win:.2%}, push {report.push:.2%}, loss {report.loss:.2%}")
+    print(f"Player bust {report.player_bust:.2%}, dealer bust {report.dealer_bust:.2%}")
+    print(f"Blackjack {report.blackjack:.2%}, dealer blackjack {report.dealer_blackjack:.2%}")
@@ -0,0 +1,151 @@
+"""Blackjack basic strategy
+
+Works out whether hitting or standing is better for every player hand
+(total and whether an ace is still counted as 11) against every dealer
+up card, under this bot's rules (see blackjack_sim). Cards are assumed
+to come from an infinite shoe, so the answer doesn't depend on which
+cards have already been dealt. The dealer's side comes from
+blackjack_dealer.
+
+The table is worked out by dynamic programming. Running this module
+builds it and writes it to STRATEGY_PATH:
+
+    python -m games.blackjack_strategy
+
+get_table loads it from there the first time it's needed, or works it
+out in memory if it hasn't been built, after which a decision is a
+single lookup. Used by the Hint button and the "basic" simulator policy.
+"""
+import logging
+import os
+import struct
+from functools import lru_cache
+from games.blackjack_rules import BJ_VALUES
+from games.blackjack_dealer import TOTALS
+from games.blackjack_dealer import dealer_distribution
+from games.blackjack_dealer import stand_ev
+
+STRATEGY_PATH = "configs/blackjack_strategy.bin"
+# magic, version
+_HEADER = struct.Struct("<4sH")
+_MAGIC = b"BJBS"
+_VERSION = 1
+# the table has an entry for every total 0-21, hard or soft, against
+# every up card rank
+_RANKS = len(BJ_VALUES)
+
+STAND = 0
+HIT = 1
+ACTION_NAMES = ("Stand", "Hit")
+
+# StrategyTable handed out by get_table, None until it's first asked for
+_table = None
+
+
+def add_card(total, soft, value):
+    """
+    Adds a card worth value (11 for an ace) to a player's hand and
+    returns the new (total, soft), counting an ace as 1 when 11 would bust
+    """
+    total += value
+    aces = soft + (value == 11)
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return (total, aces > 0)
+
+
+def build_table():
+    """
+    Works out the best action for every (total, soft, up card rank).
+    Returns a bytes object of HIT and STAND, see StrategyTable
+    """
+    table = bytearray(TOTALS * 2 * _RANKS)
+    for up_rank in range(_RANKS):
+        finals = dealer_distribution(up_rank)
+
+        @lru_cache(maxsize=None)
+        def best_ev(total, soft):
+            """
+            Chips won per chip bet playing the best way from (total, soft)
+            """
+            if total > 21:
+                return -1.0
+            if total == 21:
+                # the game stands players on 21 automatically
+                return stand_ev(21, finals)
+            return max(stand_ev(total, finals), hit_ev(total, soft))
+
+        def hit_ev(total, soft):
+            return sum(best_ev(*add_card(total, soft, value)) for value in BJ_VALUES) / _RANKS
+
+        for total in range(4, 21):
+            for soft in (False, True):
+                if hit_ev(total, soft) > stand_ev(total, finals):
+                    table[(total * 2 + soft) * _RANKS + up_rank] = HIT
+    return bytes(table)
+
+
+class StrategyTable:
+    """
+    Basic strategy lookups
+    """
+    def __init__(self, table):
+        self.table = table
+
+    def action(self, total, soft, up_rank):
+        """
+        HIT or STAND for a hand worth total (soft if an ace in it is
+        still counted as 11) against the dealer's up card rank
+        """
+        if total >= 21:
+            return STAND
+        return self.table[(total * 2 + bool(soft)) * _RANKS + up_rank]
+
+    def should_hit(self, total, soft, up_rank):
+        return self.action(total, soft, up_rank) == HIT
+
+
+def load_table(path=STRATEGY_PATH):
+    """
+    Loads the table from path. Returns None if it hasn't been built or
+    was built by an older version
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        data = file.read()
+    (magic, version) = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        logging.info("Ignoring out of date blackjack strategy table at %s", path)
+        return None
+    return StrategyTable(data[_HEADER.size:])
+
+
+def save_table(path=STRATEGY_PATH):
+    """
+    Works out the table and writes it to path
+    """
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION) + build_table())
+
+
+def get_table():
+    """
+    Returns the StrategyTable, loading it the first time it's asked for.
+    If it hasn't been built, it's worked out in memory instead (which
+    takes around a hundredth of a second) and nothing is written
+    """
+    global _table
+    if _table is None:
+        table = load_table()
+        if table is None:
+            logging.info("No blackjack strategy table at %s, working it out", STRATEGY_PATH)
+            table = StrategyTable(build_table())
+        _table = table
+    return _table
+
+
+if __name__ == "__main__":
+    save_table()
+    print(f"Blackjack strategy table written to {STRATEGY_PATH}")
@@ -8,6 +8,10 @@ with the game at any time, and there is no player management.
 import discord
 from games.game import BaseGame
 from games.game import GameManager
+from games.router import RoutedView
+from games.timers import TimedView
+from games.timers import expire_response
+from util import respond
 
 
 class CounterGame(BaseGame):
@@ -20,6 +24,12 @@ class CounterGame(BaseGame):
         # data specific to this game (counter) defined here
         self.count = 0
 
+    def snapshot(self):
+        return {"count": self.count}
+
+    def restore(self, data):
+        self.count = data["count"]
+
 
 class CounterManager(GameManager):
     """
@@ -43,8 +53,7 @@ class CounterManager(GameManager):
         self.game.count += 1
         # send a secret message to the person who pressed this button. This message auto-deletes
         # after 10 seconds (doesn't need to be around for much longer)
-        await interaction.response.send_message("You've hit it!", ephemeral = True,
-                                                delete_after = 10)
+        await respond(interaction, "You've hit it!", delete_after=10, ephemeral = True)
         # resend the base menu with the updated game state
         await self.resend(interaction)
 
@@ -59,13 +68,12 @@ class CounterManager(GameManager):
         self.game.count -= 1
         # send a secret message to the person who pressed this button. This message auto-deletes
         # after 10 seconds (doesn't need to be around for much longer)
-        await interaction.response.send_message("You've missed it!", ephemeral = True,
-                                                delete_after = 10)
+        await respond(interaction, "You've missed it!", delete_after=10, ephemeral = True)
         # resend the base menu with the updated game state
         await self.resend(interaction)
 
 
-class HitOrMiss(discord.ui.View):
+class HitOrMiss(TimedView):
     """
     Button group used on the private message that users use to increment and decrement
     the counter for the game.
@@ -73,6 +81,7 @@ class HitOrMiss(discord.ui.View):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        manager.views.add(self)
 
     @discord.ui.button(label = "Hit Me!", style = discord.ButtonStyle.green)
     async def hit_me(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -84,7 +93,7 @@ class HitOrMiss(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop accepting interactions for this message
         self.stop()
-        await self.manager.increment(interaction)
+        await self.manager.submit(interaction, self.manager.increment, interaction)
 
     @discord.ui.button(label = "Miss Me!", style = discord.ButtonStyle.red)
     async def miss_me(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -96,10 +105,10 @@ class HitOrMiss(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop accepting interactions for this message
         self.stop()
-        await self.manager.decrement(interaction)
+        await self.manager.submit(interaction, self.manager.decrement, interaction)
 
 
-class CounterButtonsBase(discord.ui.View):
+class CounterButtonsBase(RoutedView):
     """
     Base menu button group for the counter game.
     """
@@ -107,7 +116,7 @@ class CounterButtonsBase(discord.ui.View):
         super().__init__()
         self.manager = manager
 
-    @discord.ui.button(label = "Hit or Miss", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Hit or Miss", style = discord.ButtonStyle.green, custom_id = "hit_miss")
     async def hit_miss(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Send an ephemeral message to the person who interacted with
@@ -120,14 +129,16 @@ class CounterButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         view = HitOrMiss(self.manager)
-        await interaction.response.send_message("Hit or Miss?", view = view, ephemeral = True,
-                                                delete_after = 60)
+        await interaction.response.send_message("Hit or Miss?", view = view, ephemeral = True)
+        view.start_timer()
+        expiry = expire_response(interaction, 60)
         # wait for the view to call self.stop() before we move beyond this point
         await view.wait()
         # delete the response to the hit or miss button press (the HitOrMiss UI message)
+        expiry.cancel()
         await interaction.delete_original_response()
 
-    @discord.ui.button(label = "Refresh", style = discord.ButtonStyle.blurple)
+    @discord.ui.button(label = "Refresh", style = discord.ButtonStyle.blurple, custom_id = "ref")
     async def ref(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Edit the current active menu to accurately represent the
@@ -140,10 +151,10 @@ class CounterButtonsBase(discord.ui.View):
         await self.manager.refresh(interaction)
         # send a secret message to the person who pressed this button. This message auto-deletes
         # after 10 seconds (doesn't need to be around for much longer)
-        await interaction.response.send_message("Refreshing the counter...", ephemeral = True,
-                                                delete_after = 10)
+        await interaction.response.send_message("Refreshing the counter...", ephemeral = True)
+        expire_response(interaction, 10)
 
-    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red)
+    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red, custom_id = "quit")
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Quit the game
@@ -152,4 +163,4 @@ class CounterButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # ask our manager to quit this game
-        await self.manager.quit_game(interaction)
+        await self.manager.submit(interaction, self.manager.quit_game, interaction)
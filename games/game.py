@@ -4,10 +4,22 @@ Defines abstract classes for the model and manager which are used to
 control basic things that exist for all game types, such as starting,
 players joining/leaving, ending the game, etc
 """
+import asyncio
 import logging
+import time
+import weakref
 import discord
+from games.outbox import Outbox
+from util import respond
 from util import send_info_message
 
+# most commands a game holds on to while its actor is busy, anything
+# past this is turned away straight away, see GameManager.submit
+ACTOR_QUEUE_SIZE = 8
+# seconds a base menu render waits for more changes before it goes out,
+# see GameManager.request_render
+RENDER_DELAY = 0.25
+
 class BasePlayer():
     """
     Generic player data class
@@ -21,6 +33,38 @@ class BasePlayer():
         """
         return ""
 
+    def snapshot(self, refund_bets=False):
+        """
+        Returns a dict of what should be kept about this player if the
+        bot restarts, see GameManager.snapshot. refund_bets is set when
+        a round is cut short, so any chips bet in it go back to the player
+        """
+        return {}
+
+    def restore(self, data):
+        """
+        Load what snapshot saved
+        """
+
+
+class CpuUser():
+    """
+    Stands in for a discord user in a game's player data and turn order
+    when the seat is played by the bot. Only has the attributes that
+    the games actually use.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.display_name = name
+        self.mention = f"**{name}**"
+        self.bot = True
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<CpuUser name={self.name}>"
+
 
 class BaseGame():
     """
@@ -75,6 +119,25 @@ class BaseGame():
         """
         return None
 
+    def bets_outstanding(self):
+        """
+        Returns True if players have chips bet on a round that hasn't
+        been paid out yet
+        """
+        return False
+
+    def snapshot(self):
+        """
+        Returns a dict of what should be kept about the game itself
+        (not its players) if the bot restarts, see GameManager.snapshot
+        """
+        return {}
+
+    def restore(self, data):
+        """
+        Load what snapshot saved
+        """
+
     def get_debug_str(self):
         """
         Returns a string with all members of the class for debug
@@ -94,21 +157,189 @@ class GameManager():
     management, etc. Should be subclassed by each game type's manager class.
     Methods can (and should) be overridden but be careful when doing so as to not
     break the default flow of all games
+
+    Every game has an actor: a queue of commands that are run one at a time, so
+    button presses that change the game can't interleave at their awaits. Buttons
+    go through submit, flows that wait on players (hit or stand menus, "play
+    again?" prompts) run outside the actor through spawn and go through call for
+    the steps that change the game. Commands should never wait on a player
+    themselves, or they hold up everyone else's input while they wait.
+
+    Discord wants an answer to an interaction within 3 seconds. When submit
+    can't run a command straight away because the actor is busy, it defers
+    the interaction first, so commands have to answer through util.respond
+    (or send_info_message), which sends a followup once an interaction has
+    been deferred.
+
+    The base menu is rendered in the background: refresh and resend only ask
+    for a render, and everything asked for within RENDER_DELAY goes out as
+    one message edit (or send) showing the game as it is by then. Messages for
+    the channel go through the game's outbox (see games.outbox), use announce
+    for anything nobody has to interact with.
+
+    Base menus are RoutedViews (see games.router): their buttons are routed
+    to by custom_id through route instead of being kept live by discord.py.
     """
     def __init__(self, game, base_gui, channel, factory):
         # hold the game model that this manager needs to manage (pass constructor to
         # subclass of BaseGame for that game)
         self.game = game
-        # default button layout that the bot can use to construct the base menu at any time
-        self.base_gui = base_gui
         # ID of the channel that this game is taking place in
         self.channel = channel
+        # goes up every time base_gui is swapped, so buttons from older menus can be
+        # told apart
+        self.menu_version = 0
+        # default button layout that the bot can use to construct the base menu at any time
+        self.base_gui = base_gui
+        # every message sent into the channel goes through here
+        self.outbox = Outbox(channel)
         # reference to the GameFactory class, needed to remove the game from the active games
         # dict upon the game ending
         self.factory = factory
         # reference to the message that currently contains the base menu. Needed so that the
         # bot can remove the buttons from it or edit its contents at any time
         self.current_active_menu = None
+        # (command, args, future) waiting for the actor
+        self.commands = asyncio.Queue(maxsize=ACTOR_QUEUE_SIZE)
+        # task running the actor, None while there's nothing queued
+        self.actor = None
+        # flows started by spawn, kept here so they don't get garbage collected
+        self.flows = set()
+        # whether a render (and whether a resend) has been asked for, see
+        # request_render
+        self.render_pending = False
+        self.resend_pending = False
+        # task waiting to render, None while there's nothing to render
+        self.renderer = None
+        # renders edit and replace current_active_menu, one at a time
+        self.render_lock = asyncio.Lock()
+        # (content, view, components) the active menu was last rendered
+        # with, so renders that wouldn't change anything can be skipped
+        self.rendered = None
+        # time.monotonic() of the last thing anyone did in this game, the
+        # factory closes games that sit idle for too long
+        self.last_activity = time.monotonic()
+        # views (other than the base menu) that are still taking input, views
+        # that belong to a game add themselves here so they can be stopped
+        # when it closes
+        self.views = weakref.WeakSet()
+
+    @property
+    def base_gui(self):
+        return self._base_gui
+
+    @base_gui.setter
+    def base_gui(self, view):
+        self.menu_version += 1
+        if view is not None:
+            view.route(self.channel.id, self.menu_version)
+        self._base_gui = view
+
+    async def route(self, interaction, version, action):
+        """
+        Handle a press of the action button on version of the base menu,
+        see games.router
+        """
+        self.touch()
+        view = self.base_gui
+        if view is None or version != self.menu_version or action not in view.routes:
+            self.quick_log(f"Turned away {action} press on menu version {version}", interaction)
+            await send_info_message("That menu is out of date, use the latest one.", interaction)
+            return
+        await view.routes[action].callback(interaction)
+
+    async def submit(self, interaction, command, *args):
+        """
+        Queue command(*args) on this game's actor for the user input in
+        interaction, and wait for it to run. Returns what command returns.
+        If too much is already queued, the user is told to try again and
+        None is returned instead. If the actor is busy, interaction is
+        deferred while the command waits its turn, see the class docstring
+        """
+        self.touch()
+        if asyncio.current_task() is self.actor:
+            return await command(*args)
+        if self.actor is not None and not self.commands.full() \
+        and not interaction.response.is_done():
+            # something is already running, so this might not be answered in
+            # time. Deferred before it's queued so the command can't answer
+            # it at the same time
+            self.quick_log("Deferring interaction (actor busy)", interaction)
+            await interaction.response.defer()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.commands.put_nowait((command, args, future))
+        except asyncio.QueueFull:
+            self.quick_log("Rejected interaction (actor busy)", interaction, logging.INFO)
+            await send_info_message("This game is busy, try again in a moment.", interaction)
+            return None
+        self.start_actor()
+        return await future
+
+    async def call(self, command, *args):
+        """
+        Same as submit, for flows rather than user input: waits for room
+        in the queue instead of turning the command away
+        """
+        self.touch()
+        if asyncio.current_task() is self.actor:
+            return await command(*args)
+        future = asyncio.get_running_loop().create_future()
+        await self.commands.put((command, args, future))
+        self.start_actor()
+        return await future
+
+    def touch(self):
+        """
+        Note that something just happened in this game
+        """
+        self.last_activity = time.monotonic()
+
+    def idle_time(self):
+        """
+        Seconds since anything happened in this game
+        """
+        return time.monotonic() - self.last_activity
+
+    def start_actor(self):
+        if self.actor is None:
+            self.actor = asyncio.create_task(self.run_actor())
+
+    async def run_actor(self):
+        """
+        Runs queued commands one at a time until the queue is empty
+        """
+        while not self.commands.empty():
+            (command, args, future) = self.commands.get_nowait()
+            # whoever queued it isn't waiting any more
+            if future.cancelled():
+                continue
+            try:
+                result = await command(*args)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(result)
+        self.actor = None
+        # everything that was queued has happened, keep a copy of the result
+        self.save()
+
+    def spawn(self, coroutine):
+        """
+        Run a flow that waits on players in the background, outside the
+        actor. Exceptions are logged since nobody awaits the flow
+        """
+        task = asyncio.create_task(coroutine)
+        self.flows.add(task)
+        task.add_done_callback(self.flow_done)
+        return task
+
+    def flow_done(self, task):
+        self.flows.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.quick_log(f"Flow failed: {task.exception()!r}", level=logging.ERROR)
 
     async def create_game(self, interaction):
         """
@@ -123,6 +354,7 @@ class GameManager():
         # set our base menu message to the message that the interaction (ie the slash command
         # that started the game) was responded with (the base menu created by this interaction)
         self.current_active_menu = await interaction.original_response()
+        self.rendered = self.get_render()
 
     async def refresh(self, interaction):
         """
@@ -132,10 +364,7 @@ class GameManager():
         # check to make sure the game hasn't ended, do nothing if it has
         if await self.game_end_check(interaction):
             return
-
-        await self.current_active_menu.edit(content=self.get_base_menu_string(),
-                                            view=self.base_gui)
-        self.quick_log("Base menu refreshed")
+        self.request_render()
 
     async def resend(self, interaction):
         """
@@ -145,14 +374,80 @@ class GameManager():
         # check to make sure the game hasn't ended, do nothing if it has
         if await self.game_end_check(interaction):
             return
-
-        # removes the view (which contains the buttons) from the current active base menu
-        await self.current_active_menu.edit(view=None)
-        # InteractionMessage inherits from Message so we can access the channel attribute to
-        # send a new base menu into
-        self.current_active_menu = await self.channel.send(self.get_base_menu_string(),
-                                                           view=self.base_gui, silent=True)
-        self.quick_log("Base menu resent")
+        self.request_render(resend=True)
+
+    def request_render(self, resend=False):
+        """
+        Ask for the base menu to be brought up to date. The render waits
+        RENDER_DELAY for anything else to change and then goes out once.
+        resend asks for the menu to be moved to the bottom of the channel,
+        which is still done with an edit if nothing was posted after it
+        """
+        self.render_pending = True
+        self.resend_pending = self.resend_pending or resend
+        if self.renderer is None:
+            self.renderer = asyncio.create_task(self.run_renderer())
+
+    async def render_now(self, resend=False):
+        """
+        Render the base menu straight away, along with anything already
+        asked for. Use this when the menu has to show up before whatever
+        is sent next
+        """
+        self.render_pending = True
+        self.resend_pending = self.resend_pending or resend
+        await self.render()
+
+    async def run_renderer(self):
+        try:
+            while self.render_pending:
+                await asyncio.sleep(RENDER_DELAY)
+                await self.render()
+        except discord.HTTPException as exc:
+            self.quick_log(f"Base menu render failed: {exc!r}", level=logging.ERROR)
+        finally:
+            self.renderer = None
+
+    def get_render(self):
+        """
+        Returns (content, view, components) for the base menu as the game
+        is now
+        """
+        view = self.base_gui
+        return (self.get_base_menu_string(), view,
+                view.to_components() if view is not None else None)
+
+    async def render(self):
+        """
+        Bring the base menu up to date if a render has been asked for
+        """
+        async with self.render_lock:
+            if not self.render_pending:
+                return
+            resend = self.resend_pending
+            self.render_pending = False
+            self.resend_pending = False
+            # nothing to show once the game is over
+            if self.game.has_ended() or self.current_active_menu is None:
+                return
+            rendered = self.get_render()
+            (content, view, _) = rendered
+            # a menu that's still the last message in the channel is already at
+            # the bottom, so it can be edited instead of resent
+            if resend and getattr(self.channel, "last_message_id",
+                                  None) != self.current_active_menu.id:
+                # removes the view (which contains the buttons) from the current active
+                # base menu
+                await self.current_active_menu.edit(view=None)
+                self.current_active_menu = await self.outbox.send(content, view=view,
+                                                                  silent=True)
+                self.quick_log("Base menu resent")
+            elif rendered != self.rendered:
+                await self.current_active_menu.edit(content=content, view=view)
+                self.quick_log("Base menu refreshed")
+            else:
+                self.quick_log("Base menu render skipped (unchanged)")
+            self.rendered = rendered
 
     async def quit_game(self, interaction):
         """
@@ -166,9 +461,147 @@ class GameManager():
 
         self.quick_log("Initiating game end process")
         self.game.game_state = -1
+        self.close()
         await self.current_active_menu.edit(view=None)
         await self.factory.stop_game(self.channel.id)
-        # now we just pray that python's garbage collection notices this
+
+    async def close_idle(self):
+        """
+        End the game because nobody has played it in a while, see
+        GameFactory.reap_idle_games
+        """
+        if self.game.has_ended():
+            return
+        self.quick_log("Closing idle game", level=logging.INFO)
+        self.game.game_state = -1
+        self.close()
+        try:
+            if self.current_active_menu is not None:
+                await self.current_active_menu.edit(view=None)
+            await self.announce("This game was closed since nobody has played it in a while.")
+        except discord.HTTPException as exc:
+            self.quick_log(f"Couldn't clean up idle game: {exc!r}", level=logging.WARNING)
+        await self.factory.stop_game(self.channel.id)
+
+    def close(self):
+        """
+        Let go of everything still running for a game that has ended, so
+        nothing keeps it alive once the factory drops it. Stopping its views
+        wakes up the flows waiting on them, which see the game has ended and
+        finish (cleaning up their messages on the way out)
+        """
+        for view in list(self.views):
+            view.stop()
+        self.render_pending = False
+        if self.renderer is not None and self.renderer is not asyncio.current_task():
+            self.renderer.cancel()
+
+    def get_options(self):
+        """
+        Returns a dict of the options the game was started with, passed
+        back to GameFactory.make_manager when the game is restored
+        """
+        return {}
+
+    def new_player(self):
+        """
+        Returns player data for a new player. Override for games that
+        have their own player class
+        """
+        return BasePlayer()
+
+    def seat_player(self, user, player_data):
+        """
+        Sit a player down at the table without going through the join
+        button, used when restoring a game
+        """
+        self.game.players += 1
+        self.game.player_data[user] = player_data
+
+    def snapshot(self):
+        """
+        Returns a dict that can be turned into JSON and that holds
+        everything needed to bring this game back after the bot
+        restarts. Games come back in their lobby with the same players
+        at the table (and the chips they had), a round in progress is
+        not kept and anything bet on it is refunded.
+        players is a list of [user id, name, player snapshot]. The user id
+        is None for CPU players, who are matched by name instead
+        """
+        refund_bets = self.game.bets_outstanding()
+        # the restored game's lobby keeps the menu version if the game is in its
+        # lobby now, so the buttons already on the menu keep working
+        lobby = self.game.game_state in (0, 1)
+        return {"type": self.game.game_type,
+                "options": self.get_options(),
+                "menu_version": self.menu_version if lobby else self.menu_version + 1,
+                "menu_id": (self.current_active_menu.id
+                            if self.current_active_menu is not None else None),
+                "game": self.game.snapshot(),
+                "players": [[None if isinstance(user, CpuUser) else user.id, str(user),
+                             player_data.snapshot(refund_bets)]
+                            for (user, player_data) in (self.game.player_data or {}).items()]}
+
+    def restore(self, snapshot, users):
+        """
+        Load a snapshot into this (freshly made) game. users maps the
+        user ids in the snapshot to discord users, players who couldn't
+        be found are left out
+        """
+        self.game.restore(snapshot["game"])
+        self.menu_version = snapshot.get("menu_version", self.menu_version)
+        self.base_gui.route(self.channel.id, self.menu_version)
+        cpus = {str(user): user for user in self.game.player_data if isinstance(user, CpuUser)}
+        for (user_id, name, data) in snapshot["players"]:
+            if user_id is None:
+                if name in cpus:
+                    self.game.player_data[cpus[name]].restore(data)
+                continue
+            user = users.get(user_id)
+            if user is None:
+                continue
+            player_data = self.new_player()
+            player_data.restore(data)
+            self.seat_player(user, player_data)
+
+    def save(self):
+        """
+        Ask the factory to store a snapshot of this game
+        """
+        if self.factory is not None and not self.game.has_ended():
+            self.factory.save_game(self)
+
+    async def restore_base_menu(self, menu_id):
+        """
+        Bring back the base menu of a restored game: the menu message from
+        before the restart is reused if it's still there (and still the
+        last message in the channel), otherwise a new one is sent
+        """
+        if menu_id is not None:
+            self.current_active_menu = self.channel.get_partial_message(menu_id)
+            try:
+                await self.render_now(resend=True)
+                return
+            except discord.HTTPException:
+                self.quick_log("Saved base menu is gone, sending a new one")
+        await self.post_base_menu()
+
+    async def post_base_menu(self):
+        """
+        Send the base menu into the channel without an interaction to
+        respond to
+        """
+        self.rendered = self.get_render()
+        self.current_active_menu = await self.outbox.send(self.rendered[0],
+                                                          view=self.base_gui, silent=True)
+
+    async def announce(self, announcement, delete_after=None):
+        """
+        Send announcement to everyone in the channel. It's merged with any
+        other announcements waiting to go out, and this only waits if the
+        outbox is full
+        """
+        await self.outbox.announce(announcement, delete_after)
 
     def get_base_menu_string(self):
         """
@@ -208,8 +641,7 @@ class GameManager():
         it does not use the interaction.
         """
         if interaction.user not in self.game.player_data:
-            await interaction.response.send_message("You are not in this game.",
-                                                    ephemeral=True, delete_after=10)
+            await send_info_message("You are not in this game.", interaction)
             return False
         return True
 
@@ -234,8 +666,7 @@ class GameManager():
             else:
                 self.game.players += 1
                 self.game.player_data[interaction.user] = init_player_data
-                await interaction.response.send_message((f"{interaction.user.mention} "
-                                                         "joined the game!"))
+                await respond(interaction, f"{interaction.user.mention} joined the game!")
                 self.quick_log("Joined game successfully", interaction)
 
         else:
@@ -263,8 +694,7 @@ class GameManager():
         elif self.game.game_state in (1, 3):
             self.game.players -= 1
             self.game.player_data.pop(interaction.user)
-            await interaction.response.send_message((f"{interaction.user.mention} "
-                                                    "left the game!"))
+            await respond(interaction, f"{interaction.user.mention} left the game!")
             self.quick_log("Left game successfully", interaction)
 
         else:
@@ -334,6 +764,7 @@ class GameManager():
         """
         return ("Base manager:\n"
                 f"\tbase_gui: {self.base_gui}\n"
+                f"\tidle for: {self.idle_time():.0f}s\n"
                 f"\tchannel id: {self.channel.id}\n" + self.game.get_debug_str())
 
     def quick_log(self, content, interaction=None, level=logging.DEBUG):
@@ -1,13 +1,26 @@
 """Contains the factory that manages all active games.
 """
+import asyncio
 import logging
 import datetime
+import discord
 from games.counter import CounterManager
 from games.blackjack import BlackjackManager
 from games.poker import PokerManager
 from games.uno import UnoManager
+from games.router import parse_custom_id
 from util import send_info_message
 
+# most games that can run at once
+MAX_GAMES = 500
+# seconds a game can sit without anyone playing it before it's closed
+IDLE_TIMEOUT = 30 * 60
+# seconds between checks for idle games
+REAP_INTERVAL = 60
+# once MAX_GAMES are running, a new game can still start by closing the
+# game that's been idle longest, as long as it's been idle this many seconds
+EVICT_IDLE_TIME = 5 * 60
+
 
 class GameFactory():
     """
@@ -15,10 +28,16 @@ class GameFactory():
     manages all active games. This class should not use any mutator methods in the manager classes
     except for create_game.
     """
-    def __init__(self):
+    def __init__(self, store=None, max_games=MAX_GAMES, idle_timeout=IDLE_TIMEOUT):
         self.active_games = {}
+        # GameStore that active games are saved to, None to not save them
+        self.store = store
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        # task closing idle games, see start_reaper
+        self.reaper = None
 
-    async def start_game(self, interaction, game_type, cpus=0):
+    async def start_game(self, interaction, game_type, cpus=0, simultaneous=False):
         """
         Starts a game specified by the ID of game_type.
 
@@ -36,36 +55,180 @@ class GameFactory():
             await interaction.response.send_message(content="A game has already"
                                                     + " been started in this channel.",
                                                     ephemeral = True)
+            return
+        if not await self.make_room(interaction):
+            return
+
+        manager = self.make_manager(game_type, interaction.channel, cpus, simultaneous)
+        self.active_games[interaction.channel_id] = manager
+        await manager.create_game(interaction)
+        self.save_game(manager)
+
+    async def make_room(self, interaction):
+        """
+        Admission control for new games. Returns True if another game can
+        start. Once max_games are running, the game that's been idle the
+        longest is closed to make room if it's been idle for at least
+        EVICT_IDLE_TIME, otherwise the new game is turned away
+        """
+        if len(self.active_games) < self.max_games:
+            return True
+        idlest = max(self.active_games.values(), key=lambda game: game.idle_time())
+        if idlest.idle_time() >= EVICT_IDLE_TIME:
+            await idlest.close_idle()
+            return True
+        logging.warning("Turned away new game in channel [%i], %i games running",
+                        interaction.channel_id, len(self.active_games))
+        await send_info_message("Too many games are running right now, try again in a bit.",
+                                interaction)
+        return False
+
+    def start_reaper(self):
+        """
+        Start closing games that have been idle for longer than
+        idle_timeout
+        """
+        if self.reaper is None:
+            self.reaper = asyncio.create_task(self.run_reaper())
+
+    async def run_reaper(self):
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            await self.reap_idle_games()
 
+    async def reap_idle_games(self):
+        """
+        Close every game that has been idle for longer than idle_timeout.
+        Returns how many were closed
+        """
+        idle = [game for game in self.active_games.values()
+                if game.idle_time() >= self.idle_timeout]
+        for game in idle:
+            try:
+                await game.close_idle()
+            except Exception:
+                logging.exception("[%i] Couldn't close idle game", game.channel.id)
+                # don't hold on to it either way
+                self.active_games.pop(game.channel.id, None)
+        if idle:
+            logging.info("Closed %i idle game(s), %i still running", len(idle),
+                         len(self.active_games))
+        return len(idle)
+
+    def make_manager(self, game_type, channel, cpus=0, simultaneous=False):
+        """
+        Makes the manager for a new game of game_type (see start_game)
+        in channel
+        """
         if game_type == 0:
-            logging.info("New counter game created in channel: [%i]", interaction.channel_id)
-            new_game = CounterManager(self, interaction.channel)
-            self.active_games[interaction.channel_id] = new_game
-            await new_game.create_game(interaction)
-
-        elif game_type == 1:
-            logging.info("New blackjack game created in channel: [%i]", interaction.channel_id)
-            new_game = BlackjackManager(self, interaction.channel)
-            self.active_games[interaction.channel_id] = new_game
-            await new_game.create_game(interaction)
-
-        elif game_type == 2:
-            logging.info("New poker game created in channel: [%i]", interaction.channel_id)
-            new_game = PokerManager(self, interaction.channel, cpus)
-            self.active_games[interaction.channel_id] = new_game
-            await new_game.create_game(interaction)
-
-        elif game_type == 3:
-            logging.info("New uno game created in channel: [%i]", interaction.channel_id)
-            new_game = UnoManager(self, interaction.channel)
-            self.active_games[interaction.channel_id] = new_game
-            await new_game.create_game(interaction)
+            logging.info("New counter game created in channel: [%i]", channel.id)
+            return CounterManager(self, channel)
 
-        else:
-            logging.error("Error: unknown game type creation attempted in channel [%i]",
-                          interaction.channel_id)
-            raise ValueError("Unrecognized game type")
+        if game_type == 1:
+            logging.info("New blackjack game created in channel: [%i]", channel.id)
+            return BlackjackManager(self, channel, simultaneous)
+
+        if game_type == 2:
+            logging.info("New poker game created in channel: [%i]", channel.id)
+            return PokerManager(self, channel, cpus)
+
+        if game_type == 3:
+            logging.info("New uno game created in channel: [%i]", channel.id)
+            return UnoManager(self, channel, cpus)
 
+        logging.error("Error: unknown game type creation attempted in channel [%i]", channel.id)
+        raise ValueError("Unrecognized game type")
+
+    def save_game(self, manager):
+        """
+        Store a snapshot of manager's game, if games are being persisted
+        """
+        if self.store is not None:
+            self.store.save(manager.channel.id, manager.snapshot())
+
+    async def restore_games(self, client):
+        """
+        Bring back every game that was saved in the store, each one in its
+        lobby with a fresh base menu. Games whose channel is gone are
+        dropped from the store
+        """
+        if self.store is None:
+            return
+        for (channel_id, snapshot) in self.store.load_all():
+            if channel_id in self.active_games:
+                continue
+            if len(self.active_games) >= self.max_games:
+                logging.warning("Too many games running to restore the rest")
+                break
+            channel = client.get_channel(channel_id)
+            try:
+                if channel is None:
+                    channel = await client.fetch_channel(channel_id)
+                users = {}
+                for (user_id, _, _) in snapshot["players"]:
+                    if user_id is not None:
+                        users[user_id] = await self.find_user(client, user_id)
+            except discord.NotFound:
+                logging.info("[%i] Dropping saved game, its channel is gone", channel_id)
+                self.store.delete(channel_id)
+                continue
+            except discord.HTTPException:
+                logging.exception("[%i] Couldn't restore saved game", channel_id)
+                continue
+            try:
+                manager = self.make_manager(snapshot["type"], channel, **snapshot["options"])
+                manager.restore(snapshot, users)
+            except (KeyError, TypeError, ValueError):
+                logging.exception("[%i] Dropping unreadable saved game", channel_id)
+                self.store.delete(channel_id)
+                continue
+            self.active_games[channel_id] = manager
+            await manager.restore_base_menu(snapshot.get("menu_id"))
+            self.save_game(manager)
+            logging.info("[%i] Restored saved game", channel_id)
+
+
+    async def route(self, interaction):
+        """
+        Pass a button press on a base menu to its game, see games.router.
+        Presses on anything else are left alone
+        """
+        custom_id = (interaction.data or {}).get("custom_id")
+        route = parse_custom_id(custom_id) if custom_id else None
+        if route is None:
+            return
+        (channel_id, version, action) = route
+        game = self.active_games.get(channel_id)
+        if game is None:
+            logging.info("[%i] Button pressed on a game that isn't running", channel_id)
+            await send_info_message("This game has ended.", interaction)
+            return
+        await game.route(interaction, version, action)
+
+    async def find_user(self, client, user_id):
+        """
+        Returns the discord user with user_id, or None if they don't
+        exist anymore
+        """
+        user = client.get_user(user_id)
+        if user is not None:
+            return user
+        try:
+            return await client.fetch_user(user_id)
+        except discord.NotFound:
+            logging.info("Saved player [%i] not found", user_id)
+            return None
+
+    async def get_odds(self, interaction):
+        """
+        Passes an /odds request on to the poker game in the channel it
+        was used in, if there is one
+        """
+        game = self.active_games.get(interaction.channel_id)
+        if not isinstance(game, PokerManager):
+            await send_info_message("There is no poker game in this channel.", interaction)
+            return
+        await game.send_odds(interaction)
 
     async def stop_game(self, channel_id):
         """
@@ -75,7 +238,9 @@ class GameFactory():
         in order to actually stop a game.
         """
         logging.info("[%i] Game stopping.", channel_id)
-        self.active_games.pop(channel_id)
+        self.active_games.pop(channel_id, None)
+        if self.store is not None:
+            self.store.delete(channel_id)
 
     async def get_debug_str(self, interaction, channel_id, print_type):
         """
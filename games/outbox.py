@@ -0,0 +1,134 @@
+"""Outbound messages
+
+Every game sends its channel messages through an Outbox instead of
+calling channel.send itself. The outbox sends them one at a time, in
+order, from its own task, so games don't wait on Discord unless they
+need the message back.
+
+Announcements (plain text that nobody has to interact with) that are
+waiting next to each other go out as one message. They only wait while
+something else is being sent or the channel is rate limited, so a quiet
+channel gets its announcements straight away and a busy one gets them
+in batches.
+
+Discord lets a bot send RATE_LIMIT messages per RATE_PERIOD seconds in
+a channel. The outbox keeps count of its sends and holds off itself
+instead of running into a 429, and once OUTBOX_SIZE messages are
+waiting, announcing blocks until there's room again. That slows the
+game (and through its actor, the players) down to what the channel can
+take.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from games.timers import TimedView
+from games.timers import expire_message
+
+# Discord's message bucket for a channel
+RATE_LIMIT = 5
+RATE_PERIOD = 5.0
+# most characters Discord allows in a message
+MESSAGE_LIMIT = 2000
+# most messages waiting to be sent before announce starts to block
+OUTBOX_SIZE = 16
+
+
+class Outbox:
+    """
+    Queue of messages waiting to be sent into a channel
+    """
+    def __init__(self, channel, size=OUTBOX_SIZE):
+        self.channel = channel
+        # (content, channel.send kwargs, future), announcements have
+        # delete_after in place of the kwargs and no future
+        self.items = deque()
+        # one slot per message that can be waiting
+        self.room = asyncio.Semaphore(size)
+        # times of the last RATE_LIMIT sends
+        self.sent = deque(maxlen=RATE_LIMIT)
+        # task doing the sending, None while there's nothing to send
+        self.worker = None
+
+    async def announce(self, content, delete_after=None):
+        """
+        Queue an announcement. Returns as soon as it's queued, unless the
+        outbox is full
+        """
+        await self.room.acquire()
+        self.items.append((content, delete_after, None))
+        self.start_worker()
+
+    async def send(self, content=None, **kwargs):
+        """
+        Queue a message (takes the same arguments as channel.send) and
+        wait for it to be sent. Returns the message
+        """
+        await self.room.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self.items.append((content, kwargs, future))
+        self.start_worker()
+        return await future
+
+    def start_worker(self):
+        if self.worker is None:
+            self.worker = asyncio.create_task(self.run_worker())
+
+    async def wait_for_bucket(self):
+        """
+        Wait until the channel's rate limit allows another message
+        """
+        if len(self.sent) == RATE_LIMIT:
+            wait = self.sent[0] + RATE_PERIOD - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def run_worker(self):
+        try:
+            while self.items:
+                await self.wait_for_bucket()
+                (content, options, future) = self.items.popleft()
+                taken = 1
+                if future is None:
+                    # merge in the announcements that have piled up behind it
+                    lines = [content]
+                    length = len(content)
+                    while self.items:
+                        (next_content, next_options, next_future) = self.items[0]
+                        if next_future is not None or next_options != options \
+                        or length + len(next_content) + 1 > MESSAGE_LIMIT:
+                            break
+                        self.items.popleft()
+                        lines.append(next_content)
+                        length += len(next_content) + 1
+                        taken += 1
+                    content = "\n".join(lines)
+                try:
+                    if future is None:
+                        message = await self.channel.send(content)
+                        # announcements are deleted through the timer wheel, see
+                        # games.timers
+                        if options is not None:
+                            expire_message(message, options)
+                    else:
+                        message = await self.channel.send(content, **options)
+                        view = options.get("view")
+                        if isinstance(view, TimedView):
+                            view.start_timer()
+                except Exception as exc:
+                    # anything going wrong with one message (not just Discord
+                    # turning it down) is handed to whoever is waiting on it,
+                    # the worker keeps going with the rest of the queue
+                    if future is None:
+                        logging.error("[%i] Couldn't send announcement: %r", self.channel.id, exc)
+                    elif not future.done():
+                        future.set_exception(exc)
+                else:
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                finally:
+                    self.sent.append(time.monotonic())
+                    for _ in range(taken):
+                        self.room.release()
+        finally:
+            self.worker = None
@@ -0,0 +1,152 @@
+"""Game persistence
+
+Keeps a snapshot of every active game in an SQLite database so games
+(and the chips players have won) survive the bot restarting. See
+GameManager.snapshot for what a snapshot holds.
+
+Snapshots are written behind the event loop: save and delete only
+record what should happen to a channel's row, and a dedicated writer
+thread commits everything recorded since its last pass in one
+transaction. A burst of actions in one channel only keeps the latest
+snapshot, so it costs a single row write. The database runs in WAL
+mode so a commit is one append to the log.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+DB_PATH = "configs/games.db"
+# seconds the writer waits after something changes before committing,
+# so whatever else happens in that time goes into the same transaction
+FLUSH_DELAY = 0.5
+
+_SCHEMA = ("CREATE TABLE IF NOT EXISTS games ("
+           "channel_id INTEGER PRIMARY KEY, "
+           "snapshot TEXT NOT NULL, "
+           "updated REAL NOT NULL)")
+
+
+class GameStore:
+    """
+    Write-behind store of game snapshots, one row per channel
+    """
+    def __init__(self, path=DB_PATH, flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        # channel id -> snapshot string, or None to delete the row
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closing = False
+        self.thread = None
+        connection = self.connect()
+        connection.close()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(_SCHEMA)
+        connection.commit()
+        return connection
+
+    def load_all(self):
+        """
+        Returns a list of (channel id, snapshot dict) for every game
+        that was saved. Snapshots that can't be read are skipped
+        """
+        connection = self.connect()
+        try:
+            rows = connection.execute("SELECT channel_id, snapshot FROM games").fetchall()
+        finally:
+            connection.close()
+        games = []
+        for (channel_id, snapshot) in rows:
+            try:
+                games.append((channel_id, json.loads(snapshot)))
+            except ValueError:
+                logging.warning("[%i] Skipping unreadable game snapshot", channel_id)
+        return games
+
+    def start(self):
+        """
+        Start the writer thread
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run_writer, name="GameStore",
+                                           daemon=True)
+            self.thread.start()
+
+    def save(self, channel_id, snapshot):
+        """
+        Queue snapshot (a dict) to be written for channel_id, replacing
+        anything still waiting to be written for it
+        """
+        data = json.dumps(snapshot, separators=(",", ":"))
+        with self.lock:
+            self.pending[channel_id] = data
+        self.wake.set()
+
+    def delete(self, channel_id):
+        """
+        Queue channel_id's snapshot to be removed
+        """
+        with self.lock:
+            self.pending[channel_id] = None
+        self.wake.set()
+
+    def run_writer(self):
+        connection = self.connect()
+        try:
+            while not self.closing:
+                self.wake.wait()
+                # give the rest of a burst of changes time to come in
+                time.sleep(self.flush_delay)
+                self.wake.clear()
+                self.flush(connection)
+            self.flush(connection)
+        finally:
+            connection.close()
+
+    def flush(self, connection):
+        """
+        Commit everything pending in one transaction
+        """
+        with self.lock:
+            (pending, self.pending) = (self.pending, {})
+        if not pending:
+            return
+        now = time.time()
+        saves = [(channel_id, data, now) for (channel_id, data) in pending.items()
+                 if data is not None]
+        deletes = [(channel_id, ) for (channel_id, data) in pending.items() if data is None]
+        try:
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?)", saves)
+                connection.executemany("DELETE FROM games WHERE channel_id = ?", deletes)
+        except sqlite3.Error:
+            logging.exception("Couldn't save %i game snapshot(s)", len(pending))
+            # try again next time, unless something newer has come in since
+            with self.lock:
+                for (channel_id, data) in pending.items():
+                    self.pending.setdefault(channel_id, data)
+            return
+        logging.debug("Saved %i and deleted %i game snapshot(s)", len(saves), len(deletes))
+
+    def close(self):
+        """
+        Write anything still pending and stop the writer thread
+        """
+        self.closing = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        elif self.pending:
+            connection = self.connect()
+            try:
+                self.flush(connection)
+            finally:
+                connection.close()
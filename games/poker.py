@@ -8,26 +8,54 @@ import discord
 from games.game import BaseGame
 from games.game import GameManager
 from games.game import BasePlayer
+from games.game import CpuUser
+from games.router import RoutedView
+from games.timers import TimedView
+from games.timers import expire_response
 from util import Card
 from util import double_check
-from util import STANDARD_52_DECK
+from util import respond
+from util import Shoe
 from util import cards_to_str_52_standard
 from util import send_info_message
-from util import generate_deck
-import random
-from itertools import combinations
+from games.poker_eval import encode_hand_value
+from games.poker_eval import evaluate_cards
+from games.poker_eval import HandState
+from games.poker_eval import hand_name
+from games.poker_equity import EQUITY_SERVICE
+from games.poker_equity import choose_action
+from games.poker_preflop import hand_index
+from games.poker_preflop import load_table
 import copy
 
+# most CPU players a table can have
+MAX_CPUS = 3
+# seconds a CPU player spends working out its odds before acting
+CPU_THINK_TIME = 0.3
+# seconds spent estimating a player's odds for /odds
+ODDS_BUDGET = 1.0
+# precomputed preflop equities, memory mapped (None if not built yet)
+PREFLOP_TABLE = load_table()
+
 class PokerPlayer(BasePlayer):
     def __init__(self, is_cpu=False):
         super().__init__()
         self.hand = []
+        # score of hand plus the community cards, kept up to date as
+        # cards are dealt
+        self.hand_state = HandState()
         self.chips = 10000
         self.round_bet = 0
         self.total_bet = 0
         self.is_cpu = is_cpu
         self.active = True #Inactive when they fold
 
+    def snapshot(self, refund_bets=False):
+        return {"chips": self.chips + (self.total_bet if refund_bets else 0)}
+
+    def restore(self, data):
+        self.chips = data["chips"]
+
     def get_debug_str(self):
         return (f"\t\thand: {self.hand}\n"
                 f"\t\tchips: {self.chips}\n"
@@ -37,13 +65,13 @@ class PokerPlayer(BasePlayer):
 
 class PokerGame(BaseGame):
     """
-    Poker game model class. Keeps track of the deck and bets
+    Poker game model class. Keeps track of the cards on the table and bets
     """
     def __init__(self, cpus):
+        cpus = max(0, min(cpus, MAX_CPUS))
         # game state 1 -> accepting players but not playing yet
-        super().__init__(game_type=1, player_data={}, game_state=1, cpus=cpus)
+        super().__init__(game_type=2, player_data={}, game_state=1, cpus=cpus)
         
-        self.deck = generate_deck()
         self.community_cards = []
         self.pool = 0
         self.largest_bet = 0
@@ -52,7 +80,16 @@ class PokerGame(BaseGame):
         self.turn_index = 0
         self.best_hand = []
         self.winner = {}
-        random.shuffle(self.deck)
+        # CPU players sit at the table from the start
+        for number in range(cpus):
+            cpu = CpuUser(f"CPU {number + 1}")
+            self.player_data[cpu] = PokerPlayer(is_cpu=True)
+            self.turn_order.append(cpu)
+
+    def bets_outstanding(self):
+        # bets go into the pool as they're made, and the hand is over
+        # once the game moves to state 7
+        return self.game_state in (5, 6)
     
 
     def get_debug_str(self):
@@ -81,6 +118,12 @@ class PokerManager(GameManager):
     def __init__(self, factory, channel, cpus):
         super().__init__(game=PokerGame(cpus), base_gui=PokerButtonsBase(self),
                          channel=channel, factory=factory)
+        # every table deals from its own single deck shoe. Shuffling it
+        # between hands just rewinds its cursor, see Shoe
+        self.shoe = Shoe()
+        # flow letting CPU players take their turns, None while it's not
+        # running, see start_cpu_turns
+        self.cpu_flow = None
 
     async def add_player(self, interaction, init_player_data=None):
         await super().add_player(interaction, init_player_data)
@@ -88,6 +131,16 @@ class PokerManager(GameManager):
         and interaction.user not in self.game.turn_order:
             self.game.turn_order.append(interaction.user)
 
+    def get_options(self):
+        return {"cpus": self.game.cpus}
+
+    def new_player(self):
+        return PokerPlayer()
+
+    def seat_player(self, user, player_data):
+        super().seat_player(user, player_data)
+        self.game.turn_order.append(user)
+
     async def remove_player(self, interaction):
         await super().remove_player(interaction)
         if interaction.user not in self.game.player_data \
@@ -107,9 +160,10 @@ class PokerManager(GameManager):
             self.game.active_player_turn_order.append(player)
         
         # swap default GUI to betting phase buttons
-        await interaction.channel.send(f"{interaction.user.display_name} started the game!")
+        await self.announce(f"{interaction.user.display_name} started the game!")
         await self.deal_cards(interaction)
         await self.resend(interaction)
+        self.start_cpu_turns(interaction)
     
     async def start_new_round(self, interaction):
         """
@@ -122,11 +176,11 @@ class PokerManager(GameManager):
 
         for player in self.game.turn_order:
             self.game.player_data[player].hand = []
+            self.game.player_data[player].hand_state.reset()
             self.game.player_data[player].round_bet = 0
             self.game.player_data[player].total_bet = 0
             self.game.player_data[player].active = True
 
-        self.game.deck = generate_deck()
         self.game.community_cards = []
         self.game.pool = 0
         self.game.largest_bet = 0
@@ -134,7 +188,8 @@ class PokerManager(GameManager):
         self.game.turn_index = 0
         self.game.best_hand = []
         self.game.winner = {}
-        random.shuffle(self.game.deck)
+        # every hand is dealt from a full deck
+        self.shoe.shuffle()
         # allow players to join
         self.base_gui = PokerButtonsBase(self)
         if not active:
@@ -147,88 +202,252 @@ class PokerManager(GameManager):
         # game_state 5 -> dealing phase (players cannot join or leave)
         self.game.game_state = 5
 
-        await interaction.channel.send("Dealing cards...")
+        await self.announce("Dealing cards...")
 
         # draw 2 cards for every player
         for i in self.game.player_data:
-            self.game.player_data[i].hand.extend(STANDARD_52_DECK.draw(2))
+            cards = self.shoe.draw(2)
+            self.game.player_data[i].hand.extend(cards)
+            self.game.player_data[i].hand_state.add_cards(cards)
 
         self.base_gui = ButtonsBetPhase(self, self.game.players)
 
     async def make_bet(self, interaction, bet_amount):
         """
-        Set a player's bet
+        Set a player's bet. The bet is checked and placed on the actor,
+        but the confirmation prompt is waited on outside of it
+        """
+        if not await self.submit(interaction, self.check_bet, interaction, bet_amount):
+            return
+        # double check to make sure the user wants to confirm this bet
+        (yes_clicked, interaction) = await double_check(interaction=interaction,
+                                                    message_content=f"Betting {str(bet_amount)}.")
+        if not yes_clicked:
+            await send_info_message("Cancelled bet!", interaction)
+            return
+        await self.submit(interaction, self.confirm_bet, interaction, bet_amount)
+
+    async def check_bet(self, interaction, bet_amount):
+        """
+        Check to see if the user can bet, and deny them if not. Returns
+        True if they can
         """
         # checks to see if the game is over
         if await self.game_end_check(interaction):
-            return
+            return False
         
         # check to see if it is the user's turn
         user = interaction.user
-        if self.game.active_player_turn_order[self.game.turn_index] != user:
+        if self.game.game_state not in (5, 6) \
+        or self.game.active_player_turn_order[self.game.turn_index] != user:
             await send_info_message("This is not your turn yet.", interaction)
-            return 
+            return False
 
-        # check to see if the user can bet, and deny them if not
         user_data = self.game.player_data[user]
         if int(bet_amount) > user_data.chips:
             await send_info_message("You cannot afford this bet.", interaction)
-            return
+            return False
+        return True
 
-        # double check to make sure the user wants to confirm this bet
-        (yes_clicked, interaction) = await double_check(interaction=interaction,
-                                                    message_content=f"Betting {str(bet_amount)}.")
-        if not yes_clicked:
-            await send_info_message("Cancelled bet!", interaction)
+    async def confirm_bet(self, interaction, bet_amount):
+        """
+        Place a confirmed bet, checking again in case the turn moved on
+        while the user was confirming it
+        """
+        if not await self.check_bet(interaction, bet_amount):
             return
-        # perform the bet
+        await self.place_bet(interaction.user, bet_amount)
+        await self.base_gui.next_player(interaction, False)
+
+    async def place_bet(self, user, bet_amount):
+        """
+        Move a bet from a player's chips into the pool and announce it.
+        All checks should be done before calling this
+        """
+        user_data = self.game.player_data[user]
         user_data.round_bet += int(bet_amount)
         user_data.total_bet += int(bet_amount)
         self.game.pool += int(bet_amount)
         user_data.chips -= int(bet_amount)
         if user_data.round_bet >= self.game.largest_bet:
             self.game.largest_bet = user_data.round_bet
-        await interaction.channel.send((f"{user.mention} has bet {str(bet_amount)} "
-                                        f"chips and now has {str(user_data.chips)} "
-                                        "chips left!"))
-        await self.base_gui.next_player(interaction, False)
-        return
+        await self.announce((f"{user.mention} has bet {str(bet_amount)} "
+                             f"chips and now has {str(user_data.chips)} "
+                             "chips left!"))
+
+    async def fold_player(self, user):
+        """
+        Take a player out of the current hand
+        """
+        self.game.player_data[user].active = False
+        self.game.active_player_turn_order.remove(user)
+
+    def start_cpu_turns(self, interaction):
+        """
+        Start the CPU turn flow (see run_cpu_turns) if it's a CPU's turn
+        to bet and it isn't already running. interaction is the last
+        human interaction, which is passed along whenever the CPUs move
+        the game on
+        """
+        if self.cpu_flow is None and self.cpu_to_play() is not None:
+            self.cpu_flow = self.spawn(self.run_cpu_turns(interaction))
+
+    def cpu_to_play(self):
+        """
+        The CPU player whose turn it is to bet, or None if it's not a
+        CPU's turn
+        """
+        if self.game.game_state not in (5, 6) or not self.game.active_player_turn_order:
+            return None
+        player = self.game.active_player_turn_order[self.game.turn_index]
+        return player if self.game.player_data[player].is_cpu else None
+
+    async def run_cpu_turns(self, interaction):
+        """
+        Flow that lets CPU players take their turns for as long as it's
+        a CPU's turn to bet. It runs outside the actor (see spawn), so
+        players' button presses aren't held up while a CPU works out its
+        odds, and only the move itself goes through call
+        """
+        try:
+            while True:
+                player = self.cpu_to_play()
+                if player is None:
+                    return
+                seen = self.game.player_data[player].hand + self.game.community_cards
+                equity = await self.estimate_cpu_equity(player)
+                await self.call(self.play_cpu_move, interaction, player, equity, seen)
+        finally:
+            self.cpu_flow = None
+
+    async def estimate_cpu_equity(self, player):
+        """
+        Work out a CPU player's odds of winning the hand against the
+        other players still in it
+        """
+        player_data = self.game.player_data[player]
+        opponents = len(self.game.active_player_turn_order) - 1
+        equity = self.get_preflop_equity(player_data.hand, opponents)
+        if equity is None:
+            equity = (await EQUITY_SERVICE.estimate([card.id for card in player_data.hand],
+                                                    [card.id for card in self.game.community_cards],
+                                                    opponents, budget=CPU_THINK_TIME)).equity
+        return equity
+
+    async def play_cpu_move(self, interaction, player, equity, seen):
+        """
+        Have a CPU player call, raise or fold based on equity, as long
+        as it's still its turn and it still sees the cards (its hand and
+        the board) it worked its odds out from. Otherwise run_cpu_turns
+        has it think again
+        """
+        player_data = self.game.player_data[player]
+        if self.cpu_to_play() != player or player_data.hand + self.game.community_cards != seen:
+            return
+        opponents = len(self.game.active_player_turn_order) - 1
+        # CPUs only raise once per betting round so they can't raise
+        # each other forever
+        (action, amount) = choose_action(equity, opponents,
+                                         self.game.largest_bet - player_data.round_bet,
+                                         self.game.pool, player_data.chips,
+                                         can_raise=player_data.round_bet == 0)
+        self.quick_log(f"{player} chose {action} {amount} with equity {equity:.3f}")
+        if action == "fold":
+            await self.fold_player(player)
+            await self.announce(f"{player.mention} has folded!")
+            await self.base_gui.next_player(interaction, True)
+        else:
+            await self.place_bet(player, amount)
+            await self.base_gui.next_player(interaction, False)
+
+    def get_preflop_equity(self, hand, opponents):
+        """
+        Looks up the equity of a 2 card hand against random hands in
+        the preflop table. Returns None if the flop is already out or
+        the table can't answer, so the caller should simulate instead
+        """
+        if self.game.community_cards or PREFLOP_TABLE is None:
+            return None
+        return PREFLOP_TABLE.vs_random(hand_index(hand[0].id, hand[1].id), opponents)
+
+    async def send_odds(self, interaction):
+        """
+        Responds to /odds with the user's chances of winning the
+        current hand against the players who haven't folded
+        """
+        if not await self.interaction_is_valid(interaction):
+            return
+        player_data = self.game.player_data[interaction.user]
+        if self.game.game_state not in (5, 6) or not player_data.active:
+            await send_info_message("You don't have a hand in play right now.", interaction)
+            return
+        opponents = len(self.game.active_player_turn_order) - 1
+        preflop_equity = self.get_preflop_equity(player_data.hand, opponents)
+        if preflop_equity is not None:
+            await interaction.response.send_message((f"Before the flop, against {opponents} "
+                                                     "opponent(s) your hand wins "
+                                                     f"{preflop_equity:.1%} of the pot on "
+                                                     "average."), ephemeral=True)
+            return
+        # the estimate takes a moment, so let discord know we're on it
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        equity = await EQUITY_SERVICE.estimate([card.id for card in player_data.hand],
+                                               [card.id for card in self.game.community_cards],
+                                               opponents, budget=ODDS_BUDGET)
+        await interaction.followup.send((f"Against {max(opponents, 1)} opponent(s) you win "
+                                         f"{equity.win:.1%} and tie {equity.tie:.1%} of the time "
+                                         f"({equity.samples} simulated runouts)."),
+                                        ephemeral=True)
     
     async def deal_table(self, interaction):
         self.game.largest_bet = 0
         if len(self.game.community_cards) == 0:
-           self.game.community_cards.extend(STANDARD_52_DECK.draw(3))
+           self.add_community_cards(self.shoe.draw(3))
 
         elif len(self.game.community_cards) == 5:
             await self.finalize_game(interaction)
         else:
-            self.game.community_cards.extend(STANDARD_52_DECK.draw(1))
+            self.add_community_cards(self.shoe.draw(1))
         await self.resend(interaction)
         return
+
+    def add_community_cards(self, cards):
+        """
+        Puts cards on the table and adds them to the hand state of every
+        player still in the hand
+        """
+        self.game.community_cards.extend(cards)
+        for player in self.game.active_player_turn_order:
+            self.game.player_data[player].hand_state.add_cards(cards)
     
     async def finalize_game(self, interaction):
         self.game.game_state = 7
         self.base_gui = None
 
         if len(self.game.active_player_turn_order) != 0:
-            winning_hand = []
-            for player in self.game.player_data:
-                if not winning_hand:
-                    winning_hand = self.game.player_data[player].hand
-                    self.game.winner = player.display_name
-                    self.game.best_hand = winning_hand
-                else:
-                    if best_hand(winning_hand, self.game.community_cards) < best_hand(self.game.player_data[player].hand, self.game.community_cards):
-                        winning_hand = self.game.player_data[player].hand
-                        self.game.winner = player.display_name
-                        self.game.best_hand = winning_hand
+            # every seat still in has had its hand scored as the cards came
+            # out, folded seats can't win, ties go to the earlier seat
+            winner = max(self.game.active_player_turn_order,
+                         key=lambda player: self.game.player_data[player].hand_state.value)
+            self.game.winner = winner.display_name
+            self.game.best_hand = self.game.player_data[winner].hand
             await self.resend(interaction)
-        
+        self.spawn(self.ask_restart())
+
+    async def ask_restart(self):
+        """
+        Ask the players if they want to go again and wait for an answer.
+        Runs outside the actor (see spawn)
+        """
         restart_ui = QuitGameButton(self)
-        active_msg = await self.channel.send("Play again?", view=restart_ui)
+        active_msg = await self.outbox.send("Play again?", view=restart_ui)
         await restart_ui.wait()
+        if self.game.has_ended():
+            # the game was ended or closed (see GameManager.close) while
+            # waiting, so there's nothing left to ask about
+            await active_msg.delete()
+            return
         await active_msg.edit(view=None)
-        return
 
     def get_base_menu_string(self):
         if self.game.game_state == 1:
@@ -272,12 +491,12 @@ class PokerManager(GameManager):
         return super().get_debug_str() + self.game.get_debug_str()
 
      
-class PokerButtonsBase(discord.ui.View):
+class PokerButtonsBase(RoutedView):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
 
-    @discord.ui.button(label = "Join", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Join", style = discord.ButtonStyle.green, custom_id = "join")
     async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Send an ephemeral message to the person who interacted with
@@ -291,9 +510,10 @@ class PokerButtonsBase(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
 
         indi_player_data = PokerPlayer()
-        await self.manager.add_player(interaction, indi_player_data)
+        await self.manager.submit(interaction, self.manager.add_player, interaction,
+                                  indi_player_data)
 
-    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red)
+    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red, custom_id = "quit")
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Quit the game
@@ -302,9 +522,9 @@ class PokerButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # remove current players from active player list
-        await self.manager.remove_player(interaction)
+        await self.manager.submit(interaction, self.manager.remove_player, interaction)
 
-    @discord.ui.button(label = "Start Game", style = discord.ButtonStyle.blurple)
+    @discord.ui.button(label = "Start Game", style = discord.ButtonStyle.blurple, custom_id = "start")
     async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Start the game
@@ -313,16 +533,16 @@ class PokerButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # start the game
-        await self.manager.start_game(interaction)
+        await self.manager.submit(interaction, self.manager.start_game, interaction)
 
 
-class PokerButtonsBaseGame(discord.ui.View):
+class PokerButtonsBaseGame(RoutedView):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
 
-    @discord.ui.button(label = "Resend", style = discord.ButtonStyle.gray)
-    async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @discord.ui.button(label = "Resend", style = discord.ButtonStyle.gray, custom_id = "resend")
+    async def resend(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Resend base menu message
         """
@@ -330,7 +550,7 @@ class PokerButtonsBaseGame(discord.ui.View):
         # pylint won't shut up about button being unused
         print(f"{interaction.user} pressed {button.label}!")
         # resend
-        await self.manager.resend(interaction)
+        await self.manager.submit(interaction, self.manager.resend, interaction)
 
 class BetModal(discord.ui.Modal):
     def __init__(self, manager):
@@ -357,7 +577,7 @@ class BetModal(discord.ui.Modal):
         await self.manager.make_bet(interaction, user_response)
 
 
-class ButtonsBetPhase(discord.ui.View):
+class ButtonsBetPhase(RoutedView):
     def __init__(self, manager, player_count):
         super().__init__()
         self.manager = manager
@@ -385,10 +605,12 @@ class ButtonsBetPhase(discord.ui.View):
                     for player in self.manager.game.turn_order:
                         self.manager.game.player_data[player].round_bet = 0
                     await self.manager.deal_table(interaction)
+        # let any CPU players whose turn it is now take it
+        self.manager.start_cpu_turns(interaction)
     
             
     
-    @discord.ui.button(label = "View Hand", style = discord.ButtonStyle.blurple)
+    @discord.ui.button(label = "View Hand", style = discord.ButtonStyle.blurple, custom_id = "hit_me")
     async def hit_me(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Let the user view their hand
@@ -398,9 +620,13 @@ class ButtonsBetPhase(discord.ui.View):
         current_player = self.manager.game.player_data[interaction.user]
         if len(current_player.hand) != 2:
             raise ValueError("Player hand must contain 2 cards")
-        await interaction.response.send_message(f"Your hand is {cards_to_str_52_standard(current_player.hand)}", ephemeral = True, delete_after = 60)
+        message = f"Your hand is {cards_to_str_52_standard(current_player.hand)}"
+        if current_player.hand_state.value:
+            message += f"\nBest hand so far: {hand_name(current_player.hand_state.value)}"
+        await interaction.response.send_message(message, ephemeral = True)
+        expire_response(interaction, 60)
     
-    @discord.ui.button(label = "Call", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Call", style = discord.ButtonStyle.green, custom_id = "call")
     async def call(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Call
@@ -408,7 +634,7 @@ class ButtonsBetPhase(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         await self.manager.make_bet(interaction, self.manager.game.largest_bet - self.manager.game.player_data[interaction.user].round_bet)
 
-    @discord.ui.button(label = "Raise", style = discord.ButtonStyle.red)
+    @discord.ui.button(label = "Raise", style = discord.ButtonStyle.red, custom_id = "bet")
     async def bet(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Allows the user to bring up the betting menu
@@ -418,27 +644,35 @@ class ButtonsBetPhase(discord.ui.View):
             return
         await interaction.response.send_modal(BetModal(self.manager))
 
-    @discord.ui.button(label = "Fold", style = discord.ButtonStyle.gray)
+    @discord.ui.button(label = "Fold", style = discord.ButtonStyle.gray, custom_id = "fold")
     async def fold(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Fold
         """
         print(f"{interaction.user} pressed {button.label}!")
-        #Fold
-        self.manager.game.player_data[interaction.user].active = False
-        self.manager.game.active_player_turn_order.remove(interaction.user)
-        self.manager.base_gui = None
-        await interaction.response.send_message(f"{interaction.user.mention} has folded!")
+        await self.manager.submit(interaction, self.fold_hand, interaction)
+
+    async def fold_hand(self, interaction):
+        """
+        Fold the user's hand and move on to the next player
+        """
+        if interaction.user not in self.manager.game.active_player_turn_order:
+            await send_info_message("You're not in this hand.", interaction)
+            return
+        self.manager.quick_log("Folding", interaction)
+        await self.manager.fold_player(interaction.user)
+        await respond(interaction, f"{interaction.user.mention} has folded!")
         await self.next_player(interaction, True)
 
 
-class QuitGameButton(discord.ui.View):
+class QuitGameButton(TimedView):
     """
     Button set that asks players if they want to play the game again
     """
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        manager.views.add(self)
 
     @discord.ui.button(label = "Go Again!", style = discord.ButtonStyle.green)
     async def restart(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -450,7 +684,7 @@ class QuitGameButton(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop accepting input
         self.stop()
-        await self.manager.start_new_round(interaction)
+        await self.manager.submit(interaction, self.manager.start_new_round, interaction)
 
     @discord.ui.button(label = "End Game", style = discord.ButtonStyle.red)
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -462,109 +696,90 @@ class QuitGameButton(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop eccepting input
         self.stop()
-        await interaction.channel.send(f"{interaction.user.mention} ended the game!")
-        await self.manager.quit_game(interaction)
+        await self.manager.announce(f"{interaction.user.mention} ended the game!")
+        await self.manager.submit(interaction, self.manager.quit_game, interaction)
 
 
 
-def encode_hand_value(hand_tuple):
-    """
-    hand_tuple is the tuple of values corresponding to the value of a hand
-    along with any values necessary for breaking ties
-    Returns an integer that can be used for comparing hands
-    """
-    # This uses powers of 13 because there are 13 possible card faces
-    # Essentially encodes the values as a base 13 number
-    # This should make comparing more than 2 hands at a time easier
-    # Also avoids the creation of a new data type
-    return_value = hand_tuple[0] * (13**5)
-    for index in range(1, len(hand_tuple)):
-        return_value += hand_tuple[index] * (13 ** (5-index))
-    return return_value
-
 def max_hand(hand):
     """
     Returns the maximum hand value of a given hand,
     along with information necessary for breaking ties
     hand: list of 5 Card objects
     """
-    lookup = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J","Q", "K", "A")
-    alt_lookup = ("A",) + lookup[:12] #Used in checking Straight Flush and Straights for A=1
     if len(hand) != 5:
         raise ValueError("Hand must contain 5 cards")
-    hand.sort(key = lambda x: lookup.index(x.value))
+    hand.sort(key = lambda x: x.rank)
+    ranks = [c.rank for c in hand]
     same_suit = True
     for c in hand:
-        if c.name != hand[0].name:
+        if c.suit != hand[0].suit:
             same_suit = False
             break
-    highest_value = lookup.index(hand[4].value)
+    highest_value = ranks[4]
 
     #Check Royal Flush
     if same_suit:
-        if hand[0].value == "10" and hand[1].value == "J" and hand[2].value == "Q" and hand[3].value == "K" and hand[4].value == "A":
+        if ranks == [8, 9, 10, 11, 12]:
             return encode_hand_value((10, highest_value))
     
+    #A-2-3-4-5 sorts as 2,3,4,5,A, so the low straight is checked against its sorted ranks
+    is_wheel = ranks == [0, 1, 2, 3, 12]
+
     #Check Straight Flush
     if same_suit:
-        #Straight Flush uses alt_lookup because if it is not a Royal Flush, A=1 if it is a Flush
         is_straight = True
         for index in range(4):
-            if alt_lookup.index(hand[index].value) + 1 != alt_lookup.index(hand[index + 1].value):
+            if ranks[index] + 1 != ranks[index + 1]:
                 is_straight = False
                 break
         if is_straight:
             return encode_hand_value((9, highest_value))
+        if is_wheel:
+            # We use '3' here because if it is a low straight, A=1 and the highest value card
+            # is 5 (A,2,3,4,5), which is rank 3 in the order [2,3,4,5,...,A]
+            return encode_hand_value((9, 3))
     
-    num_same = 0
     type_dict = dict()
-    for c in hand:
-        type_dict[c.value] = type_dict.get(c.value, 0) + 1
+    for rank in ranks:
+        type_dict[rank] = type_dict.get(rank, 0) + 1
 
     #Check Four of a Kind
     for key in type_dict:
         if type_dict[key] == 4:
             for key2 in type_dict:
                 if key2 != key:
-                    return encode_hand_value((8, lookup.index(key), lookup.index(key2)))
+                    return encode_hand_value((8, key, key2))
         
     #Check Full House
     for key in type_dict:
         if type_dict[key] == 3:
             for key2 in type_dict:
                 if type_dict[key2] == 2:
-                    return encode_hand_value((7, lookup.index(key), lookup.index(key2)))
+                    return encode_hand_value((7, key, key2))
                 
     #Check Flush
     if same_suit:
-        return encode_hand_value((6, ) + tuple(sorted([lookup.index(c.value) for c in hand], reverse = True)))
+        return encode_hand_value((6, ) + tuple(sorted(ranks, reverse = True)))
     
     #Check Straight
     is_high_straight = True
     for index in range(4):
-        if lookup.index(hand[index].value) + 1 != lookup.index(hand[index + 1].value):
+        if ranks[index] + 1 != ranks[index + 1]:
             is_high_straight = False
             break
-    is_low_straight = True
-    for index in range(4):
-        if alt_lookup.index(hand[index].value) + 1 != alt_lookup.index(hand[index + 1].value):
-            is_low_straight = False
-            break
     if is_high_straight:
         return encode_hand_value((5, highest_value))
-    elif is_low_straight:
+    elif is_wheel:
         # We use '3' here because if it is a low straight, A=1 and the highest value card
-        # is 5 (A,2,3,4,5), which is 3 in the primary lookup list [2,3,4,5,...,A]
+        # is 5 (A,2,3,4,5), which is rank 3 in the order [2,3,4,5,...,A]
         return encode_hand_value((5, 3))
     
     #Check Three of a Kind
     for key in type_dict:
         if type_dict[key] == 3:
-            for key2 in type_dict:
-                if key2 != key:
-                    for key3 in type_dict:
-                        if key3 != key and key3 != key2:
-                            return encode_hand_value((4, lookup.index(key), lookup.index(key2), lookup.index(key3)))
+            kicker_values = [key2 for key2 in type_dict if key2 != key]
+            return encode_hand_value((4, key) + tuple(sorted(kicker_values, reverse = True)))
     
     #Check Two Pair
     num_pairs = 0
@@ -576,9 +791,9 @@ def max_hand(hand):
         kicker = 0
         for key in type_dict:
             if type_dict[key] == 2:
-                pair_values.append(lookup.index(key))
+                pair_values.append(key)
             else:
-                kicker = lookup.index(key)
+                kicker = key
         return encode_hand_value((3, ) + tuple(sorted(pair_values, reverse = True)) + (kicker, ))
     
     #Check One Pair
@@ -587,13 +802,13 @@ def max_hand(hand):
         kicker_values = []
         for key in type_dict:
             if type_dict[key] == 2:
-                pair_value = lookup.index(key)
+                pair_value = key
             else:
-                kicker_values.append(lookup.index(key))
+                kicker_values.append(key)
         return encode_hand_value((2, pair_value) + tuple(sorted(kicker_values, reverse = True)))
     
     #No good hand, must use high card
-    return encode_hand_value((1, ) + tuple(sorted([lookup.index(c.value) for c in hand], reverse = True)))
+    return encode_hand_value((1, ) + tuple(sorted(ranks, reverse = True)))
 
 def compare_hands(hand1, hand2):
     """
@@ -618,12 +833,7 @@ def best_hand(user_hand, table):
     if len(table) > 5 or len(table) < 3:
         raise ValueError("Table must contain 3-5 cards")
     
-    #During the flop, the card combination is 5 choose 5, so one possible hand per-person
-    #During the turn, the card combination is 6 choose 5, so 6 possible hands per-person
-    #During the river, the card combination is 7 choose 5, so 21 possible hands per-person
-    #Technically, river phase can be sped up here because if a user's best hand is just
-    #the five on the table, then they are not winning, they draw at best. Can change if it is slow.
-    all_cards = user_hand + table
-    card_combinations = list(combinations(all_cards, 5)) # Thank you FoCS for this knowledge :)
-    best_value = max([max_hand(list(c)) for c in card_combinations])
-    return best_value
\ No newline at end of file
+    #The evaluator scores the 5, 6 or 7 cards in one pass through its lookup tables
+    #instead of trying every 5 card combination, giving the same value as the best
+    #max_hand over all of the combinations
+    return evaluate_cards(user_hand + table)
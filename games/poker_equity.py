@@ -0,0 +1,150 @@
+"""Poker equity estimation
+
+Estimates how often a pair of hole cards wins against a number of
+random opponents by playing out random runouts of the remaining board.
+The simulations run in a process pool so that the bot's event loop is
+never blocked, and keep going until a time budget runs out. The workers
+are spawned rather than forked from the bot process, which has threads
+running that a fork would copy in whatever state they're in. Used by the
+CPU players to decide what to do and by the /odds command.
+
+Cards are passed around as integer codes (Card.id), see poker_eval.
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from games.poker_eval import evaluate_batch
+
+# number of runouts a worker plays per task. Small enough that a task
+# finishes well inside a time budget, big enough to keep the overhead
+# of sending tasks to the pool (and of each numpy call) low
+BATCH_SIZE = 20000
+# default time budget for an estimate, in seconds
+DEFAULT_BUDGET = 0.5
+
+# win: fraction of runouts won outright
+# tie: fraction of runouts tied with at least one opponent
+# equity: fraction of the pot won on average (ties split the pot)
+# samples: number of runouts played
+Equity = namedtuple("Equity", ("win", "tie", "equity", "samples"))
+
+
+def simulate(hole, board, opponents, iterations, seed):
+    """
+    Plays out iterations random runouts for hole (2 card codes) and the
+    0-5 board card codes against opponents random hands. Returns a
+    tuple of (wins, ties, pot share), where pot share is the number of
+    pots won counting a tie as its split of the pot.
+
+    Every runout of the batch is dealt and scored at once with numpy.
+    Runs inside the worker processes, so it has to stay a module level
+    function.
+    """
+    rng = np.random.default_rng(seed)
+    dead = set(hole) | set(board)
+    deck = np.array([code for code in range(52) if code not in dead], dtype=np.int8)
+    board_needed = 5 - len(board)
+    needed = board_needed + 2 * opponents
+
+    # a random permutation of the deck per runout, only the first cards
+    # of it are dealt
+    drawn = deck[rng.random((iterations, len(deck))).argpartition(needed - 1, axis=1)[:, :needed]]
+    runout = np.concatenate((np.broadcast_to(np.array(board, dtype=np.int8), (iterations, len(board))),
+                             drawn[:, :board_needed]), axis=1)
+    hero = evaluate_batch(np.concatenate((np.broadcast_to(np.array(hole, dtype=np.int8), (iterations, 2)),
+                                          runout), axis=1))
+    best = np.zeros(iterations, dtype=np.int32)
+    tied = np.zeros(iterations, dtype=np.int32)
+    for index in range(board_needed, needed, 2):
+        value = evaluate_batch(np.concatenate((drawn[:, index:index + 2], runout), axis=1))
+        np.maximum(best, value, out=best)
+        tied += value == hero
+
+    won = hero > best
+    split = (hero == best)
+    wins = int(won.sum())
+    ties = int(split.sum())
+    share = wins + float((1 / (tied[split] + 1)).sum())
+    return (wins, ties, share)
+
+
+class EquityService:
+    """
+    Runs batches of simulate in a process pool. The pool is only
+    started the first time an estimate is asked for, and should be shut
+    down when the bot stops.
+    """
+    def __init__(self, workers=None, batch_size=BATCH_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.executor = None
+
+    async def estimate(self, hole, board, opponents, budget=DEFAULT_BUDGET):
+        """
+        Estimates the equity of hole against opponents random hands
+        given the board so far. Keeps every worker busy with batches
+        until budget seconds have passed, then returns an Equity.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        hole = list(hole)
+        board = list(board)
+        opponents = max(opponents, 1)
+
+        def submit():
+            return loop.run_in_executor(self.executor, simulate, hole, board, opponents,
+                                        self.batch_size, random.getrandbits(64))
+
+        wins = 0
+        ties = 0
+        share = 0.0
+        samples = 0
+        pending = {submit() for _ in range(self.workers)}
+        while pending:
+            (done, pending) = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                (batch_wins, batch_ties, batch_share) = task.result()
+                wins += batch_wins
+                ties += batch_ties
+                share += batch_share
+                samples += self.batch_size
+                # hand the worker another batch if there's still time
+                if loop.time() < deadline:
+                    pending.add(submit())
+        return Equity(wins / samples, ties / samples, share / samples, samples)
+
+    def shutdown(self):
+        """
+        Stops the worker processes, if they were started
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+# shared by every poker game in the process
+EQUITY_SERVICE = EquityService()
+
+
+def choose_action(equity, opponents, to_call, pot, chips, can_raise=True):
+    """
+    Simple pot odds strategy for CPU players. Returns a tuple of
+    (action, amount) where action is "fold", "call" or "raise" and
+    amount is the number of chips to put in.
+    """
+    # fold if calling costs more than our share of the pot is worth, or
+    # if we can't cover the call at all
+    if to_call > chips or (to_call > 0 and equity < to_call / (pot + to_call)):
+        return ("fold", 0)
+    # raise with hands that are well ahead of an even split
+    if can_raise and equity >= min(0.9, 1.5 / (max(opponents, 1) + 1)) and chips > to_call:
+        raise_by = max(pot // 2, 10)
+        return ("raise", min(to_call + raise_by, chips))
+    return ("call", to_call)
@@ -0,0 +1,253 @@
+"""Poker hand evaluator
+
+Scores 5, 6 and 7 card poker hands using precomputed lookup tables.
+Cards are passed in as small integer codes instead of Card objects so
+that nothing has to be parsed while evaluating:
+
+    code = rank * 4 + suit
+
+where rank is 0-12 for 2 through Ace and suit is 0-3, the same as
+util.Card.id for the standard 52 card deck. Values returned
+use the same encoding as encode_hand_value, so they can be compared
+directly against each other (and against max_hand).
+
+evaluate scores one hand at a time, evaluate_batch scores a whole
+array of hands at once with numpy, and HandState keeps score of a hand
+as cards are added to it one at a time.
+"""
+from itertools import combinations_with_replacement
+import numpy as np
+
+# every rank gets 3 bits in the rank key, enough to count up to 4 cards
+# of the same rank. Adding these together gives a key that only depends
+# on which ranks are in the hand, not which order they came in
+_RANK_KEYS = tuple(1 << (3 * (code >> 2)) for code in range(52))
+# single bit per rank, used to build the per-suit masks for flushes
+_RANK_BITS = tuple(1 << (code >> 2) for code in range(52))
+
+# names of the hand categories, indexed by the first digit of a value
+HAND_NAMES = ("", "High Card", "Pair", "Two Pair", "Three of a Kind", "Straight",
+              "Flush", "Full House", "Four of a Kind", "Straight Flush", "Royal Flush")
+
+# bit patterns of every straight, from highest (ace high) to lowest
+# (the wheel, A-2-3-4-5, where the 5 is the high card)
+_STRAIGHTS = tuple((0b11111 << (high - 4), high) for high in range(12, 3, -1)) \
+             + ((0b1000000001111, 3),)
+
+
+def encode_hand_value(hand_tuple):
+    """
+    hand_tuple is the tuple of values corresponding to the value of a hand
+    along with any values necessary for breaking ties
+    Returns an integer that can be used for comparing hands
+    """
+    # This uses powers of 13 because there are 13 possible card faces
+    # Essentially encodes the values as a base 13 number
+    # This should make comparing more than 2 hands at a time easier
+    # Also avoids the creation of a new data type
+    return_value = hand_tuple[0] * (13**5)
+    for index in range(1, len(hand_tuple)):
+        return_value += hand_tuple[index] * (13 ** (5-index))
+    return return_value
+
+
+def _straight_high(mask):
+    """
+    Returns the high card rank of the best straight contained in the
+    rank mask, or -1 if there isn't one
+    """
+    for pattern, high in _STRAIGHTS:
+        if mask & pattern == pattern:
+            return high
+    return -1
+
+
+def _flush_value(mask):
+    """
+    Value of the best hand that can be made from the ranks in mask when
+    they are all the same suit. Returns 0 if there are less than 5 ranks
+    """
+    ranks = [rank for rank in range(12, -1, -1) if mask >> rank & 1]
+    if len(ranks) < 5:
+        return 0
+    high = _straight_high(mask)
+    if high == 12:
+        return encode_hand_value((10, 12))
+    if high != -1:
+        return encode_hand_value((9, high))
+    return encode_hand_value((6, ) + tuple(ranks[:5]))
+
+
+def _rank_value(counts):
+    """
+    Value of the best non-flush hand that can be made from the ranks
+    counted in counts (counts[rank] -> number of cards of that rank)
+    """
+    # groups of ranks, biggest group first, highest rank first on ties
+    groups = sorted(((count, rank) for rank, count in enumerate(counts) if count),
+                    reverse=True)
+    singles = [rank for rank in range(12, -1, -1) if counts[rank]]
+
+    if groups[0][0] == 4:
+        quad = groups[0][1]
+        return encode_hand_value((8, quad, max(r for r in singles if r != quad)))
+
+    if groups[0][0] == 3 and groups[1][0] >= 2:
+        return encode_hand_value((7, groups[0][1], groups[1][1]))
+
+    mask = 0
+    for rank in singles:
+        mask |= 1 << rank
+    high = _straight_high(mask)
+    if high != -1:
+        return encode_hand_value((5, high))
+
+    if groups[0][0] == 3:
+        trips = groups[0][1]
+        return encode_hand_value((4, trips) + tuple(r for r in singles if r != trips)[:2])
+
+    if groups[0][0] == 2 and groups[1][0] == 2:
+        pairs = (groups[0][1], groups[1][1])
+        kicker = max(r for r in singles if r not in pairs)
+        return encode_hand_value((3, ) + pairs + (kicker, ))
+
+    if groups[0][0] == 2:
+        pair = groups[0][1]
+        return encode_hand_value((2, pair) + tuple(r for r in singles if r != pair)[:3])
+
+    return encode_hand_value((1, ) + tuple(singles[:5]))
+
+
+def _build_tables():
+    """
+    Builds the flush table (indexed by a 13 bit rank mask) and the rank
+    table (rank key -> value) for every 5, 6 and 7 card rank multiset
+    """
+    flush_table = [_flush_value(mask) for mask in range(1 << 13)]
+    rank_table = {}
+    for size in (5, 6, 7):
+        for ranks in combinations_with_replacement(range(13), size):
+            counts = [0] * 13
+            for rank in ranks:
+                counts[rank] += 1
+            if max(counts) > 4:
+                continue
+            key = 0
+            for rank in ranks:
+                key += 1 << (3 * rank)
+            rank_table[key] = _rank_value(counts)
+    return (tuple(flush_table), rank_table)
+
+
+(FLUSH_TABLE, RANK_TABLE) = _build_tables()
+
+
+def evaluate(codes):
+    """
+    Returns the value of the best 5 card hand that can be made from the
+    5-7 card codes passed in
+    """
+    key = 0
+    suit_masks = [0, 0, 0, 0]
+    for code in codes:
+        key += _RANK_KEYS[code]
+        suit_masks[code & 3] |= _RANK_BITS[code]
+    # with 7 or less cards, a flush can't share the hand with four of a
+    # kind or a full house, so any flush is the best hand available
+    for mask in suit_masks:
+        value = FLUSH_TABLE[mask]
+        if value:
+            return value
+    return RANK_TABLE[key]
+
+
+def evaluate_cards(cards):
+    """
+    Same as evaluate, but takes a list of Card objects
+    """
+    return evaluate([card.id for card in cards])
+
+
+def hand_name(value):
+    """
+    Name of the category of a hand value, e.g. "Two Pair"
+    """
+    return HAND_NAMES[value // 13**5]
+
+
+class HandState:
+    """
+    Running score of a hand that grows one card at a time, like a
+    player's hole cards plus the community cards as they're dealt.
+    Adding a card only updates the rank key and one suit mask and does
+    one or two table lookups, so value (the best hand so far, 0 until
+    there are 5 cards) is always up to date without re-scoring the hand
+    """
+    __slots__ = ("key", "suit_masks", "count", "value", "flush")
+
+    def __init__(self, codes=()):
+        self.reset()
+        for code in codes:
+            self.add(code)
+
+    def reset(self):
+        self.key = 0
+        self.suit_masks = [0, 0, 0, 0]
+        self.count = 0
+        self.value = 0
+        self.flush = False
+
+    def add(self, code):
+        """
+        Adds one card code to the hand and updates value
+        """
+        self.key += _RANK_KEYS[code]
+        suit = code & 3
+        self.suit_masks[suit] |= _RANK_BITS[code]
+        self.count += 1
+        if self.count < 5:
+            return
+        # only the suit of the new card can have become (or improved) a
+        # flush, and once there is a flush it stays the best hand
+        flush_value = FLUSH_TABLE[self.suit_masks[suit]]
+        if flush_value:
+            self.value = flush_value
+            self.flush = True
+        elif not self.flush:
+            self.value = RANK_TABLE[self.key]
+
+    def add_cards(self, cards):
+        """
+        Adds a list of Card objects to the hand
+        """
+        for card in cards:
+            self.add(card.id)
+
+
+# numpy copies of the tables for evaluate_batch. The rank table is
+# stored as sorted keys so keys can be looked up with searchsorted
+_NP_RANK_KEYS = np.array(_RANK_KEYS, dtype=np.int64)
+_NP_RANK_BITS = np.array(_RANK_BITS, dtype=np.int32)
+_NP_FLUSH_TABLE = np.array(FLUSH_TABLE, dtype=np.int32)
+_NP_SORTED_KEYS = np.array(sorted(RANK_TABLE), dtype=np.int64)
+_NP_SORTED_VALUES = np.array([RANK_TABLE[key] for key in sorted(RANK_TABLE)], dtype=np.int32)
+
+
+def evaluate_batch(hands):
+    """
+    Scores many hands in one go. hands is an array of card codes with
+    one hand per row, shape (N, 5-7), for example (N, 7) int8. Returns
+    an int32 array of the N hand values, the same values evaluate gives
+    """
+    hands = np.asarray(hands, dtype=np.intp)
+    keys = _NP_RANK_KEYS[hands].sum(axis=1)
+    values = _NP_SORTED_VALUES[np.searchsorted(_NP_SORTED_KEYS, keys)]
+    bits = _NP_RANK_BITS[hands]
+    suits = hands & 3
+    # non-flush masks (under 5 cards of the suit) score 0 in the flush
+    # table, and a flush always beats the best non-flush hand it can
+    # share 7 cards with, so taking the max picks the right value
+    for suit in range(4):
+        masks = np.where(suits == suit, bits, 0).sum(axis=1)
+        np.maximum(values, _NP_FLUSH_TABLE[masks], out=values)
+    return values
@@ -0,0 +1,273 @@
+"""Preflop equity table
+
+There are only 169 different starting hands in Texas Hold'em once the
+suits are ignored (13 pairs, 78 suited and 78 offsuit hands), so their
+equities before the flop can be worked out once ahead of time instead
+of simulated every time a CPU player or /odds needs them.
+
+Heads up equities are exact: every board is played out for every pair
+of hands (see _board_shares). Against 2 or more random hands there are
+too many deals for that, so those are simulated.
+
+Running this module builds the table and writes it to TABLE_PATH:
+
+    python -m games.poker_preflop [samples] [max opponents]
+
+where samples is the number of runouts simulated per multiway equity.
+
+The file holds a header followed by two arrays of little endian
+unsigned 16 bit equities (0 -> 0%, 65535 -> 100%):
+    1. 169 x 169 heads up matrix, row hand's equity against column hand
+    2. 169 x max opponents, hand's equity against 1..max random hands
+poker.py memory maps it at import, so lookups read straight out of the
+file without copying or parsing anything.
+
+Hands are given by their index, see hand_index.
+"""
+import logging
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from itertools import permutations
+from math import comb
+import numpy as np
+from games.poker_eval import evaluate_batch
+from games.poker_equity import simulate
+
+# next to the bot's other configs, wherever it's started from
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "configs", "preflop_equity.bin")
+# runouts simulated for each equity against 2 or more random hands
+MULTIWAY_SAMPLES = 100000
+HAND_COUNT = 169
+# magic, version, max opponents
+_HEADER = struct.Struct("<4sHH")
+_MAGIC = b"PFEQ"
+_VERSION = 1
+_SCALE = 65535
+
+
+def hand_index(code1, code2):
+    """
+    Index (0-168) of the starting hand made of the two card codes.
+    Indexes form a 13 x 13 grid: pairs on the diagonal, suited hands
+    above it and offsuit hands below it
+    """
+    high = max(code1 >> 2, code2 >> 2)
+    low = min(code1 >> 2, code2 >> 2)
+    if (code1 & 3) == (code2 & 3):
+        return high * 13 + low
+    return low * 13 + high
+
+
+def hand_combos(index):
+    """
+    Every pair of card codes that makes up the starting hand at index
+    """
+    (row, col) = divmod(index, 13)
+    high = max(row, col)
+    low = min(row, col)
+    suited = row > col
+    combos = []
+    for suit1 in range(4):
+        for suit2 in range(4):
+            if suited != (suit1 == suit2) or (high == low and suit1 >= suit2):
+                continue
+            combos.append((high * 4 + suit1, low * 4 + suit2))
+    return combos
+
+
+class PreflopTable:
+    """
+    Read only view of a table file. The file is memory mapped and the
+    equities are read through a memoryview of it
+    """
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.max_opponents) = _HEADER.unpack_from(self.map)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} preflop equity table")
+        view = memoryview(self.map)[_HEADER.size:]
+        if sys.byteorder != "little":
+            # the file is little endian, so it can't be read in place here
+            swapped = array("H", view)
+            swapped.byteswap()
+            view = memoryview(swapped)
+        self.values = view.cast("H")
+        self.multiway_offset = HAND_COUNT * HAND_COUNT
+
+    def heads_up(self, hand, other_hand):
+        """
+        Equity of hand against other_hand, both given as hand indexes
+        """
+        return self.values[hand * HAND_COUNT + other_hand] / _SCALE
+
+    def vs_random(self, hand, opponents):
+        """
+        Equity of hand against the given number of random hands, or
+        None if the table doesn't go up to that many opponents
+        """
+        if not 1 <= opponents <= self.max_opponents:
+            return None
+        return self.values[self.multiway_offset + hand * self.max_opponents
+                           + opponents - 1] / _SCALE
+
+
+def load_table(path=TABLE_PATH):
+    """
+    Memory maps the table at path. Returns None if it hasn't been
+    built, in which case preflop odds are simulated like any other
+    """
+    if not os.path.exists(path):
+        logging.info("No preflop equity table at %s, preflop odds will be simulated", path)
+        return None
+    return PreflopTable(path)
+
+
+def _canonical_boards():
+    """
+    One board for every set of boards that only differ by swapping
+    suits around, along with how many boards it stands for. Every
+    starting hand class plays the same against each board of a set, so
+    only these 134,459 boards need playing out instead of all 2,598,960
+    """
+    boards = np.array(list(combinations(range(52), 5)), dtype=np.int64)
+    places = 52 ** np.arange(4, -1, -1)
+    keys = None
+    for suits in permutations(range(4)):
+        swapped = (boards & ~3) | np.array(suits)[boards & 3]
+        swapped.sort(axis=1)
+        swapped_keys = swapped @ places
+        keys = swapped_keys if keys is None else np.minimum(keys, swapped_keys)
+    (keys, weights) = np.unique(keys, return_counts=True)
+    return ((keys[:, None] // places) % 52, weights)
+
+
+def _combo_tables():
+    """
+    Every 2 card combo as (high code, low code), the combo index of any
+    2 card codes and the starting hand class of each combo
+    """
+    combos = np.array([(high, low) for high in range(52) for low in range(high)])
+    combo_index = np.zeros((52, 52), dtype=np.intp)
+    combo_index[combos[:, 0], combos[:, 1]] = np.arange(len(combos))
+    combo_index[combos[:, 1], combos[:, 0]] = np.arange(len(combos))
+    classes = np.array([hand_index(high, low) for (high, low) in combos])
+    return (combos, combo_index, classes)
+
+
+def _board_shares(boards, weights):
+    """
+    Plays every pair of hands that can be dealt alongside each board
+    against each other. Returns a combos x HAND_COUNT array of the pots
+    each combo wins (a tie counting as half) against each hand class,
+    every board counted weight times
+    """
+    (combos, combo_index, combo_classes) = _combo_tables()
+    class_of = np.zeros((52, 52), dtype=np.intp)
+    class_of[combos[:, 0], combos[:, 1]] = combo_classes
+    class_of[combos[:, 1], combos[:, 0]] = combo_classes
+    # hands are made of 2 of the 47 cards left after the board. Which
+    # positions of those cards make each hand is the same for every board
+    positions = np.array(list(combinations(range(47), 2)))
+    hands = len(positions)
+    # ordered pairs of different hands sharing a card, which can't both
+    # be dealt
+    holding = [np.flatnonzero((positions == card).any(axis=1)) for card in range(47)]
+    mine = np.concatenate([np.repeat(held, len(held)) for held in holding])
+    theirs = np.concatenate([np.tile(held, len(held)) for held in holding])
+    (mine, theirs) = (mine[mine != theirs], theirs[mine != theirs])
+
+    shares = np.zeros((len(combos), HAND_COUNT))
+    for (board, weight) in zip(boards, weights):
+        rest = np.setdiff1d(np.arange(52), board)
+        first = rest[positions[:, 0]]
+        second = rest[positions[:, 1]]
+        classes = class_of[first, second]
+        values = evaluate_batch(np.column_stack((first, second, np.broadcast_to(board, (hands, 5)))))
+        # how many hands of each class score each distinct value, and so
+        # how many of each class every hand beats or ties with
+        (distinct, ranks) = np.unique(values, return_inverse=True)
+        counts = np.bincount(ranks * HAND_COUNT + classes,
+                             minlength=len(distinct) * HAND_COUNT).reshape(len(distinct), HAND_COUNT)
+        share = (np.cumsum(counts, axis=0) - counts / 2)[ranks]
+        # take back the hands that couldn't have been dealt with each
+        # hand: the ones sharing a card with it, and itself
+        beaten = (values[theirs] < values[mine]) + (values[theirs] == values[mine]) / 2
+        share -= np.bincount(mine * HAND_COUNT + classes[theirs], weights=beaten,
+                             minlength=hands * HAND_COUNT).reshape(hands, HAND_COUNT)
+        share[np.arange(hands), classes] -= 0.5
+        shares[combo_index[first, second]] += weight * share
+    return shares
+
+
+def _heads_up_equities(chunks=64):
+    """
+    Exact equity of every hand class against every other, and against
+    one random hand, over every board. Returns (heads up, vs random)
+    as flat lists in table order
+    """
+    (boards, weights) = _canonical_boards()
+    with ProcessPoolExecutor() as executor:
+        jobs = [executor.submit(_board_shares, boards[part], weights[part])
+                for part in np.array_split(np.arange(len(boards)), chunks)]
+        shares = sum(job.result() for job in jobs)
+    (combos, _, combo_classes) = _combo_tables()
+    members = np.zeros((len(combos), HAND_COUNT))
+    members[np.arange(len(combos)), combo_classes] = 1
+    # pots won by each class against each class, and how many deals of a
+    # pair of hands and a board there are between them
+    won = members.T @ shares
+    masks = (1 << combos[:, 0]) | (1 << combos[:, 1])
+    apart = (masks[:, None] & masks[None, :]) == 0
+    deals = members.T @ apart @ members * comb(48, 5)
+    return ((won / deals).ravel().tolist(), (won.sum(axis=1) / deals.sum(axis=1)).tolist())
+
+
+def _multiway_equity(hand, opponents, samples, seed):
+    """
+    Equity of hand against random hands. Suits don't matter against
+    random hands, so any one combo of the hand gives the same answer
+    """
+    (_, _, share) = simulate(list(hand_combos(hand)[0]), [], opponents, samples, seed)
+    return (hand, opponents, share / samples)
+
+
+def build_table(path=TABLE_PATH, samples=MULTIWAY_SAMPLES, max_opponents=8):
+    """
+    Works out every equity in the table across a process pool and
+    writes it to path. Heads up equities (and against one random hand)
+    are exact, against 2 or more random hands they're simulated with
+    samples runouts each
+    """
+    (heads_up, vs_one) = _heads_up_equities()
+    multiway = [0.0] * (HAND_COUNT * max_opponents)
+    for hand in range(HAND_COUNT):
+        multiway[hand * max_opponents] = vs_one[hand]
+    seed = random.getrandbits(32)
+    with ProcessPoolExecutor() as executor:
+        multiway_jobs = [executor.submit(_multiway_equity, hand, opponents, samples,
+                                         seed + hand * max_opponents + opponents)
+                         for hand in range(HAND_COUNT)
+                         for opponents in range(2, max_opponents + 1)]
+        for job in multiway_jobs:
+            (hand, opponents, equity) = job.result()
+            multiway[hand * max_opponents + opponents - 1] = equity
+    values = array("H", (round(equity * _SCALE) for equity in heads_up + multiway))
+    if sys.byteorder != "little":
+        values.byteswap()
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, max_opponents))
+        values.tofile(file)
+
+
+if __name__ == "__main__":
+    build_table(samples=int(sys.argv[1]) if len(sys.argv) > 1 else MULTIWAY_SAMPLES,
+                max_opponents=int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+    print(f"Preflop equity table written to {TABLE_PATH}")
@@ -0,0 +1,75 @@
+"""Base menu routing
+
+A game's base menu stays up for the whole game and gets re-rendered on
+every change, so its buttons aren't handled by a live view that
+discord.py keeps per message. Instead every button's custom_id says
+where the press should go:
+
+    lt:<channel id>:<menu version>:<action>
+
+The bot's on_interaction hook hands presses to GameFactory.route, which
+finds the game by channel id and calls the button declared with the
+custom_id action on the game's current base menu (GameManager.route).
+The menu version goes up every time a game swaps its base menu, so
+presses on buttons left over from an older menu are turned away. Since
+none of this lives in discord.py's view store, base menu buttons never
+time out and they keep working after the bot restarts and the game is
+restored.
+"""
+import discord
+
+PREFIX = "lt"
+
+
+def make_custom_id(channel_id, version, action):
+    return f"{PREFIX}:{channel_id}:{version}:{action}"
+
+
+def parse_custom_id(custom_id):
+    """
+    Returns (channel id, menu version, action) for a base menu
+    custom_id, or None if custom_id isn't one
+    """
+    parts = custom_id.split(":")
+    if len(parts) != 4 or parts[0] != PREFIX:
+        return None
+    try:
+        return (int(parts[1]), int(parts[2]), parts[3])
+    except ValueError:
+        return None
+
+
+class RoutedView(discord.ui.View):
+    """
+    View for a game's base menu. Buttons are declared with
+    discord.ui.button like any other view, giving each one its action
+    as its custom_id, and their callbacks run through GameManager.route.
+
+    The view is stopped as soon as it's made. discord.py only registers
+    a view sent with a message (and starts its timeout) if
+    view.is_finished() is False, so a stopped view is never put in its
+    view store; it's only used to render the buttons and look up their
+    callbacks.
+    """
+    def __init__(self):
+        super().__init__(timeout=None)
+        # action -> button, the action being the custom_id the button
+        # was declared with
+        self.routes = {item.custom_id: item for item in self.children
+                       if isinstance(item, discord.ui.Button)}
+        # components as sent to Discord, built once by route
+        self.components = None
+        self.stop()
+
+    def route(self, channel_id, version):
+        """
+        Give the buttons the custom_ids of menu version in channel_id
+        """
+        for (action, button) in self.routes.items():
+            button.custom_id = make_custom_id(channel_id, version, action)
+        self.components = super().to_components()
+
+    def to_components(self):
+        if self.components is None:
+            return super().to_components()
+        return self.components
@@ -0,0 +1,222 @@
+"""Timers
+
+Everything that expires (ephemeral messages that clean themselves up,
+announcements, button menus that stop taking input) is timed by one
+hierarchical timer wheel, TIMERS, instead of each message and view
+starting its own sleeping task.
+
+The wheel moves forward one slot every TICK seconds. A timer goes into
+the slot of the innermost wheel that can reach it: wheel 0 covers the
+next WHEEL_SIZE ticks, wheel 1 the next WHEEL_SIZE ** 2 and so on. Each
+time an inner wheel comes round, the matching slot of the next wheel
+out is emptied back into the inner wheels. Scheduling, cancelling and
+firing a timer are all O(1), and there's only one task however many
+timers are waiting. Timers fire up to a tick late.
+
+Everything that comes due on the same tick is run together: a callback
+that returns an awaitable (a message delete, say) is gathered with the
+others from that tick in one task.
+
+TimedView is a discord.ui.View whose timeout is kept on TIMERS.
+"""
+import asyncio
+import inspect
+import logging
+import discord
+
+# seconds per slot
+TICK = 0.25
+# slots per wheel
+WHEEL_SIZE = 64
+# number of wheels, 3 covers 0.25 * 64 ** 3 seconds (about 18 hours);
+# anything further out goes round the outer wheel more than once
+WHEELS = 3
+# how long views take input for after they're sent or last used,
+# discord.py's default
+VIEW_TIMEOUT = 180
+
+
+class Timer:
+    """
+    Handle for a scheduled callback, see TimerWheel.schedule
+    """
+    __slots__ = ("due", "callback", "args", "cancelled")
+
+    def __init__(self, due, callback, args):
+        # tick the timer fires on
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Stop the callback from running, if it hasn't yet
+        """
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel, see the module docstring
+    """
+    def __init__(self, tick=TICK, size=WHEEL_SIZE, wheels=WHEELS):
+        self.tick = tick
+        self.size = size
+        self.wheels = [[[] for _ in range(size)] for _ in range(wheels)]
+        # ticks since the wheel was made
+        self.now = 0
+        # loop time of tick 0, reset whenever the wheel starts up again
+        self.origin = 0.0
+        # timers in the wheel, cancelled ones included
+        self.count = 0
+        # task turning the wheel, None while there are no timers
+        self.task = None
+        # gathers from the last few ticks, kept so they aren't garbage collected
+        self.batches = set()
+
+    def schedule(self, delay, callback, *args):
+        """
+        Call callback(*args) in delay seconds. Returns a Timer that can be
+        cancelled
+        """
+        now = asyncio.get_running_loop().time()
+        if self.task is None:
+            # the wheel stood still while it was empty, catch its clock up
+            self.origin = now - self.now * self.tick
+            self.task = asyncio.create_task(self.run())
+        # first tick at or after the time it's due
+        due = -int(-(now + delay - self.origin) // self.tick)
+        timer = Timer(max(due, self.now + 1), callback, args)
+        self.place(timer)
+        self.count += 1
+        return timer
+
+    def place(self, timer):
+        """
+        Put timer into the innermost wheel that reaches it
+        """
+        span = self.size
+        for (level, wheel) in enumerate(self.wheels):
+            if timer.due - self.now < span or level == len(self.wheels) - 1:
+                wheel[(timer.due * self.size // span) % self.size].append(timer)
+                return
+            span *= self.size
+
+    def advance(self):
+        """
+        Move forward one tick, returning the timers that came due
+        """
+        self.now += 1
+        # empty the outer wheels' slots that have come round into the inner ones
+        span = self.size
+        for wheel in self.wheels[1:]:
+            if self.now % span:
+                break
+            slot = (self.now // span) % self.size
+            (cascading, wheel[slot]) = (wheel[slot], [])
+            for timer in cascading:
+                self.place(timer)
+            span *= self.size
+        slot = self.now % self.size
+        (due, self.wheels[0][slot]) = (self.wheels[0][slot], [])
+        self.count -= len(due)
+        return [timer for timer in due if not timer.cancelled]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.count:
+                await asyncio.sleep(self.origin + (self.now + 1) * self.tick - loop.time())
+                # catch up on any ticks missed while the loop was busy
+                while self.count and self.origin + (self.now + 1) * self.tick <= loop.time():
+                    self.fire(self.advance())
+        finally:
+            self.task = None
+
+    def fire(self, timers):
+        """
+        Run the callbacks of timers, gathering any awaitables they return
+        into one task
+        """
+        pending = []
+        for timer in timers:
+            try:
+                result = timer.callback(*timer.args)
+            except Exception:
+                logging.exception("Timer callback failed")
+                continue
+            if inspect.isawaitable(result):
+                pending.append(result)
+        if pending:
+            batch = asyncio.create_task(self.gather(pending))
+            self.batches.add(batch)
+            batch.add_done_callback(self.batches.discard)
+
+    async def gather(self, pending):
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+                logging.error("Timer callback failed: %r", result)
+
+
+# shared by everything in the process
+TIMERS = TimerWheel()
+
+
+def expire_response(interaction, delay):
+    """
+    Delete the response to interaction after delay seconds. Returns the
+    Timer, cancel it if the response gets deleted some other way first
+    """
+    return TIMERS.schedule(delay, interaction.delete_original_response)
+
+
+def expire_message(message, delay):
+    """
+    Delete message after delay seconds. Returns the Timer
+    """
+    return TIMERS.schedule(delay, message.delete)
+
+
+class TimedView(discord.ui.View):
+    """
+    discord.ui.View with its timeout kept on TIMERS. The timeout starts
+    when start_timer is called, which whoever sends the view does right
+    after sending it (Outbox.send does it for messages it sends), and
+    starts over every time the view is used. Once it runs out the view
+    stops and on_timeout is called like a plain view, except that
+    wait() returns False after a timeout too
+    """
+    def __init__(self, timeout=VIEW_TIMEOUT):
+        # a view with a timeout starts its own task to wait on it, so
+        # discord.py is told there's none
+        super().__init__(timeout=None)
+        self.expires_after = timeout
+        self.timer = None
+
+    def start_timer(self):
+        """
+        Start the timeout, or start it over if it's already running
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.expires_after is not None and not self.is_finished():
+            self.timer = TIMERS.schedule(self.expires_after, self.expire)
+
+    def expire(self):
+        self.timer = None
+        if self.is_finished():
+            return None
+        self.stop()
+        return self.on_timeout()
+
+    async def interaction_check(self, interaction):
+        self.start_timer()
+        return True
+
+    def stop(self):
+        super().stop()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
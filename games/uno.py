@@ -8,45 +8,135 @@ import discord
 from games.game import BaseGame
 from games.game import GameManager
 from games.game import BasePlayer
-from util import Card
+from games.game import CpuUser
+from games.router import RoutedView
+from games.timers import TimedView
+from games.timers import expire_response
+from games.uno_rules import UnoCard
+from games.uno_rules import UnoHand
+from games.uno_rules import UnoPile
+from games.uno_rules import card_effect
+from games.uno_rules import draw_from
+from games.uno_rules import is_playable
+from games.uno_rules import is_starting_card
+from games.uno_rules import next_seat
+from games.uno_rules import next_turn
+from games.uno_rules import place_card
+from games.uno_ai import UNO_BRAIN
+from util import respond
+from util import send_info_message
 import random
 
+# most CPU players a table can have
+MAX_CPUS = 3
+# seconds a CPU player spends searching for its move
+CPU_THINK_TIME = 0.5
+# cards shown per page of the "Show Hand" menu. Discord allows 25
+# components (5 rows of 5) per message, and the last row is kept for
+# the page buttons
+CARDS_PER_PAGE = 20
+# what's announced when the next player is skipped by each face
+SKIP_TAUNTS = {"Skip": " got skipped! LOL!",
+               "Draw Two": " eats two cards! LMAO!",
+               "Draw Four": " eats four cards! ROFL!!"}
+
 
 class UnoPlayer(BasePlayer):
     """
     Represents an player of the uno game. Extended from the BasePlayer
-    class to include a few extra attributes: a list that represents
-    the player's hand, a boolean to flag when the player has been 
-    skipped, and a method to determine which cards in the player's 
-    hand are playable given the game state's top card. 
+    class to include a few extra attributes: an UnoHand that represents
+    the player's hand and a method to determine which cards in the
+    player's hand are playable given the game state's top card.
     
     active_interaction serves as a reference to the interaction of 
     pressing the "Show Hand" button. We need to track it so that we
     can delete the interaction message if the player presses "Draw"
     instead of a playing a card. Otherwise, the "Show Hand" menu
     will linger until it deletes itself. 
+
+    hand_pages caches the pages of that menu, see UnoHandPages.
     """
-    def __init__(self):
+    def __init__(self, is_cpu=False):
         super().__init__()
     
-        self.hand = []
-        self.skipped = False
+        self.hand = UnoHand()
+        self.active_interaction = None
+        self.is_cpu = is_cpu
+        self.hand_pages = UnoHandPages()
+
+    def reset(self):
+        """
+        Empty the player's hand after a game ends
+        """
+        self.hand.clear()
         self.active_interaction = None
+        self.hand_pages.clear()
         
     def get_playable_cards(self, top_card):
-        playable_cards = [card for card in self.hand if card.name == top_card.name or card.value == top_card.value or card.name == "Wild"]
-        return playable_cards
+        return self.hand.get_playable(top_card)
+
+
+class UnoHandPages:
+    """
+    The pages of a player's "Show Hand" menu, CARDS_PER_PAGE cards at a
+    time. A page is a tuple of (card, emoji, disabled) for each of its
+    buttons, which UnoCardButtons turns into buttons.
+
+    Pages are only worked out when they're shown, and kept until the
+    top card, whose turn it is or the cards on that page change. A new
+    card only changes the pages from where it was sorted into onwards,
+    so the pages before it are reused.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # (top card, is it the player's turn) the pages were made for
+        self.key = None
+        # hand version the playable cards were worked out for
+        self.version = None
+        self.playable = None
+        # page number -> (cards on the page, page)
+        self.pages = {}
+
+    def get_page(self, manager, unoplayer, is_turn, page):
+        """
+        Returns page number page of unoplayer's hand
+        """
+        key = (manager.game.top_card, is_turn)
+        if key != self.key:
+            self.pages.clear()
+            self.key = key
+            self.version = None
+        hand = unoplayer.hand
+        if hand.version != self.version:
+            self.playable = hand.get_playable(manager.game.top_card) if is_turn else set()
+            self.version = hand.version
+        start = page * CARDS_PER_PAGE
+        cards = hand.cards[start:start + CARDS_PER_PAGE]
+        cached = self.pages.get(page)
+        if cached is not None and cached[0] == cards:
+            return cached[1]
+        built = tuple((card, manager.color_to_emoji(card), card not in self.playable)
+                      for card in cards)
+        self.pages[page] = (cards, built)
+        return built
+
+    @staticmethod
+    def page_count(unoplayer):
+        """
+        Number of pages unoplayer's hand takes up (at least 1)
+        """
+        return max(1, -(-len(unoplayer.hand) // CARDS_PER_PAGE))
         
 
 class UnoGame(BaseGame):
     """
     Uno game model class to represent the game state of Uno. It is
     extended from BaseGame to include extra properties:
-        1. deck: List of Card objects that represents the deck of 
-           Uno cards.
-        2. discard: List of Card objects that represents the discard 
-           pile, required to be tracked to replenish the deck when 
-           it's empty.
+        1. deck: UnoPile that represents the deck of Uno cards.
+        2. discard: UnoPile that represents the discard pile, required
+           to be tracked to replenish the deck when it's empty.
         3. turn_order: List of whatever type 'discord.interaction.user'
            is supposed to be. We use this list to maintain turn order.
         4. turn_index: Integer iterator over turn_order to know who
@@ -56,24 +146,37 @@ class UnoGame(BaseGame):
         6. top_card: A Card object that represents the Uno card at 
            the middle of the table that the players need to match
            color or value.
+    CPU players are seated from the start.
     """
-    def __init__(self):
+    def __init__(self, cpus=0):
+        cpus = max(0, min(cpus, MAX_CPUS))
         # game state 1 -> accepting players but not playing yet
-        super().__init__(game_type=3, player_data={}, game_state=1)
+        super().__init__(game_type=3, player_data={}, game_state=1, cpus=cpus)
         
-        self.deck = []
-        self.discard = []
+        self.deck = UnoPile()
+        self.discard = UnoPile()
         self.turn_order = []
         self.turn_index = 0
         self.reversed = False
         self.top_card = UnoCard("None", "")
+        for number in range(cpus):
+            cpu = CpuUser(f"CPU {number + 1}")
+            self.player_data[cpu] = UnoPlayer(is_cpu=True)
+            self.turn_order.append(cpu)
+
+    def get_active_player(self):
+        if self.game_state != 4:
+            return None
+        return self.turn_order[self.turn_index]
       
         
 class UnoManager(GameManager):
     '''
     Uno game model class that controls the flow of Uno by interacting
     and modifying its UnoGame property and updating its base GUI to
-    receive input from the players. A brief overview of its methods:
+    receive input from the players. The rules themselves (what a card
+    does, whose turn is next, drawing) live in games.uno_rules, so
+    UnoTable plays by the same ones. A brief overview of its methods:
     1. add_player: adds player to the game
     2. remove_player: removes player from the game
     3. start_game: proceeds to game setup
@@ -81,19 +184,21 @@ class UnoManager(GameManager):
     5. start_new_round: return to "player join" phase
     6. setup: Sets up the table and players' hands
     7. draw_cards: Gives player cards from the deck
-    8. regenerate_deck: Replenishes the deck when its empty
-    9. get_player_hand: Handy getter of a player's hand
-    10. update_turn_index: Increment or decrement turn index
-    11. get_next_turn_index: Tells what the current turn index is
-    12. play_card: Handles events of playing a card
-    13. next_turn: Update turn index, skipping 'skipped' players
-    14. announce: Gives each player important information
-    15. card_to_emoji: Returns emoji of a card (colon-flanked-text)
-    16. color_to_emoji: Returns emoji of a card (actual-emoji)
+    8. get_player_hand: Handy getter of a player's hand
+    9. get_next_turn_index: Tells what the next turn index is
+    10. play_card: Handles events of playing a card
+    11. next_turn: Update turn index, passing over a skipped player
+    12. announce: Gives each player important information
+    13. card_to_emoji: Returns emoji of a card (colon-flanked-text)
+    14. color_to_emoji: Returns emoji of a card (actual-emoji)
+    15. start_cpu_turns: Lets CPU players take their turns
     '''
-    def __init__(self, factory, channel):
-        super().__init__(game=UnoGame(), base_gui=UnoButtonsBase(self),
+    def __init__(self, factory, channel, cpus=0):
+        super().__init__(game=UnoGame(cpus), base_gui=UnoButtonsBase(self),
                          channel=channel, factory=factory)
+        # flow letting CPU players take their turns, None while it's not
+        # running, see start_cpu_turns
+        self.cpu_flow = None
         
     async def add_player(self, interaction, init_player_data=None):
         '''
@@ -106,6 +211,16 @@ class UnoManager(GameManager):
         and interaction.user not in self.game.turn_order:
             self.game.turn_order.append(interaction.user)
 
+    def get_options(self):
+        return {"cpus": self.game.cpus}
+
+    def new_player(self):
+        return UnoPlayer()
+
+    def seat_player(self, user, player_data):
+        super().seat_player(user, player_data)
+        self.game.turn_order.append(user)
+
     async def remove_player(self, interaction):
         '''
         remove_player: Called when a user presses the "Quit" button.
@@ -127,8 +242,7 @@ class UnoManager(GameManager):
         calls the setup() method to setup the game state.
         '''
         if self.game.game_state == 4:
-            interaction.response.send_message("This game has already started.",
-                                              ephemeral = True, delete_after = 10)
+            await send_info_message("This game has already started.", interaction)
             return
         # game_state == 4 -> players cannot join or leave
         self.game.game_state = 4
@@ -137,6 +251,8 @@ class UnoManager(GameManager):
         # setup the game board
         await self.setup()
         await self.resend(interaction)
+        # a CPU might be first to go
+        self.start_cpu_turns()
         
     def get_base_menu_string(self):
         '''
@@ -174,20 +290,14 @@ class UnoManager(GameManager):
         self.quick_log("Setting up the game of Uno...")
         # Create the deck
         self.game.discard.clear()
-        self.game.deck = self.generate_deck()
-        random.shuffle(self.game.deck)
+        self.game.deck.fill()
         # Each player gets 7 cards to start
         for i in self.game.player_data:
             await self.draw_cards(self.game.player_data[i], 7)
         # Assign the top-card. The game cannot begin on a "Reverse", "Skip", "Draw Two", or "Wild"
         while True:
             self.game.top_card = self.game.deck.pop()
-            top_card_is_valid = True
-            if (self.game.top_card.value == "Reverse"): top_card_is_valid = False
-            if (self.game.top_card.value == "Skip"): top_card_is_valid = False
-            if (self.game.top_card.value == "Draw Two"): top_card_is_valid = False
-            if (self.game.top_card.name == "Wild"): top_card_is_valid = False
-            if not top_card_is_valid: 
+            if not is_starting_card(self.game.top_card): 
                 self.game.discard.append(self.game.top_card)
                 continue
             else:
@@ -200,94 +310,58 @@ class UnoManager(GameManager):
         '''
         draw_cards: Takes an UnoPlayer object as an argument, as well 
         as an optional integer, and adds cards to the UnoPlayer's hand
-        from the top of the deck. If the deck is empty, this method
-        calls regenerate_deck() to replenish it. If an optional integer
-        argument is provided, this method adds that many cards to the 
-        players hand. Otherwise, it defaults to adding only 1 card.
+        from the top of the deck. If the deck is empty, the discard
+        pile is shuffled back into it (see uno_rules.draw_from). If an
+        optional integer argument is provided, this method adds that
+        many cards to the players hand. Otherwise, it defaults to adding
+        only 1 card. Drawing stops early if there are no cards left at
+        all.
         '''
         self.quick_log("A player is drawing cards...")
+        card = None
         for i in range(num_cards):
-            if len(self.game.deck) == 0: 
+            (card, refilled) = draw_from(self.game.deck, self.game.discard)
+            if refilled:
                 await self.announce("The deck is empty! Shuffling in the discard pile...")
-                self.regenerate_deck()
-            card = self.game.deck.pop()
-            player.hand.append(card)
-            player.hand = sorted(player.hand)
+            if card is None:
+                await self.announce("There are no cards left to draw!")
+                break
+            # the hand keeps itself sorted
+            player.hand.add(card)
         if num_cards == 1: return card
     
-    def regenerate_deck(self):
-        '''
-        regenerate_deck: This method is called by draw_cards() to 
-        replenish the deck when its empty. It simply shuffles the 
-        discard pile, adds all the cards in the discard pile to the
-        deck, then empties the discard pile.
-        '''
-        self.quick_log("Regenerating the deck...")
-        random.shuffle(self.game.discard)
-        self.game.deck += self.game.discard 
-        self.game.discard.clear()
-    
     def get_player_hand(self, player):
         '''
         get_player_hand: Easy method to see player's hand.
         '''
         return self.game.player_data[player].hand
     
-    def update_turn_index(self):
-        '''
-        update_turn_index: Called after a player plays a card. This
-        method increments or decrements the game state's turn_index 
-        depending on if the game state is reversed or not. This method
-        also returns the turn_index to the beginning or end of the 
-        turn_order if incrementing/decrementing would exceed boundaries.
-        '''
-        index = self.game.turn_index
-        if not self.game.reversed:
-            index += 1
-            if index == len(self.game.turn_order):
-                index = 0
-            self.game.turn_index = index
-        elif self.game.reversed:
-            index -= 1
-            if index == -1:
-                index = len(self.game.turn_order) - 1
-            self.game.turn_index = index
-    
     def get_next_turn_index(self):
         '''
         get_next_turn_index: This method tells us who the next player
         is by returning an integer that would be the next turn_index,
         taking into account whether the game state is reversed or not.
         This method is called when a player plays a "Skip", "Draw Two",
-        and "Draw Four" card to determine which UnoPlayer object needs
-        to be flagged as 'skipped', as well as forcing feeding that 
-        player some cards on "Draw Two" and "Draw Four".
-        '''
-        next_player = self.game.turn_index
-        if not self.game.reversed:
-            next_player += 1
-            if next_player == len(self.game.turn_order):
-                next_player = 0
-            return next_player
-        elif self.game.reversed:
-            next_player -= 1
-            if next_player == -1:
-                next_player = len(self.game.turn_order) - 1
-            return next_player
+        and "Draw Four" card to determine which player gets skipped, as
+        well as forcing feeding that player some cards on "Draw Two"
+        and "Draw Four".
+        '''
+        return next_seat(self.game.turn_index, len(self.game.turn_order), self.game.reversed)
     
-    async def play_card(self, interaction, card):
+    async def play_card(self, interaction, card, user=None, color=None):
         '''
         play_card: This method is called when a player presses a 
         button corresponding to a card in their hand. It takes the
-        interaction and the corresponding card as arguments. The top card 
+        interaction and the corresponding card as arguments, and the color
+        picked for wild cards (see CardButton). CPU players pass no
+        interaction, their user instead. The top card 
         is replaced with that card (unless the card is Wild, then we do 
         it differently). Then, depending on the card, this method branches 
-        off into different cases: 
-            a. "Wild": Prompt the player to choose a color by giving
-            them a new button menu. The new menu will replace the top
-            card with a placeholder card that has no value but does 
-            have the color chosen by the player.
-            b. "Skip": Determine next player and flag them as 'skipped'
+        off into different cases (see uno_rules.card_effect): 
+            a. "Wild": Replace the top card with a placeholder card
+            that has no value but does have the color chosen by the
+            player.
+            b. "Skip": Skip next player.
             c. "Reverse": Switch the game state's 'reversed' property.
             d. "Draw Two": Skip next player and force feed two cards.
             e. "Draw Four": Skip next player and force feed four cards.
@@ -302,76 +376,171 @@ class UnoManager(GameManager):
         be desired in this area.
         '''
         self.quick_log("A player is playing a card...")
-        # We put add the top card to the discard pile, 
-        # but only if it's not a placeholder card        
-        if (self.game.top_card.value != "Card"):
-            self.game.discard.append(self.game.top_card)
-        # Then we can replace the top card with the played card, unless it's wild
-        if (card.name == "Wild"): 
-            view = UnoWildCard(self) # Menu to inquire what the next card is
-            await interaction.response.send_message("Choose a color!", view = view, ephemeral=True, delete_after=10)
-            await view.wait()
-            await interaction.delete_original_response()
-        else: # Not wild, just replace
-            self.game.top_card = card
+        if user is None:
+            # the hand menu the card came from might be out of date
+            if not await self.can_play(interaction, card):
+                return
+            user = interaction.user
+        # The played card becomes the top card (a placeholder of the
+        # chosen color if it's wild), the old one goes to the discard pile
+        self.game.top_card = place_card(card, color, self.game.top_card, self.game.discard)
+        (reverse, draws, skip) = card_effect(card)
         # If card is "Skip", "Draw Two", or "Draw Four", you will need a victim
         victim_user = self.game.turn_order[self.get_next_turn_index()]
         victim_name = victim_user.display_name
         victim_unoplayer = self.game.player_data[victim_user]
         # If "Reverse" card was played, reverse the queue
-        if card.value == "Reverse":
+        if reverse:
             self.game.reversed = not self.game.reversed
             await self.announce("Reversing the turn order!")
-        # If "Skip" was played, flag them as 'skipped'
-        if card.value == "Skip":
-            await self.announce(victim_name + " got skipped! LOL!")
-            victim_unoplayer.skipped = True
-        # If "Draw Two" was played, make next player draw two cards
-        #    and then flag them as 'skipped'
-        if card.value == "Draw Two":
-            await self.announce(victim_name + " eats two cards! LMAO!")
-            await self.draw_cards(victim_unoplayer, 2)
-            victim_unoplayer.skipped = True
-        # If "Draw Four" was played, make next player draw four cards
-        #    and then flag them as 'skipped'
-        if card.value == "Draw Four":
-            await self.announce(victim_name + " eats four cards! ROFL!!")
-            await self.draw_cards(victim_unoplayer, 4)
-            victim_unoplayer.skipped = True
+        # If "Skip", "Draw Two" or "Draw Four" was played, the next player
+        #    draws whatever they have to and misses their turn
+        if skip:
+            await self.announce(victim_name + SKIP_TAUNTS[card.value])
+        if draws:
+            await self.draw_cards(victim_unoplayer, draws)
         # Remove the played card from the player's hand
-        player = self.game.player_data[interaction.user]
+        player = self.game.player_data[user]
         player.hand.remove(card)
         if len(player.hand) == 1:
-            await self.announce("Oh fuck! " + interaction.user.display_name + " has only one card left!")
+            await self.announce("Oh fuck! " + user.display_name + " has only one card left!")
         if len(player.hand) == 0:
-            await self.end_game(interaction)
+            await self.end_game(user, interaction)
             return
         # Go to next turn
-        await self.next_turn()
+        await self.next_turn(skip)
 
 
-    async def next_turn(self):
+    async def can_play(self, interaction, card):
         '''
-        next_turn: This method calls the update_turn_index() several times,
-        skipping over 'skipped' players and restoring the flag to default, 
-        until a player that is not flagged as 'skipped' is discovered. Then,
-        this method refreshes the base GUI so the new player can take their
-        turn.
+        can_play: Checks that it's still the user's turn and that they
+        can still play card, and tells them if not.
+        '''
+        player = self.game.player_data.get(interaction.user)
+        if (self.game.get_active_player() == interaction.user and card in player.hand
+                and is_playable(card, self.game.top_card)):
+            return True
+        self.quick_log("Couldn't play card (stale hand)", interaction)
+        await send_info_message("You can't play that card right now.", interaction)
+        return False
+
+    async def draw_for_turn(self, interaction):
+        '''
+        draw_for_turn: Called when a player presses "Draw". Gives them
+        a card, tells them what it was and moves on to the next turn.
+        '''
+        # Reject request to draw cards if button presser is not the current turn player
+        if not await self.interaction_is_valid(interaction, turn_order=True):
+            return
+        player = self.game.player_data[interaction.user]
+        # If there is an active "Show Hand" menu, we should delete it now
+        if (player.active_interaction):
+            await player.active_interaction.delete_original_response()
+            player.active_interaction = None
+
+        card_drawn = await self.draw_cards(player)
+        if card_drawn is None:
+            await send_info_message("There are no cards left to draw.", interaction)
+            await self.next_turn()
+            return
+        await respond(interaction, "You drew a " + self.color_to_emoji(card_drawn) + " " + card_drawn.value,
+                      delete_after=2, ephemeral = True)
+        
+        # Announce that player has opted to draw a card and proceed to next turn
+        await self.announce(str(interaction.user) + " is drawing a card...")
+        await self.next_turn()
+
+    async def next_turn(self, skip=False):
+        '''
+        next_turn: This method moves the turn on to the next player
+        (passing over them if they got skipped, see uno_rules.next_turn).
+        Then, this method refreshes the base GUI so the new player can
+        take their turn.
         '''
         self.quick_log("Going to the next turn...")
-        # Increment (or decrement if turn order reversed) the turn index 
-        self.update_turn_index()
-    
-        # Check if player is skipped. If so, move on to the next player
-        next_player = self.game.player_data[self.game.turn_order[self.game.turn_index]]
-        while next_player.skipped:
-            next_player.skipped = False
-            self.update_turn_index()
-            next_player = self.game.player_data[self.game.turn_order[self.game.turn_index]]
+        self.game.turn_index = next_turn(self.game.turn_index, len(self.game.turn_order),
+                                         self.game.reversed, skip)
 
-        # Refresh the base GUI
-        await self.current_active_menu.edit(content=self.get_base_menu_string(),
-                                            view=self.base_gui)
+        # Refresh the base GUI, CPU turns that follow straight after this
+        # one end up in the same edit
+        self.request_render()
+        # let any CPU players whose turn it is now take it
+        self.start_cpu_turns()
+
+    def start_cpu_turns(self):
+        '''
+        start_cpu_turns: Starts the CPU turn flow (see run_cpu_turns)
+        if it's a CPU's turn and it isn't already running.
+        '''
+        if self.cpu_flow is None and self.cpu_to_play() is not None:
+            self.cpu_flow = self.spawn(self.run_cpu_turns())
+
+    def cpu_to_play(self):
+        '''
+        cpu_to_play: The CPU player whose turn it is, or None if it's
+        not a CPU's turn.
+        '''
+        if self.game.game_state != 4:
+            return None
+        player = self.game.turn_order[self.game.turn_index]
+        return player if self.game.player_data[player].is_cpu else None
+
+    async def run_cpu_turns(self):
+        '''
+        run_cpu_turns: Flow that lets CPU players take their turns for
+        as long as it's a CPU's turn. It runs outside the actor (see
+        spawn), so players' button presses aren't held up while a CPU
+        searches for its move, and only the move itself goes through
+        call.
+        '''
+        try:
+            while True:
+                cpu = self.cpu_to_play()
+                if cpu is None:
+                    return
+                (card, color) = await self.choose_cpu_move(cpu)
+                await self.call(self.play_cpu_move, cpu, card, color)
+        finally:
+            self.cpu_flow = None
+
+    async def choose_cpu_move(self, cpu):
+        '''
+        choose_cpu_move: Has a CPU player search for its best move (in
+        the background, see uno_ai). Returns (card, color), card is
+        None to draw.
+        '''
+        hand = self.game.player_data[cpu].hand
+        me = self.game.turn_index
+        # the CPU knows the cards it can't see, but not where they are
+        unseen = list(self.game.deck)
+        for player in self.game.turn_order:
+            if player != cpu:
+                unseen.extend(self.game.player_data[player].hand)
+        return await UNO_BRAIN.choose(
+            hand, self.game.top_card,
+            [len(self.game.player_data[player].hand) for player in self.game.turn_order],
+            me, self.game.reversed, unseen, self.game.discard, len(self.game.deck),
+            budget=CPU_THINK_TIME)
+
+    async def play_cpu_move(self, cpu, card, color):
+        '''
+        play_cpu_move: Plays or draws for a CPU like a player pressing
+        the buttons would, as long as it's still its turn.
+        '''
+        if self.cpu_to_play() != cpu:
+            return
+        if card is not None and (card not in self.game.player_data[cpu].hand
+                                 or not is_playable(card, self.game.top_card)):
+            # the game moved on while the CPU was thinking (a new round
+            # started, say), run_cpu_turns will have it think again
+            return
+        if card is None:
+            await self.draw_cards(self.game.player_data[cpu])
+            await self.announce(str(cpu) + " is drawing a card...")
+            await self.next_turn()
+            return
+        await self.announce(f"{cpu} played {self.card_to_emoji(card)}")
+        await self.play_card(None, card, user=cpu, color=color)
 
     async def announce(self, announcement):
         '''
@@ -382,34 +551,7 @@ class UnoManager(GameManager):
             c. Player has 1 card remaining in hand.
             d. Player won.
         '''
-        await self.channel.send(announcement, delete_after=3)
-
-    def generate_deck(self):
-        '''
-        generate_deck: Creates a list of Card objects in accordance with
-        the requirements of an Uno deck:
-            a. One '0' card for each color 'Red', 'Blue', 'Green', 'Yellow'
-            b. Two cards for each color for each number "1-9"
-            c. Two cards for each color for each "Skip", "Reverse", and
-               "Draw Two".
-            d. Four "Wild" cards and four "Wild Draw Four" cards.
-            e. Total of 108 cards.
-        '''
-        deck = []
-        for color in ('Red', 'Yellow', 'Green', 'Blue'):
-            deck.append(UnoCard(color, '0'))
-            for value in range(1,10):
-                deck.append(UnoCard(color, str(value)))
-                deck.append(UnoCard(color, str(value)))
-            for value in range(2):
-                deck.append(UnoCard(color, "Draw Two"))
-                deck.append(UnoCard(color, "Reverse"))
-                deck.append(UnoCard(color, "Skip"))
-        for value in range(4):
-            deck.append(UnoCard("Wild", "Wild"))
-            deck.append(UnoCard("Wild", "Draw Four"))
-        return deck
-
+        await super().announce(announcement, delete_after=3)
 
     def card_to_emoji(self, card):
         '''
@@ -456,17 +598,9 @@ class UnoManager(GameManager):
             return "🌈"
         return "🟣"
     
-    async def end_game(self, interaction):
-        await self.announce(interaction.user.display_name + " won! Game game, nerds.")
+    async def end_game(self, winner, interaction=None):
+        await self.announce(winner.display_name + " won! Game game, nerds.")
         await self.quit_game(interaction)
-        '''
-        # then initiate the endgame phase
-        self.game.game_state = 7
-        restart_ui = QuitGameButton(self)
-        active_msg = await self.channel.send("Play again?", view=restart_ui)
-        await restart_ui.wait()
-        await active_msg.edit(view=None)
-        '''
 
 
          #######################################################
@@ -475,7 +609,7 @@ class UnoManager(GameManager):
       ####                                                     ####
          #######################################################
 
-class UnoButtonsBase(discord.ui.View):
+class UnoButtonsBase(RoutedView):
     """
     Base menu button group for the Uno game.
     """
@@ -483,7 +617,7 @@ class UnoButtonsBase(discord.ui.View):
         super().__init__()
         self.manager = manager    
     
-    @discord.ui.button(label = "Join", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Join", style = discord.ButtonStyle.green, custom_id = "join")
     async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Send an ephemeral message to the person who interacted with
@@ -497,9 +631,10 @@ class UnoButtonsBase(discord.ui.View):
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
 
         indi_player_data = UnoPlayer()
-        await self.manager.add_player(interaction, indi_player_data)
+        await self.manager.submit(interaction, self.manager.add_player, interaction,
+                                  indi_player_data)
     
-    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red)
+    @discord.ui.button(label = "Quit", style = discord.ButtonStyle.red, custom_id = "quit")
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Quit the game
@@ -508,9 +643,9 @@ class UnoButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
         # remove current players from active player list
-        await self.manager.remove_player(interaction)
+        await self.manager.submit(interaction, self.manager.remove_player, interaction)
     
-    @discord.ui.button(label = "Start Game", style = discord.ButtonStyle.blurple)
+    @discord.ui.button(label = "Start Game", style = discord.ButtonStyle.blurple, custom_id = "start")
     async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Start the game
@@ -519,15 +654,15 @@ class UnoButtonsBase(discord.ui.View):
         # pylint won't shut up about button being unused
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
         # start the game
-        await self.manager.start_game(interaction)
+        await self.manager.submit(interaction, self.manager.start_game, interaction)
 
 
-class UnoButtonsBaseGame(discord.ui.View):
+class UnoButtonsBaseGame(RoutedView):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
         
-    @discord.ui.button(label = "Show Hand", style = discord.ButtonStyle.green)
+    @discord.ui.button(label = "Show Hand", style = discord.ButtonStyle.green, custom_id = "show_cards")
     async def show_cards(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Send an ephemeral message to the person who interacted with
@@ -546,6 +681,7 @@ class UnoButtonsBaseGame(discord.ui.View):
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
         view = UnoCardButtons(self.manager, interaction.user)
         await interaction.response.send_message("Your cards:", view = view, ephemeral = True)
+        view.start_timer()
         
         # We track this interaction so we can delete the message if player presses "Draw"
         #    rather than waiting for the message to delete itself after 20 seconds
@@ -556,59 +692,70 @@ class UnoButtonsBaseGame(discord.ui.View):
         await interaction.delete_original_response()
         self.manager.game.player_data[interaction.user].active_interaction = None
 
-    @discord.ui.button(label = "Draw", style = discord.ButtonStyle.blurple)
+    @discord.ui.button(label = "Draw", style = discord.ButtonStyle.blurple, custom_id = "draw_card")
     async def draw_card(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Sends a ephemeral message to the person who interacted with
         this button to inform him of what card he draw.
         """
-        # Reject request to draw cards if button presser is not the current turn player
-        current_turn_player = self.manager.game.turn_order[self.manager.game.turn_index]
-        if interaction.user != current_turn_player:
-            await interaction.response.send_mesage("Wait your turn.", ephemeral = True, delete_after = 2)
-            return
-
-        # If there is an active "Show Hand" menu, we should delete it now
-        if (self.manager.game.player_data[interaction.user].active_interaction):
-            await self.manager.game.player_data[interaction.user].active_interaction.delete_original_response()
-            self.manager.game.player_data[interaction.user].active_interaction = None
-            
-        # If the button presser IS the turn player, do the following:
-        player = self.manager.game.player_data[interaction.user]
-        card_drawn = await self.manager.draw_cards(player)
-        await interaction.response.send_message("You drew a " + self.manager.color_to_emoji(card_drawn) + " " + card_drawn.value, ephemeral = True,
-                                                delete_after = 2)
-        
-        # Announce that player has opted to draw a card and proceed to next turn
-        await self.manager.announce(str(interaction.user) + " is drawing a card...")
-        await self.manager.next_turn()
-        
-
+        self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
+        await self.manager.submit(interaction, self.manager.draw_for_turn, interaction)
 
 
-class UnoCardButtons(discord.ui.View):
+class UnoCardButtons(TimedView):
     """
-    Creates private group of buttons representing the cards in a user's hand
+    Creates private group of buttons representing the cards in a user's hand.
+    Hands too big for one message are split into pages with buttons to flip
+    between them, the same view is kept while flipping.
     """
-    def __init__(self, manager, player):
+    def __init__(self, manager, player, page=0):
         super().__init__()
         self.manager = manager
+        manager.views.add(self)
+        self.player = player
         self.player_hand = self.manager.get_player_hand(player)
-        
-        for i in range(len(self.player_hand)):
-            current_turn_player = self.manager.game.turn_order[self.manager.game.turn_index]
-            this_card = self.player_hand[i]
-            playable_cards = self.manager.game.player_data[player].get_playable_cards(self.manager.game.top_card)
-            disabled = (player != current_turn_player) or (this_card not in playable_cards)
-            self.add_item(CardButton(self.manager, self.player_hand[i], disabled))
+        self.show_page(page)
+
+    def show_page(self, page):
+        """
+        Replaces the buttons with the ones for page number page
+        """
+        self.clear_items()
+        unoplayer = self.manager.game.player_data[self.player]
+        pages = UnoHandPages.page_count(unoplayer)
+        self.page = max(0, min(page, pages - 1))
+        current_turn_player = self.manager.game.turn_order[self.manager.game.turn_index]
+        for (this_card, emoji, disabled) in unoplayer.hand_pages.get_page(
+                self.manager, unoplayer, self.player == current_turn_player, self.page):
+            self.add_item(CardButton(self.manager, this_card, disabled, emoji))
+        if pages > 1:
+            self.add_item(PageButton("Previous", self.page - 1, self.page == 0))
+            self.add_item(discord.ui.Button(label=f"{self.page + 1}/{pages}", disabled=True, row=4))
+            self.add_item(PageButton("Next", self.page + 1, self.page == pages - 1))
+
+
+class PageButton(discord.ui.Button):
+    """
+    Flips an UnoCardButtons view to another page of the hand
+    """
+    def __init__(self, label, page, disabled):
+        super().__init__(style=discord.ButtonStyle.blurple, label=label, disabled=disabled, row=4)
+        self.page = page
+
+    async def callback(self, interaction: discord.Interaction):
+        assert self.view is not None
+        view: UnoCardButtons = self.view
+        view.show_page(self.page)
+        await interaction.response.edit_message(view=view)
 
   
 class CardButton(discord.ui.Button):
     """
     Button class that represents an individual card in a user's hand
     """
-    def __init__(self, manager, card, disabled=True):
-        super().__init__(style=discord.ButtonStyle.gray, label=f"{card.value}", emoji=manager.color_to_emoji(card))
+    def __init__(self, manager, card, disabled=True, emoji=None):
+        super().__init__(style=discord.ButtonStyle.gray, label=f"{card.value}",
+                         emoji=emoji or manager.color_to_emoji(card))
         self.manager = manager
         self.card = card
         self.disabled = disabled
@@ -617,59 +764,81 @@ class CardButton(discord.ui.Button):
         self.manager.quick_log(f"{interaction.user} pressed {str(self.card)}!")
         assert self.view is not None
         view: UnoCardButtons = self.view
-        await self.manager.play_card(interaction, self.card)
+        color = None
+        if self.card.name == "Wild":
+            # Menu to inquire what the next card is. It's answered before
+            # the card is played, so the game isn't held up waiting on it
+            color_view = UnoWildCard(self.manager)
+            await interaction.response.send_message("Choose a color!", view = color_view, ephemeral=True)
+            color_view.start_timer()
+            expiry = expire_response(interaction, 10)
+            await color_view.wait()
+            if color_view.color is None:
+                return
+            expiry.cancel()
+            await interaction.delete_original_response()
+            color = color_view.color
+        await self.manager.submit(interaction, self.manager.play_card, interaction, self.card,
+                                  None, color)
         view.stop()
 
 
-class UnoWildCard(discord.ui.View):
+class UnoWildCard(TimedView):
+    """
+    Asks a player which color their wild card calls. color stays None
+    if they don't pick one before the menu goes away
+    """
     def __init__(self, manager):
-        super().__init__()
+        super().__init__(timeout=10)
         self.manager = manager
+        manager.views.add(self)
+        self.color = None
         
     @discord.ui.button(label = "Red", style = discord.ButtonStyle.gray, emoji = "🔴")
     async def red(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Chnages the wild card to red.
+        Calls red.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Red", "Card")
+        self.color = "Red"
         self.stop()
         
     @discord.ui.button(label = "Blue", style = discord.ButtonStyle.gray, emoji = "🔵")
     async def blue(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Chnages the wild card to blue.
+        Calls blue.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Blue", "Card")
+        self.color = "Blue"
         self.stop()
         
     @discord.ui.button(label = "Yellow", style = discord.ButtonStyle.gray, emoji = "🟡")
     async def yellow(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Chnages the wild card to yellow.
+        Calls yellow.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Yellow", "Card")
+        self.color = "Yellow"
         self.stop()
         
     @discord.ui.button(label = "Green", style = discord.ButtonStyle.gray, emoji = "🟢")
     async def green(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Chnages the wild card to green.
+        Calls green.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Green", "Card")
+        self.color = "Green"
         self.stop()
 
 
-class QuitGameButton(discord.ui.View):
+class QuitGameButton(TimedView):
     """
     Button set that asks players if they want to play the game again
     """
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        manager.views.add(self)
 
     @discord.ui.button(label = "Go Again!", style = discord.ButtonStyle.green)
     async def restart(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -681,7 +850,7 @@ class QuitGameButton(discord.ui.View):
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
         # stop accepting input
         self.stop()
-        await self.manager.start_new_round(interaction)
+        await self.manager.submit(interaction, self.manager.start_new_round, interaction)
 
     @discord.ui.button(label = "End Game", style = discord.ButtonStyle.red)
     async def quit(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -693,44 +862,5 @@ class QuitGameButton(discord.ui.View):
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
         # stop accepting input
         self.stop()
-        await interaction.channel.send(f"{interaction.user.mention} ended the game!")
-        await self.manager.quit_game(interaction)
-
-
-class UnoCard(Card):
-    def __init__(self, name, value):
-        super().__init__(name, value)
-        
-        self.priority = 0
-        if self.name == "Red": self.priority += 0
-        if self.name == "Blue": self.priority += 15
-        if self.name == "Green": self.priority += 30
-        if self.name == "Yellow": self.priority += 45
-        if self.name == "Wild": self.priority += 60
-
-        if self.value == "Reverse": self.priority += 11
-        elif self.value == "Skip": self.priority += 12
-        elif self.value == "Draw Two": self.priority += 13
-        elif self.value == "Card": self.priority += 1
-        elif self.value == "Draw Four": self.priority += 2
-        elif self.value == "Wild": self.priority += 0
-        elif self.value == "": self.priority += 0
-        else: self.priority += int(self.value)
-    
-    def __str__(self):
-        return f"{self.name} {self.value}"
-    
-    def __eq__(self, other):
-        if not isinstance(other, Card): return False
-        if self.name != other.name: return False
-        if self.value != other.value: return False
-        return True
-    
-    def __lt__(self, other):
-        return self.priority < other.priority
-
-    def __gt__(self, other):
-        return self.priority > other.priority
-    
-    
-
+        await self.manager.announce(f"{interaction.user.mention} ended the game!")
+        await self.manager.submit(interaction, self.manager.quit_game, interaction)
@@ -0,0 +1,227 @@
+"""Uno CPU players
+
+Picks a move for a CPU Uno player: which card to play (or to draw) and
+which color to call for a wild card.
+
+choose_move scores every card with a simple heuristic. search_move
+does better by trying each legal move against random guesses of the
+other players' hands (determinizations, dealt from the cards the CPU
+can't see, in the sizes it knows the hands to be) and playing every
+guess out a few turns with the heuristic. The move with the best
+average result after the depth limit wins. The search keeps trying
+new guesses until its time budget runs out.
+
+The search runs in a process pool (see UnoBrain) so the bot's event
+loop is never blocked while a CPU thinks, and a CPU that runs out of
+time falls back to the heuristic. The workers are started with the
+"spawn" method rather than forked, since the bot process has threads
+(discord.py's and the game store's) that a fork would copy mid-flight.
+
+Guesses are played out on an UnoTable, which plays by the same rules
+(games.uno_rules) as UnoManager.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from games.uno_rules import COLORS
+from games.uno_rules import UnoPile
+from games.uno_rules import UnoTable
+from games.uno_rules import is_playable
+
+# how many turns (counting every player's) each guess is played out for
+SEARCH_DEPTH = 6
+# default time budget for a search, in seconds
+DEFAULT_BUDGET = 0.5
+# results of a guess that ends with someone out of cards
+WIN_SCORE = 100
+LOSS_SCORE = -100
+
+
+def choose_color(hand):
+    """
+    Color to call for a wild card: whichever color there is most of in
+    hand, so the next turn is easiest to follow up
+    """
+    counts = {color: 0 for color in COLORS}
+    for card in hand:
+        if card.name in counts:
+            counts[card.name] += 1
+    return max(COLORS, key=lambda color: counts[color])
+
+
+def _score_card(card, hand, next_hand_size):
+    """
+    Heuristic score for playing card out of hand, higher is better
+    """
+    if card.name == "Wild":
+        # wilds are worth holding on to unless the next player is
+        # about to go out
+        score = -5.0
+        if card.value == "Draw Four" and next_hand_size <= 2:
+            score += 10
+        return score
+    # keep the color we have most of going
+    score = sum(1 for other in hand if other.name == card.name) * 0.5
+    if card.value in ("Skip", "Draw Two", "Reverse"):
+        score += 4 if next_hand_size <= 2 else 1
+        if card.value == "Draw Two":
+            score += 1
+    else:
+        # get rid of high numbers first
+        score += int(card.value) / 10
+    return score
+
+
+def choose_move(hand, top_card, next_hand_size):
+    """
+    Heuristic move for a hand. Returns a tuple of (card, color): card
+    is None to draw, color is the color called for a wild card (None
+    for other cards)
+    """
+    best = None
+    best_score = 0.0
+    for card in hand:
+        if is_playable(card, top_card):
+            score = _score_card(card, hand, next_hand_size)
+            if best is None or score > best_score:
+                best = card
+                best_score = score
+    if best is None:
+        return (None, None)
+    return (best, choose_color(hand) if best.name == "Wild" else None)
+
+
+def _play_out(guess, me, depth):
+    """
+    Plays the UnoTable guess forward depth turns with the heuristic for
+    everyone and scores the result for seat me
+    """
+    for _ in range(depth):
+        seat = guess.turn
+        hand = guess.hands[seat]
+        (card, color) = choose_move(hand, guess.top_card, len(guess.hands[guess.next_index()]))
+        if guess.play(card, color):
+            return WIN_SCORE if seat == me else LOSS_SCORE
+    smallest_other = min(len(hand) for (seat, hand) in enumerate(guess.hands) if seat != me)
+    return smallest_other - len(guess.hands[me])
+
+
+def search_move(hand, top_card, hand_sizes, me, reversed_order, unseen, discard,
+                deck_size, budget, seed, depth=SEARCH_DEPTH):
+    """
+    Determinized depth limited search for the player in seat me.
+
+    hand: the CPU's own cards
+    hand_sizes: number of cards in every seat's hand, in turn order
+    unseen: every card the CPU can't see (the deck plus the other
+    players' hands), in any order
+    discard: the discard pile
+    deck_size: how many of the unseen cards are in the deck
+
+    Returns a tuple of (card, color) like choose_move. Runs inside the
+    worker processes, so it has to stay a module level function.
+    """
+    deadline = time.monotonic() + budget
+    random.seed(seed)
+    # every distinct legal move, with each color for wild cards
+    moves = [(None, None)]
+    for card in set(card for card in hand if is_playable(card, top_card)):
+        if card.name == "Wild":
+            moves.extend((card, color) for color in COLORS)
+        else:
+            moves.append((card, None))
+    if len(moves) == 1:
+        return (None, None)
+    totals = [0.0] * len(moves)
+    unseen = list(unseen)
+    rounds = 0
+    while time.monotonic() < deadline:
+        # one guess at the hidden cards per round, shared by every move
+        # so they're compared on the same deal
+        random.shuffle(unseen)
+        hands = []
+        dealt = 0
+        for (seat, size) in enumerate(hand_sizes):
+            if seat == me:
+                hands.append(list(hand))
+            else:
+                hands.append(unseen[dealt:dealt + size])
+                dealt += size
+        deck = unseen[dealt:dealt + deck_size]
+        for (index, (card, color)) in enumerate(moves):
+            guess = UnoTable([list(cards) for cards in hands], UnoPile(deck), UnoPile(discard),
+                             top_card, me, reversed_order)
+            if guess.play(card, color):
+                totals[index] += WIN_SCORE
+            else:
+                totals[index] += _play_out(guess, me, depth)
+        rounds += 1
+    if rounds == 0:
+        return choose_move(hand, top_card, hand_sizes[(me + (-1 if reversed_order else 1))
+                                                      % len(hand_sizes)])
+    best = max(range(len(moves)), key=lambda index: totals[index])
+    return moves[best]
+
+
+class UnoBrain:
+    """
+    Runs search_move in a process pool. The pool is only started the
+    first time a CPU has to think, and should be shut down when the bot
+    stops.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or min(os.cpu_count() or 1, 4)
+        self.executor = None
+        # searches still running in the pool, including ones that were
+        # given up on after running over their budget
+        self.in_flight = 0
+
+    async def choose(self, hand, top_card, hand_sizes, me, reversed_order, unseen, discard,
+                     deck_size, budget=DEFAULT_BUDGET):
+        """
+        Works out a move for the CPU in seat me without blocking the
+        event loop. The search stops itself after budget seconds, and
+        if the result still isn't back shortly after that the heuristic
+        move is used instead. The heuristic move is also used straight
+        away if every worker is still busy with searches that ran over,
+        rather than queueing behind them
+        """
+        next_seat = (me + (-1 if reversed_order else 1)) % len(hand_sizes)
+        if self.in_flight >= self.workers:
+            return choose_move(hand, top_card, hand_sizes[next_seat])
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self.executor, search_move, list(hand), top_card,
+                                   list(hand_sizes), me, reversed_order, list(unseen),
+                                   list(discard), deck_size, budget, random.getrandbits(64))
+        self.in_flight += 1
+        job.add_done_callback(self.job_done)
+        try:
+            # shielded, so a search that runs over still counts as in flight
+            # until the worker is really done with it
+            return await asyncio.wait_for(asyncio.shield(job), timeout=budget + 1)
+        except asyncio.TimeoutError:
+            return choose_move(hand, top_card, hand_sizes[next_seat])
+
+    def job_done(self, job):
+        self.in_flight -= 1
+        if not job.cancelled() and job.exception() is not None:
+            logging.error("CPU search failed: %r", job.exception())
+
+    def shutdown(self):
+        """
+        Stops the worker processes, if they were started
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+# shared by every Uno game in the process
+UNO_BRAIN = UnoBrain()
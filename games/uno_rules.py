@@ -0,0 +1,398 @@
+"""Uno rules
+
+Cards, hands, piles and the rules of Uno: what can be played, what a
+card does, how the turn moves on and how the deck is drawn from. The
+Uno game plays by these rules (adding the Discord side), and so does
+UnoTable, which runs a game without Discord for the CPU players and the
+simulator. A rule changed here changes both.
+"""
+import random
+from array import array
+from bisect import bisect_left
+from bisect import insort
+from util import Card
+
+COLORS = ("Red", "Blue", "Green", "Yellow")
+# cards each player starts with
+HAND_SIZE = 7
+
+
+class UnoCard(Card):
+    """
+    Uno version of Card. name is the card's color (or "Wild") and value
+    is its face. priority is used to sort hands by color, then face, and
+    is worked out once when the card is first made.
+    """
+    __slots__ = ("priority",)
+
+    SUITS = ("Red", "Blue", "Green", "Yellow", "Wild", "None")
+    FACES = ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9",
+             "Reverse", "Skip", "Draw Two", "Wild", "Draw Four", "Card", "")
+    SUIT_BITS = 3
+
+    # sort priority of each color and face, indexed by suit and rank
+    COLOR_PRIORITY = (0, 15, 30, 45, 60, 0)
+    FACE_PRIORITY = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12, 13, 0, 2, 1, 0)
+
+    def _intern(self):
+        object.__setattr__(self, "priority",
+                           self.COLOR_PRIORITY[self.suit] + self.FACE_PRIORITY[self.rank])
+
+    def __str__(self):
+        return f"{self.name} {self.value}"
+
+    def __lt__(self, other):
+        return self.priority < other.priority
+
+    def __gt__(self, other):
+        return self.priority > other.priority
+
+
+def is_playable(card, top_card):
+    """
+    Returns True if card can be played on top_card: it has to match
+    its color or value, or be a wild card
+    """
+    return card.name == top_card.name or card.value == top_card.value or card.name == "Wild"
+
+
+class UnoHand:
+    """
+    A player's Uno hand. cards is kept sorted (by UnoCard.priority) as
+    cards are added, and the same cards are also bucketed by color and
+    by value, so checking for playable cards only looks at the buckets
+    that can match instead of the whole hand.
+
+    version goes up every time the hand changes, so anything built
+    from the hand (like the hand buttons) can tell when it's stale.
+    """
+    def __init__(self, cards=()):
+        self.clear()
+        self.add_cards(cards)
+
+    def clear(self):
+        self.cards = []
+        self.by_color = {}
+        self.by_value = {}
+        self.version = 0
+
+    def add(self, card):
+        """
+        Adds a card, keeping cards and the buckets sorted
+        """
+        insort(self.cards, card)
+        insort(self.by_color.setdefault(card.name, []), card)
+        insort(self.by_value.setdefault(card.value, []), card)
+        self.version += 1
+
+    def add_cards(self, cards):
+        for card in cards:
+            self.add(card)
+
+    def remove(self, card):
+        """
+        Removes one copy of card, raises ValueError if there isn't one
+        """
+        self.cards.remove(card)
+        _remove_sorted(self.by_color[card.name], card)
+        _remove_sorted(self.by_value[card.value], card)
+        self.version += 1
+
+    def count_color(self, color):
+        return len(self.by_color.get(color, ()))
+
+    def has_playable(self, top_card):
+        """
+        Returns True if any card in the hand can be played on top_card
+        """
+        return bool(self.by_color.get(top_card.name) or self.by_value.get(top_card.value)
+                    or self.by_color.get("Wild"))
+
+    def get_playable(self, top_card):
+        """
+        Returns the set of cards in the hand that can be played on
+        top_card. Only the matching color, value and wild buckets are
+        looked at
+        """
+        playable = set(self.by_color.get(top_card.name, ()))
+        playable.update(self.by_value.get(top_card.value, ()))
+        playable.update(self.by_color.get("Wild", ()))
+        return playable
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __contains__(self, card):
+        return card in self.by_value.get(card.value, ())
+
+    def __repr__(self):
+        return f"UnoHand({self.cards})"
+
+
+def _remove_sorted(cards, card):
+    """
+    Removes one copy of card from the sorted list cards
+    """
+    index = bisect_left(cards, card)
+    while cards[index] is not card:
+        index += 1
+    del cards[index]
+
+
+def new_deck():
+    """
+    Returns an unshuffled list of the 108 cards in an Uno deck:
+        a. One '0' card for each color 'Red', 'Blue', 'Green', 'Yellow'
+        b. Two cards for each color for each number "1-9"
+        c. Two cards for each color for each "Skip", "Reverse", and
+           "Draw Two".
+        d. Four "Wild" cards and four "Wild Draw Four" cards.
+    """
+    deck = []
+    for color in ('Red', 'Yellow', 'Green', 'Blue'):
+        deck.append(UnoCard(color, '0'))
+        for value in range(1,10):
+            deck.append(UnoCard(color, str(value)))
+            deck.append(UnoCard(color, str(value)))
+        for value in range(2):
+            deck.append(UnoCard(color, "Draw Two"))
+            deck.append(UnoCard(color, "Reverse"))
+            deck.append(UnoCard(color, "Skip"))
+    for value in range(4):
+        deck.append(UnoCard("Wild", "Wild"))
+        deck.append(UnoCard("Wild", "Draw Four"))
+    return deck
+
+
+# every card in a deck, made once and shared by every game
+DECK = tuple(new_deck())
+# card id -> UnoCard, for the ids stored in an UnoPile
+CARDS_BY_ID = tuple(next((card for card in DECK if card.id == card_id), None)
+                    for card_id in range(max(card.id for card in DECK) + 1))
+_DECK_IDS = bytes(card.id for card in DECK)
+
+
+class UnoPile:
+    """
+    A pile of Uno cards (the deck or the discard pile) stored as an
+    array of card ids, one byte per card, with CARDS_BY_ID turning them
+    back into cards. The top of the pile is the end of the array, so
+    drawing and discarding don't move any other cards.
+    """
+    __slots__ = ("ids",)
+
+    def __init__(self, cards=()):
+        self.ids = array("B", (card.id for card in cards))
+
+    def fill(self):
+        """
+        Makes the pile a full, shuffled deck
+        """
+        self.ids = array("B", _DECK_IDS)
+        self.shuffle()
+
+    def shuffle(self):
+        """
+        Shuffles the pile in place
+        """
+        random.shuffle(self.ids)
+
+    def take_all(self, other):
+        """
+        Moves every card in other onto this pile, which must be empty,
+        and shuffles them. The arrays are swapped rather than copied
+        """
+        (self.ids, other.ids) = (other.ids, self.ids)
+        self.shuffle()
+
+    def append(self, card):
+        self.ids.append(card.id)
+
+    def copy(self):
+        pile = UnoPile()
+        pile.ids = array("B", self.ids)
+        return pile
+
+    def pop(self):
+        """
+        Takes the top card off the pile, raises IndexError if it's empty
+        """
+        return CARDS_BY_ID[self.ids.pop()]
+
+    def clear(self):
+        del self.ids[:]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        cards = CARDS_BY_ID
+        return (cards[card_id] for card_id in self.ids)
+
+    def __repr__(self):
+        return f"UnoPile({list(self)})"
+
+
+def is_starting_card(card):
+    """
+    Returns True if the game can begin on card. It can't begin on a
+    "Reverse", "Skip", "Draw Two" or any wild card
+    """
+    return card.name != "Wild" and card.value not in ("Reverse", "Skip", "Draw Two")
+
+
+# placeholder top cards for each color, used after a wild card
+COLOR_CARDS = {color: UnoCard(color, "Card") for color in COLORS}
+# cards the next player has to draw for each face
+DRAWS = {"Draw Two": 2, "Draw Four": 4}
+# faces that make the next player miss their turn
+SKIPS = frozenset(("Skip", "Draw Two", "Draw Four"))
+
+
+def next_seat(seat, seats, reversed_order):
+    """
+    Seat that plays after seat, out of seats seats
+    """
+    return (seat + (-1 if reversed_order else 1)) % seats
+
+
+def next_turn(seat, seats, reversed_order, skip=False):
+    """
+    Seat whose turn comes after seat's, passing over the next seat if
+    skip
+    """
+    seat = next_seat(seat, seats, reversed_order)
+    if skip:
+        seat = next_seat(seat, seats, reversed_order)
+    return seat
+
+
+def card_effect(card):
+    """
+    Returns (whether card reverses the turn order, how many cards the
+    next player draws, whether the next player is skipped)
+    """
+    return (card.value == "Reverse", DRAWS.get(card.value, 0), card.value in SKIPS)
+
+
+def place_card(card, color, top_card, discard):
+    """
+    Plays card over top_card and returns the new top card. A wild card
+    sets color with a placeholder top card (the wild card itself doesn't
+    go to the discard pile), and placeholders are dropped when they're
+    covered, everything else goes to discard
+    """
+    if top_card.value != "Card":
+        discard.append(top_card)
+    return COLOR_CARDS[color] if card.name == "Wild" else card
+
+
+def draw_from(deck, discard):
+    """
+    Takes the top card off the deck, first shuffling the discard pile
+    into it if it's empty (both are UnoPiles). Returns (card, whether
+    the deck was refilled), card is None if both piles are empty
+    """
+    if deck:
+        return (deck.pop(), False)
+    if not discard:
+        return (None, False)
+    deck.take_all(discard)
+    return (deck.pop(), True)
+
+
+class UnoTable:
+    """
+    The state of a game of Uno with every hand known, played by the
+    rules above: a player either plays one matching card or draws one
+    card, see card_effect for what the card does after that.
+
+    hands are plain lists of cards, indexed by seat, deck and discard
+    are UnoPiles and turn is the seat whose turn it is. regenerations
+    counts how many times the deck has been refilled.
+    """
+    __slots__ = ("hands", "deck", "discard", "top_card", "turn", "reversed", "regenerations")
+
+    def __init__(self, hands, deck, discard, top_card, turn=0, reversed_order=False):
+        self.hands = hands
+        self.deck = deck
+        self.discard = discard
+        self.top_card = top_card
+        self.turn = turn
+        self.reversed = reversed_order
+        self.regenerations = 0
+
+    @classmethod
+    def deal(cls, seats):
+        """
+        Sets up a new game like UnoManager.setup: shuffles a deck, deals
+        every seat HAND_SIZE cards, turns up a top card the game can
+        begin on and picks a random seat to go first
+        """
+        deck = list(DECK)
+        random.shuffle(deck)
+        hands = [deck[-HAND_SIZE * (seat + 1):len(deck) - HAND_SIZE * seat]
+                 for seat in range(seats)]
+        del deck[-HAND_SIZE * seats:]
+        discard = []
+        top_card = deck.pop()
+        while not is_starting_card(top_card):
+            discard.append(top_card)
+            top_card = deck.pop()
+        return cls(hands, UnoPile(deck), UnoPile(discard), top_card, random.randrange(seats))
+
+    def next_index(self):
+        """
+        Seat of the player after the one whose turn it is
+        """
+        return next_seat(self.turn, len(self.hands), self.reversed)
+
+    def draw(self, seat, count):
+        """
+        Moves count cards from the deck to seat's hand, see draw_from.
+        Stops early if the deck and discard pile are both empty
+        """
+        for _ in range(count):
+            (card, refilled) = draw_from(self.deck, self.discard)
+            if card is None:
+                return
+            self.regenerations += refilled
+            self.hands[seat].append(card)
+
+    def play(self, card, color=None):
+        """
+        The player whose turn it is plays card (or draws if card is
+        None), calling color if it's a wild card, and the turn moves on.
+        Returns True if they went out, in which case turn is left on them
+        """
+        if card is None:
+            self.draw(self.turn, 1)
+            self.turn = self.next_index()
+            return False
+        hand = self.hands[self.turn]
+        hand.remove(card)
+        self.top_card = place_card(card, color, self.top_card, self.discard)
+        (reverse, draws, skip) = card_effect(card)
+        if reverse:
+            self.reversed = not self.reversed
+        if draws:
+            self.draw(self.next_index(), draws)
+        if not hand:
+            return True
+        self.turn = next_turn(self.turn, len(self.hands), self.reversed, skip)
+        return False
+
+    def copy(self):
+        """
+        Copy that can be played on without changing this table
+        """
+        table = UnoTable([list(hand) for hand in self.hands], self.deck.copy(),
+                         self.discard.copy(), self.top_card, self.turn, self.reversed)
+        table.regenerations = self.regenerations
+        return table
@@ -0,0 +1,214 @@
+"""Uno simulator
+
+Plays whole games of Uno without Discord on an UnoTable, which plays by
+the same rules (games.uno_rules) as UnoManager, so rule changes can be
+checked and the rules engine benchmarked by playing thousands of games instead of by
+hand. Every seat plays with the same policy.
+
+How the players play is up to a policy, see register_policy. Running
+this module plays a batch of games across a process pool and prints a
+report:
+
+    python -m games.uno_sim [policy] [games] [players]
+"""
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from games.uno_ai import choose_color
+from games.uno_ai import choose_move
+from games.uno_rules import COLORS
+from games.uno_rules import UnoTable
+from games.uno_rules import is_playable
+
+# number of games a worker plays per task
+BATCH_SIZE = 2000
+# games still going after this many turns are called off. Wild cards
+# leave the game once played, so a long enough game can run out of
+# cards for everyone
+MAX_TURNS = 1000
+# hand sizes past this are counted together in the last bucket
+MAX_HAND_SIZE = 40
+
+# the results of a run
+# turns: average turns per finished game (a draw counts as a turn)
+# longest: most turns any finished game took
+# unfinished: games called off at MAX_TURNS
+# regenerations: average times per game the deck was refilled from the
+# discard pile
+# regenerated: share of games where that happened at least once
+# hand_sizes: share of turns the player started with each hand size
+# loser_hand_sizes: share of losing hands by size when the game ended
+# games_per_second: games played per second per worker
+UnoReport = namedtuple("UnoReport",
+                       ("policy", "games", "players", "turns", "longest", "unfinished",
+                        "regenerations", "regenerated", "hand_sizes", "loser_hand_sizes",
+                        "games_per_second"))
+
+# name -> policy function, see register_policy
+POLICIES = {}
+
+# indexes into the counts simulate returns, the two histograms follow
+(_GAMES, _TURNS, _LONGEST, _UNFINISHED, _REGENERATIONS, _REGENERATED, _SECONDS) = range(7)
+_HAND_SIZES = 7
+_LOSER_HAND_SIZES = _HAND_SIZES + MAX_HAND_SIZE + 1
+_COUNTS = _LOSER_HAND_SIZES + MAX_HAND_SIZE + 1
+
+
+def register_policy(name):
+    """
+    Decorator that adds a policy to POLICIES under name. A policy is a
+    function taking (hand, top card, size of the next player's hand)
+    that returns a tuple of (card, color) like uno_ai.choose_move: card
+    is None to draw, color is the color called for a wild card. Policies
+    are looked up by name inside the worker processes, so they have to
+    be registered when their module is imported.
+    """
+    def register(policy):
+        POLICIES[name] = policy
+        return policy
+    return register
+
+
+register_policy("heuristic")(choose_move)
+
+
+@register_policy("first")
+def first_policy(hand, top_card, next_hand_size):
+    """
+    Plays the first playable card it finds
+    """
+    for card in hand:
+        if is_playable(card, top_card):
+            return (card, choose_color(hand) if card.name == "Wild" else None)
+    return (None, None)
+
+
+@register_policy("random")
+def random_policy(hand, top_card, next_hand_size):
+    """
+    Plays a random playable card, calling a random color for wild cards
+    """
+    playable = [card for card in hand if is_playable(card, top_card)]
+    if not playable:
+        return (None, None)
+    card = random.choice(playable)
+    return (card, random.choice(COLORS) if card.name == "Wild" else None)
+
+
+def play_game(table, policy, counts):
+    """
+    Plays the game on table to the end and adds the result to counts.
+    Returns the winning seat, or None if the game was called off
+    """
+    hands = table.hands
+    hand_sizes = _HAND_SIZES
+    for turn in range(1, MAX_TURNS + 1):
+        seat = table.turn
+        hand = hands[seat]
+        counts[hand_sizes + min(len(hand), MAX_HAND_SIZE)] += 1
+        (card, color) = policy(hand, table.top_card, len(hands[table.next_index()]))
+        if table.play(card, color):
+            break
+    else:
+        counts[_UNFINISHED] += 1
+        seat = None
+    counts[_GAMES] += 1
+    counts[_REGENERATIONS] += table.regenerations
+    if table.regenerations:
+        counts[_REGENERATED] += 1
+    if seat is not None:
+        counts[_TURNS] += turn
+        counts[_LONGEST] = max(counts[_LONGEST], turn)
+        for hand in hands:
+            if hand:
+                counts[_LOSER_HAND_SIZES + min(len(hand), MAX_HAND_SIZE)] += 1
+    return seat
+
+
+def simulate(policy_name, games, players, seed):
+    """
+    Plays games games with the named policy for every seat and returns
+    the list of counts. Runs inside the worker processes, so it has to
+    stay a module level function.
+    """
+    random.seed(seed)
+    policy = POLICIES[policy_name]
+    counts = [0] * _COUNTS
+    start = time.perf_counter()
+    for _ in range(games):
+        play_game(UnoTable.deal(players), policy, counts)
+    counts[_SECONDS] = time.perf_counter() - start
+    return counts
+
+
+def _shares(histogram):
+    """
+    Turns a histogram of counts into shares of the total, dropping the
+    empty buckets at the end
+    """
+    total = sum(histogram) or 1
+    shares = [count / total for count in histogram]
+    while shares and not shares[-1]:
+        shares.pop()
+    return tuple(shares)
+
+
+def make_report(policy_name, players, counts):
+    """
+    Turns summed counts into an UnoReport
+    """
+    games = counts[_GAMES]
+    finished = games - counts[_UNFINISHED]
+    return UnoReport(policy_name, games, players,
+                     counts[_TURNS] / finished if finished else 0.0,
+                     counts[_LONGEST], counts[_UNFINISHED],
+                     counts[_REGENERATIONS] / games, counts[_REGENERATED] / games,
+                     _shares(counts[_HAND_SIZES:_LOSER_HAND_SIZES]),
+                     _shares(counts[_LOSER_HAND_SIZES:_COUNTS]),
+                     games / counts[_SECONDS] if counts[_SECONDS] else 0.0)
+
+
+def run(policy_name, games, players=4, workers=None, batch_size=BATCH_SIZE):
+    """
+    Plays games games with the named policy across a process pool and
+    returns an UnoReport
+    """
+    if policy_name not in POLICIES:
+        raise ValueError(f"Unknown policy {policy_name}, "
+                         f"pick one of {', '.join(sorted(POLICIES))}")
+    batches = [batch_size] * (games // batch_size)
+    if games % batch_size:
+        batches.append(games % batch_size)
+    seed = random.getrandbits(32)
+    totals = [0] * _COUNTS
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        jobs = [executor.submit(simulate, policy_name, batch, players, seed + index)
+                for (index, batch) in enumerate(batches)]
+        for job in jobs:
+            for (index, count) in enumerate(job.result()):
+                if index == _LONGEST:
+                    totals[index] = max(totals[index], count)
+                else:
+                    totals[index] += count
+    return make_report(policy_name, players, totals)
+
+
+def _format_shares(shares):
+    return ", ".join(f"{size}: {share:.1%}" for (size, share) in enumerate(shares) if share >= 0.001)
+
+
+if __name__ == "__main__":
+    report = run(sys.argv[1] if len(sys.argv) > 1 else "heuristic",
+                 int(sys.argv[2]) if len(sys.argv) > 2 else 100000,
+                 int(sys.argv[3]) if len(sys.argv) > 3 else 4)
+    print(f"Policy {report.policy}, {report.games} games of {report.players} players")
+    print(f"Turns per game: {report.turns:.1f} (longest {report.longest}), "
+          f"{report.unfinished} called off")
+    print(f"Deck regenerations per game: {report.regenerations:.3f}, "
+          f"in {report.regenerated:.2%} of games")
+    print(f"Hand size at the start of a turn: {_format_shares(report.hand_sizes)}")
+    print(f"Losing hand sizes: {_format_shares(report.loser_hand_sizes)}")
+    print(f"Games per second per worker: {report.games_per_second:.0f}")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the bot is run from the repo root, so its modules import each other
+# from there (util, games.*). Do the same for the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,129 @@
+import pytest
+from util import Card
+from games.blackjack_dealer import TOTALS
+from games.blackjack_dealer import dealer_distribution
+from games.blackjack_dealer import dealer_finals
+from games.blackjack_dealer import shoe_counts
+from games.blackjack_rules import BJHand
+from games.blackjack_rules import is_natural
+from games.blackjack_strategy import HIT
+from games.blackjack_strategy import STAND
+from games.blackjack_strategy import StrategyTable
+from games.blackjack_strategy import build_table
+from games.blackjack_strategy import load_table
+from games.blackjack_strategy import save_table
+
+
+def cards(*faces, suit="S"):
+    return [Card(suit, face) for face in faces]
+
+
+def rank(face):
+    return Card.FACES.index(face)
+
+
+@pytest.mark.parametrize(("faces", "total", "soft"), (
+    (("10", "7"), 17, False),
+    (("A", "6"), 17, True),
+    (("A", "6", "10"), 17, False),
+    (("A", "A"), 12, True),
+    (("A", "A", "9"), 21, True),
+    (("K", "Q", "5"), 25, False),
+))
+def test_player_hand(faces, total, soft):
+    hand = BJHand(cards(*faces))
+    assert (hand.total, hand.soft, hand.bust) == (total, soft, total > 21)
+
+
+def test_blackjack_needs_two_cards():
+    assert BJHand(cards("A", "K")).blackjack
+    assert not BJHand(cards("5", "6", "K")).blackjack
+
+
+def test_dealer_never_counts_an_ace_back_down():
+    # the first 2 cards are scored like a player's
+    assert BJHand(cards("A", "A"), dealer=True).total == 12
+    # after that an ace is 11 unless that busts, and then sticks
+    assert BJHand(cards("2", "3", "A"), dealer=True).total == 16
+    assert BJHand(cards("2", "3", "A", "10"), dealer=True).total == 26
+    assert BJHand(cards("10", "6", "A"), dealer=True).total == 17
+
+
+def test_natural_needs_a_picture_card():
+    assert is_natural(*cards("A", "K"))
+    assert is_natural(*cards("Q", "A"))
+    assert not is_natural(*cards("A", "10"))
+
+
+def brute_finals(hand, rest):
+    """
+    Dealer's final totals worked out by playing out every order the
+    cards in rest can come in, the slow way
+    """
+    if hand.total >= 17:
+        finals = [0.0] * TOTALS
+        finals[0 if hand.bust else hand.total] = 1.0
+        return finals
+    finals = [0.0] * TOTALS
+    for index in range(len(rest)):
+        drawn = BJHand(hand.cards + [rest[index]], dealer=True)
+        for (total, chance) in enumerate(brute_finals(drawn, rest[:index] + rest[index + 1:])):
+            finals[total] += chance / len(rest)
+    return finals
+
+
+SHOE = cards("2", "3", "5", "6", "9", "10", "J", "K", "A", "A", "4", "Q")
+
+
+@pytest.mark.parametrize("faces", (("6", "5"), ("2", "3"), ("A", "A"), ("A", "5"), ("10", "6")))
+def test_dealer_finals_match_brute_force(faces):
+    hand = BJHand(cards(*faces), dealer=True)
+    assert dealer_finals(hand.total, shoe_counts(SHOE)) == pytest.approx(brute_finals(hand, SHOE))
+
+
+@pytest.mark.parametrize("up", ("2", "6", "10", "K", "A"))
+def test_dealer_distribution_skips_naturals(up):
+    up_card = Card("H", up)
+    expected = [0.0] * TOTALS
+    hidden_cards = [card for card in SHOE if not is_natural(up_card, card)]
+    for (index, hidden) in enumerate(SHOE):
+        if is_natural(up_card, hidden):
+            continue
+        finals = brute_finals(BJHand([up_card, hidden], dealer=True), SHOE[:index] + SHOE[index + 1:])
+        for (total, chance) in enumerate(finals):
+            expected[total] += chance / len(hidden_cards)
+    assert dealer_distribution(rank(up), shoe_counts(SHOE)) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("up", Card.FACES)
+def test_infinite_shoe_distribution_sums_to_one(up):
+    assert sum(dealer_distribution(rank(up))) == pytest.approx(1.0)
+
+
+@pytest.fixture(scope="module")
+def table():
+    return StrategyTable(build_table())
+
+
+@pytest.mark.parametrize(("total", "soft", "up", "action"), (
+    (16, False, "10", HIT),
+    (12, False, "2", HIT),
+    (12, False, "4", STAND),
+    (13, False, "6", STAND),
+    (17, False, "A", STAND),
+    (11, False, "6", HIT),
+    (17, True, "6", HIT),
+    (18, True, "7", STAND),
+    (18, True, "9", HIT),
+    (19, True, "10", STAND),
+    (21, False, "10", STAND),
+))
+def test_basic_strategy(table, total, soft, up, action):
+    assert table.action(total, soft, rank(up)) == action
+
+
+def test_strategy_table_round_trip(tmp_path, table):
+    path = str(tmp_path / "strategy.bin")
+    assert load_table(path) is None
+    save_table(path)
+    assert load_table(path).table == table.table
@@ -0,0 +1,53 @@
+import pytest
+from games.persistence import GameStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "games.db")
+
+
+def test_round_trip(path):
+    store = GameStore(path, flush_delay=0)
+    store.start()
+    store.save(1, {"game": "blackjack", "players": [[7, "alice", {"chips": 100}]]})
+    store.save(2, {"game": "uno"})
+    store.close()
+    assert sorted(GameStore(path).load_all()) == [
+        (1, {"game": "blackjack", "players": [[7, "alice", {"chips": 100}]]}),
+        (2, {"game": "uno"}),
+    ]
+
+
+def test_latest_snapshot_wins(path):
+    store = GameStore(path)
+    store.save(1, {"version": 1})
+    store.save(1, {"version": 2})
+    store.save(2, {"version": 1})
+    store.delete(2)
+    # closing without the writer thread still writes everything pending
+    store.close()
+    assert GameStore(path).load_all() == [(1, {"version": 2})]
+
+
+def test_delete(path):
+    store = GameStore(path, flush_delay=0)
+    store.start()
+    store.save(1, {})
+    store.close()
+    store = GameStore(path, flush_delay=0)
+    store.start()
+    store.delete(1)
+    store.close()
+    assert GameStore(path).load_all() == []
+
+
+def test_unreadable_snapshots_are_skipped(path):
+    store = GameStore(path)
+    store.save(1, {})
+    store.close()
+    connection = store.connect()
+    with connection:
+        connection.execute("INSERT INTO games VALUES (2, 'not json', 0)")
+    connection.close()
+    assert GameStore(path).load_all() == [(1, {})]
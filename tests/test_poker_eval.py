@@ -0,0 +1,82 @@
+import random
+from itertools import combinations
+import numpy as np
+import pytest
+from util import Card
+from games.poker import max_hand
+from games.poker_eval import HandState
+from games.poker_eval import evaluate
+from games.poker_eval import evaluate_batch
+from games.poker_eval import evaluate_cards
+from games.poker_eval import hand_name
+
+DECK = [Card(suit, face) for suit in Card.SUITS for face in Card.FACES]
+
+
+def cards(*names):
+    """
+    cards("AH", "10S") -> [Card("H", "A"), Card("S", "10")]
+    """
+    return [Card(name[-1], name[:-1]) for name in names]
+
+
+def best_max_hand(hand):
+    return max(max_hand(list(five)) for five in combinations(hand, 5))
+
+
+@pytest.mark.parametrize("size", (5, 6, 7))
+def test_evaluate_matches_max_hand(size):
+    rng = random.Random(size)
+    for _ in range(500):
+        hand = rng.sample(DECK, size)
+        assert evaluate_cards(hand) == best_max_hand(hand)
+
+
+@pytest.mark.parametrize(("hand", "name"), (
+    (("AH", "KH", "QH", "JH", "10H", "2C", "3D"), "Royal Flush"),
+    (("AS", "2S", "3S", "4S", "5S", "KD", "KC"), "Straight Flush"),
+    (("9C", "9D", "9H", "9S", "2C", "2D", "2H"), "Four of a Kind"),
+    (("9C", "9D", "9H", "2S", "2C", "3D", "4H"), "Full House"),
+    (("2H", "7H", "9H", "JH", "KH", "KC", "KD"), "Flush"),
+    (("AC", "2D", "3H", "4S", "5C", "9D", "JH"), "Straight"),
+    (("7C", "7D", "7H", "2S", "4C", "9D", "JH"), "Three of a Kind"),
+    (("7C", "7D", "4H", "4S", "2C", "2D", "JH"), "Two Pair"),
+    (("7C", "7D", "4H", "3S", "2C", "9D", "JH"), "Pair"),
+    (("7C", "8D", "4H", "3S", "2C", "10D", "KH"), "High Card"),
+))
+def test_hand_names(hand, name):
+    assert hand_name(evaluate_cards(cards(*hand))) == name
+
+
+def test_wheel_loses_to_six_high_straight():
+    wheel = evaluate_cards(cards("AC", "2D", "3H", "4S", "5C"))
+    six_high = evaluate_cards(cards("2D", "3H", "4S", "5C", "6D"))
+    assert six_high > wheel
+
+
+@pytest.mark.parametrize("size", (5, 6, 7))
+def test_evaluate_batch_matches_evaluate(size):
+    rng = np.random.default_rng(size)
+    hands = np.array([rng.permutation(52)[:size] for _ in range(2000)], dtype=np.int8)
+    values = evaluate_batch(hands)
+    assert values.dtype == np.int32
+    assert values.tolist() == [evaluate(hand.tolist()) for hand in hands]
+
+
+def test_hand_state_tracks_evaluate():
+    rng = random.Random(7)
+    for _ in range(500):
+        codes = rng.sample(range(52), 7)
+        state = HandState()
+        for (count, code) in enumerate(codes, 1):
+            state.add(code)
+            assert state.value == (evaluate(codes[:count]) if count >= 5 else 0)
+
+
+def test_hand_state_reset():
+    state = HandState(card.id for card in cards("AH", "KH", "QH", "JH", "10H"))
+    assert hand_name(state.value) == "Royal Flush"
+    state.reset()
+    assert (state.count, state.value, state.flush) == (0, 0, False)
+    state.add_cards(cards("2C", "2D", "5H", "9S", "JC"))
+    assert hand_name(state.value) == "Pair"
@@ -0,0 +1,33 @@
+from itertools import combinations
+import numpy as np
+from games.poker_eval import evaluate
+from games.poker_preflop import HAND_COUNT
+from games.poker_preflop import _board_shares
+from games.poker_preflop import _combo_tables
+from games.poker_preflop import hand_combos
+from games.poker_preflop import hand_index
+
+
+def test_every_combo_has_one_class():
+    counts = [len(hand_combos(hand)) for hand in range(HAND_COUNT)]
+    assert sum(counts) == 1326
+    assert sorted(set(counts)) == [4, 6, 12]
+    for hand in range(HAND_COUNT):
+        for (code1, code2) in hand_combos(hand):
+            assert hand_index(code1, code2) == hand_index(code2, code1) == hand
+
+
+def test_board_shares_match_brute_force():
+    board = [3, 17, 22, 40, 51]
+    (_, combo_index, _) = _combo_tables()
+    expected = np.zeros((1326, HAND_COUNT))
+    hands = list(combinations([code for code in range(52) if code not in board], 2))
+    values = {hand: evaluate(list(hand) + board) for hand in hands}
+    for hand in hands:
+        for other_hand in hands:
+            if set(hand) & set(other_hand):
+                continue
+            if values[hand] >= values[other_hand]:
+                expected[combo_index[hand], hand_index(*other_hand)] += \
+                    1 if values[hand] > values[other_hand] else 0.5
+    assert np.array_equal(_board_shares(np.array([board]), np.array([2])), 2 * expected)
@@ -0,0 +1,19 @@
+import pytest
+from games.router import make_custom_id
+from games.router import parse_custom_id
+
+
+def test_custom_id_round_trip():
+    assert parse_custom_id(make_custom_id(1146514624288673992, 3, "join")) \
+        == (1146514624288673992, 3, "join")
+
+
+@pytest.mark.parametrize("custom_id", (
+    "join",
+    "xx:1:2:join",
+    "lt:1:2",
+    "lt:one:2:join",
+    "lt:1:2:join:extra",
+))
+def test_other_custom_ids_are_ignored(custom_id):
+    assert parse_custom_id(custom_id) is None
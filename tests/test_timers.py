@@ -0,0 +1,70 @@
+import asyncio
+from games.timers import Timer
+from games.timers import TimerWheel
+
+
+def add(wheel, due, fired):
+    """
+    Put a timer due on tick due straight into the wheel, the way
+    schedule does once it has worked out the tick
+    """
+    timer = Timer(due, fired.append, (due, ))
+    wheel.place(timer)
+    wheel.count += 1
+    return timer
+
+
+def turn(wheel, ticks):
+    for _ in range(ticks):
+        for timer in wheel.advance():
+            timer.callback(*timer.args)
+
+
+def test_timers_cascade_down_the_wheels():
+    wheel = TimerWheel(tick=1, size=4, wheels=3)
+    fired = []
+    # one timer for every tick the three wheels reach, placed in all of them
+    for due in range(1, 64):
+        add(wheel, due, fired)
+    for tick in range(1, 64):
+        turn(wheel, 1)
+        assert fired == list(range(1, tick + 1))
+    assert wheel.count == 0
+
+
+def test_timers_past_the_outer_wheel_still_fire_on_time():
+    wheel = TimerWheel(tick=1, size=4, wheels=2)
+    fired = []
+    add(wheel, 40, fired)
+    turn(wheel, 39)
+    assert fired == []
+    turn(wheel, 1)
+    assert fired == [40]
+
+
+def test_cancelled_timers_dont_fire():
+    wheel = TimerWheel(tick=1, size=4, wheels=3)
+    fired = []
+    add(wheel, 5, fired).cancel()
+    add(wheel, 6, fired)
+    turn(wheel, 10)
+    assert fired == [6]
+    assert wheel.count == 0
+
+
+def test_schedule():
+    async def run():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        wheel.schedule(0.15, fired.append, "late")
+        wheel.schedule(0.01, fired.append, "early")
+        wheel.schedule(0.05, fired.append, "cancelled").cancel()
+
+        async def coroutine():
+            fired.append("awaited")
+        wheel.schedule(0.05, coroutine)
+        await asyncio.sleep(0.25)
+        assert fired == ["early", "awaited", "late"]
+        # the wheel stops turning once it's empty
+        assert wheel.task is None
+    asyncio.run(run())
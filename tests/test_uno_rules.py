@@ -0,0 +1,116 @@
+import random
+import pytest
+from games.uno_rules import COLOR_CARDS
+from games.uno_rules import DECK
+from games.uno_rules import UnoCard
+from games.uno_rules import UnoHand
+from games.uno_rules import UnoPile
+from games.uno_rules import UnoTable
+from games.uno_rules import card_effect
+from games.uno_rules import draw_from
+from games.uno_rules import is_playable
+from games.uno_rules import is_starting_card
+from games.uno_rules import next_turn
+from games.uno_rules import place_card
+
+
+def test_deck():
+    assert len(DECK) == 108
+    assert DECK.count(UnoCard("Red", "0")) == 1
+    assert DECK.count(UnoCard("Blue", "7")) == 2
+    assert DECK.count(UnoCard("Wild", "Draw Four")) == 4
+
+
+@pytest.mark.parametrize(("card", "top", "playable"), (
+    (("Red", "5"), ("Red", "9"), True),
+    (("Blue", "9"), ("Red", "9"), True),
+    (("Blue", "Skip"), ("Red", "Skip"), True),
+    (("Blue", "8"), ("Red", "9"), False),
+    (("Wild", "Draw Four"), ("Red", "9"), True),
+    (("Green", "3"), ("Green", "Card"), True),
+    (("Red", "3"), ("Green", "Card"), False),
+))
+def test_is_playable(card, top, playable):
+    assert is_playable(UnoCard(*card), UnoCard(*top)) == playable
+
+
+def test_starting_cards():
+    assert is_starting_card(UnoCard("Red", "4"))
+    assert not is_starting_card(UnoCard("Red", "Draw Two"))
+    assert not is_starting_card(UnoCard("Wild", "Wild"))
+
+
+def test_hand_stays_sorted_and_bucketed():
+    rng = random.Random(3)
+    cards = rng.sample(DECK, 20)
+    hand = UnoHand(cards)
+    assert hand.cards == sorted(cards)
+    for top in rng.sample(DECK, 20):
+        top = COLOR_CARDS["Blue"] if top.name == "Wild" else top
+        expected = {card for card in cards if is_playable(card, top)}
+        assert hand.get_playable(top) == expected
+        assert hand.has_playable(top) == bool(expected)
+
+
+def test_hand_remove():
+    card = UnoCard("Yellow", "7")
+    hand = UnoHand([card, card, UnoCard("Red", "1")])
+    version = hand.version
+    hand.remove(card)
+    assert card in hand
+    assert hand.count_color("Yellow") == 1
+    assert hand.version == version + 1
+    hand.remove(card)
+    assert card not in hand
+    with pytest.raises(ValueError):
+        hand.remove(card)
+
+
+def test_pile():
+    pile = UnoPile()
+    pile.fill()
+    assert sorted(pile) == sorted(DECK)
+    top = list(pile)[-1]
+    assert pile.pop() is top
+    assert len(pile) == 107
+    copy = pile.copy()
+    copy.pop()
+    assert len(pile) == 107
+
+
+def test_draw_from_refills_the_deck():
+    deck = UnoPile()
+    discard = UnoPile(DECK[:3])
+    (card, refilled) = draw_from(deck, discard)
+    assert refilled and card in DECK[:3]
+    assert (len(deck), len(discard)) == (2, 0)
+    assert draw_from(UnoPile(), UnoPile()) == (None, False)
+
+
+def test_wild_leaves_a_placeholder():
+    discard = UnoPile()
+    top = place_card(UnoCard("Wild", "Wild"), "Green", UnoCard("Red", "2"), discard)
+    assert top is COLOR_CARDS["Green"]
+    assert list(discard) == [UnoCard("Red", "2")]
+    # the placeholder itself never goes on the discard pile
+    place_card(UnoCard("Green", "5"), None, top, discard)
+    assert list(discard) == [UnoCard("Red", "2")]
+
+
+def test_turns():
+    assert card_effect(UnoCard("Red", "Draw Two")) == (False, 2, True)
+    assert card_effect(UnoCard("Red", "Reverse")) == (True, 0, False)
+    assert next_turn(3, 4, False) == 0
+    assert next_turn(0, 4, True) == 3
+    assert next_turn(1, 4, False, skip=True) == 3
+
+
+def test_table_draw_two():
+    hands = [[UnoCard("Red", "Draw Two"), UnoCard("Red", "1")], [], []]
+    table = UnoTable(hands, UnoPile(DECK[:10]), UnoPile(), UnoCard("Red", "5"))
+    assert not table.play(UnoCard("Red", "Draw Two"))
+    assert len(table.hands[1]) == 2
+    # the player who drew is skipped
+    assert table.turn == 2
+    assert table.top_card == UnoCard("Red", "Draw Two")
+    assert list(table.discard) == [UnoCard("Red", "5")]
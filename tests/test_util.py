@@ -0,0 +1,54 @@
+import pytest
+from util import Card
+from util import Deck
+from util import Shoe
+from util import STANDARD_52_DECK
+
+
+def test_cards_are_interned():
+    assert Card("H", "A") is Card("H", "A")
+    assert Card("H", "A").id == Card.FACES.index("A") << Card.SUIT_BITS | Card.SUITS.index("H")
+    with pytest.raises(AttributeError):
+        Card("H", "A").value = "K"
+
+
+def test_shoe_deals_every_card_once():
+    shoe = Shoe(decks=2)
+    dealt = shoe.draw(40) + shoe.draw(64)
+    assert len(shoe) == 0
+    assert sorted(card.id for card in dealt) == sorted(card.id for card in STANDARD_52_DECK.cards * 2)
+
+
+def test_shoe_shuffle_puts_the_cards_back():
+    shoe = Shoe()
+    shoe.draw(50)
+    shoe.shuffle()
+    assert len(shoe) == 52
+    assert len(set(shoe.draw(52))) == 52
+
+
+def test_shoe_cut_card():
+    shoe = Shoe(penetration=0.5)
+    shoe.draw(25)
+    assert not shoe.needs_shuffle()
+    shoe.draw(1)
+    assert shoe.needs_shuffle()
+
+
+def test_shoe_never_reshuffles_cards_in_play():
+    shoe = Shoe()
+    shoe.draw(45)
+    shoe.start_round()
+    in_play = shoe.draw(5)
+    # only 2 cards left, so the discards get shuffled back in
+    more = shoe.draw(10)
+    assert not set(in_play) & set(more)
+    assert len(set(in_play + more)) == 15
+
+
+def test_shoe_runs_out():
+    shoe = Shoe(Deck(("D", ), ("2", "3", "4"), 1, ()))
+    shoe.start_round()
+    shoe.draw(2)
+    with pytest.raises(ValueError):
+        shoe.draw(2)
@@ -1,25 +1,79 @@
 import random
 import logging
 import discord
+from games.timers import TIMERS
+from games.timers import TimedView
+
+# every card ever made, keyed by (card type, name, value). Cards are
+# immutable, so each one only needs to exist once
+_CARDS = {}
+
 
 class Card:
     """
     This data type represents the playing cards found in a standard
     52-card deck.
+
+    Cards are interned: Card("H", "A") always returns the same object,
+    so cards can be compared with == (or is) without looking at their
+    strings. Each card also carries a small integer id made of two
+    bit-fields, rank (index into FACES) and suit (index into SUITS):
+
+        id = rank << SUIT_BITS | suit
+
+    Subclasses (ex. UnoCard) can swap out SUITS, FACES and SUIT_BITS to
+    get their own set of cards.
     """
-    def __init__(self, name, value):
+    __slots__ = ("name", "value", "id", "rank", "suit", "mask")
+
+    # index in these tuples is the card's suit / rank, faces are in
+    # ascending order with the ace high
+    SUITS = ("D", "H", "S", "C")
+    FACES = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A")
+    SUIT_BITS = 2
+
+    def __new__(cls, name, value):
         """
         name (suit) is H, D, S, C, for Heart, Diamond, Spade, Club
         value (face) is 2-10, J, Q, K, A, for the numbered and real face cards
-        value refers to the numerical value as used in Blackjack
-            Ace cards should have value set to 1
         """
-        self.name = name
-        self.value = value
+        card = _CARDS.get((cls, name, value))
+        if card is None:
+            card = super().__new__(cls)
+            suit = cls.SUITS.index(name)
+            rank = cls.FACES.index(value)
+            set_attr = object.__setattr__
+            set_attr(card, "name", name)
+            set_attr(card, "value", value)
+            set_attr(card, "suit", suit)
+            set_attr(card, "rank", rank)
+            set_attr(card, "id", rank << cls.SUIT_BITS | suit)
+            set_attr(card, "mask", 1 << rank)
+            card._intern()
+            _CARDS[(cls, name, value)] = card
+        return card
+
+    def _intern(self):
+        """
+        Called once when a new card is made, subclasses can override
+        this to precompute any extra fields
+        """
+
+    def __setattr__(self, attr, value):
+        raise AttributeError("Cards are immutable")
+
+    def __delattr__(self, attr):
+        raise AttributeError("Cards are immutable")
 
-    def __eq__(self, other):
-        return self.name == other.name\
-                and self.value == other.value\
+    def __reduce__(self):
+        # rebuild through __new__ so unpickled cards are interned too
+        return (type(self), (self.name, self.value))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __str__(self):
         return str(self.name) + str(self.value)
@@ -29,10 +83,9 @@ class Card:
 
 class Deck:
     """
-    Contains cards and their weights to make drawing easy. Due to
-    difficulty, it does not actually keep track of a deck. Can
-    be made more memory efficient by placing a reference to each
-    card in each slot rather than a whole card
+    Template for the cards that make up one deck. Each slot holds a
+    reference to an interned card rather than a whole card. Cards are
+    dealt from a Shoe built from one or more copies of a Deck
     """
     def __init__(self, suits, faces, count, specials):
         """
@@ -56,20 +109,103 @@ class Deck:
             for k in range(j):
                 self.cards.append(i)
 
-    def draw(self, count):
+
+STANDARD_52_DECK = Deck(('D', 'H', 'S', 'C'),
+                        ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K'),
+                        1, ())
+
+
+class Shoe:
+    """
+    One or more decks that cards are really dealt out of, so the same
+    card can't come out twice until the shoe is shuffled again. Every
+    game keeps its own shoe.
+
+    The shoe is shuffled lazily: drawing swaps a random undealt card
+    into the slot under the cursor (one Fisher-Yates step per card), so
+    shuffling only has to move the cursor back to the start and each
+    draw is O(1) per card.
+
+    Games that deal several rounds between shuffles call start_round
+    before dealing each one, so if a round runs the shoe dry the cards
+    from earlier rounds can be shuffled back in without touching the
+    cards still in play.
+    """
+    def __init__(self, deck=STANDARD_52_DECK, decks=1, penetration=0.75):
+        """
+        deck: the Deck to copy the cards from
+        decks: how many copies of the deck the shoe holds
+        penetration: fraction of the shoe that is dealt before the cut
+        card comes out and needs_shuffle starts returning True
+        """
+        self.cards = deck.cards * decks
+        self.cursor = 0
+        # cards before this index were dealt in earlier rounds and have
+        # been discarded, the ones from here to the cursor are in play
+        self.round_start = 0
+        self.cut_card = int(len(self.cards) * penetration)
+
+    def __len__(self):
+        """
+        Number of cards left to deal
+        """
+        return len(self.cards) - self.cursor
+
+    def shuffle(self):
+        """
+        Put every card back into the shoe. The lazy shuffle in draw
+        means no cards need to be moved here
+        """
+        self.cursor = 0
+        self.round_start = 0
+
+    def start_round(self):
+        """
+        Mark everything dealt so far as discarded, see draw
+        """
+        self.round_start = self.cursor
+
+    def needs_shuffle(self):
+        """
+        Returns True once the cut card has been reached. Check this
+        between rounds so a round is never dealt across a reshuffle
+        """
+        return self.cursor >= self.cut_card
+
+    def draw(self, count=1):
         """
         Draws the number of cards specified by count, and returns them
-        as a list.
+        as a list (a slice of the shoe). If there aren't enough cards
+        left, the discards from earlier rounds are shuffled back in.
+        Raises ValueError if there still aren't enough, since the only
+        cards left are in play
         """
-        ret_cards = []
-        for _ in range(count):
-            ret_cards.append(self.cards[random.randint(0, self.single_deck_size - 1)])
-        return ret_cards
+        cards = self.cards
+        size = len(cards)
+        if self.cursor + count > size:
+            # only happens if a round runs past the end of the shoe.
+            # The cards in play move to the front, and the discards join
+            # the undealt cards behind them to be shuffled in by the draw
+            in_play = cards[self.round_start:self.cursor]
+            if len(in_play) + count > size:
+                raise ValueError(f"Can't draw {count} card(s), only "
+                                 f"{size - len(in_play)} aren't in play")
+            logging.warning("Shoe ran out of cards mid-round, shuffling in the discards")
+            cards[:] = in_play + cards[:self.round_start] + cards[self.cursor:]
+            self.round_start = 0
+            self.cursor = len(in_play)
+        start = self.cursor
+        end = start + count
+        randrange = random.randrange
+        for i in range(start, end):
+            j = randrange(i, size)
+            cards[i], cards[j] = cards[j], cards[i]
+        self.cursor = end
+        return cards[start:end]
 
 
-STANDARD_52_DECK = Deck(('D', 'H', 'S', 'C'),
-                        ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K'),
-                        1, ())
+# emoji for each suit, indexed by Card.suit
+_SUIT_EMOJI = (":diamonds:", ":hearts:", ":spades:", ":clubs:")
 
 
 def cards_to_str_52_standard(cards):
@@ -78,23 +214,13 @@ def cards_to_str_52_standard(cards):
     """
     if cards is None:
         return "Empty"
-    ret = ""
-    for card in cards:
-        ret += card.value
-        if card.name == "D":
-            ret += ":diamonds:, "
-        elif card.name == "H":
-            ret += ":hearts:, "
-        elif card.name == "S":
-            ret += ":spades:, "
-        elif card.name == "C":
-            ret += ":clubs:, "
-    return ret.rstrip(", ")
+    return ", ".join(card.value + _SUIT_EMOJI[card.suit] for card in cards)
 
 
 def generate_deck():
     """
-    pretty sure this is unused but I'm keeping it just in case
+    Returns a list of all 52 standard cards. Since cards are interned,
+    this only looks up the existing cards rather than making new ones.
     """
     deck = []
     for suit in ('H', 'D', 'S', 'C'):
@@ -102,7 +228,7 @@ def generate_deck():
         for value in range(2,11):
             deck.append(Card(suit, str(value)))
         for face in ('J', 'Q', 'K'):
-            deck.append(Card(suit, face))       
+            deck.append(Card(suit, face))
     return deck
 
 
@@ -120,10 +246,12 @@ async def double_check(interaction, message_content="", timeout=30):
     timeout: the time before the menu defaults to no, in seconds.
     Defaults to 30.
     """
-    view = AreYouSureButtons()
-    await interaction.response.send_message(content=(f"{message_content}\nAre you sure?"
-                                            f" (will auto-no in {str(timeout)} seconds.)"),
-                                            view=view, delete_after=timeout, ephemeral=True)
+    view = AreYouSureButtons(timeout)
+    delete = await respond(interaction, (f"{message_content}\nAre you sure?"
+                                         f" (will auto-no in {str(timeout)} seconds.)"),
+                           view=view, ephemeral=True)
+    view.start_timer()
+    expiry = TIMERS.schedule(timeout, delete)
     # wait for the view to finish
     await view.wait()
     # if we didn't get any button interaction, default to no and
@@ -131,17 +259,18 @@ async def double_check(interaction, message_content="", timeout=30):
     if view.button_interaction is None:
         return (False, interaction)
     # else, return the result of the interaction (and delete the msg)
-    await interaction.delete_original_response()
+    expiry.cancel()
+    await delete()
     return (view.result, view.button_interaction)
 
 
-class AreYouSureButtons(discord.ui.View):
+class AreYouSureButtons(TimedView):
     """
     Helper class designed to facilitate a double check from the user upon trying to perform
     certain actions
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, timeout):
+        super().__init__(timeout)
         self.result = False
         self.button_interaction = None
 
@@ -157,6 +286,27 @@ class AreYouSureButtons(discord.ui.View):
         self.stop()
 
 
+async def respond(interaction, content=None, delete_after=None, **kwargs):
+    """
+    Answers interaction with a message (takes the same arguments as
+    interaction.response.send_message). If the interaction has already
+    been answered or deferred, which GameManager.submit does for input
+    that has to wait on the game, the message is sent as a followup
+    instead. Returns a coroutine function that deletes the message,
+    which is also run after delete_after seconds if it's given
+    """
+    if interaction.response.is_done():
+        message = await interaction.followup.send(content, wait=True, **kwargs)
+        delete = message.delete
+    else:
+        await interaction.response.send_message(content, **kwargs)
+        delete = interaction.delete_original_response
+    if delete_after is not None:
+        # deleted through the timer wheel, see games.timers
+        TIMERS.schedule(delete_after, delete)
+    return delete
+
+
 async def send_info_message(content, interaction):
     """
     Sends a 10-second ephemeral message with the content specified
@@ -164,4 +314,4 @@ async def send_info_message(content, interaction):
     """
     logging.debug("[%i] User [%s] sent info message with content [%s]",
                   interaction.channel_id, interaction.user.name, content)
-    await interaction.response.send_message(content=content, ephemeral=True, delete_after=10)
+    await respond(interaction, content, delete_after=10, ephemeral=True)